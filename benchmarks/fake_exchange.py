@@ -0,0 +1,163 @@
+import asyncio
+import time
+from src.exchanges import BybitAdapter
+
+def expand_fixture(fixture, size):
+    """Universe of `size` symbols, recorded symbols are reused under new names when there are too few"""
+    recorded = list(fixture['ohlcv'])
+    expanded = {key: {} for key in ('tickers', 'markets', 'ohlcv', 'funding', 'open_interest')}
+    for i in range(size):
+        source = recorded[i % len(recorded)]
+        copy = i // len(recorded)
+        symbol = source
+        if copy:
+            base, rest = source.split('/', 1)
+            symbol = f"{base}_{copy}/{rest}"
+        for key in expanded:
+            expanded[key][symbol] = fixture[key].get(source)
+        if copy:
+            market = fixture['markets'][source]
+            expanded['markets'][symbol] = {**market, 'id': f"{market['id']}_{copy}", 'symbol': symbol}
+    expanded['timeframe'] = fixture['timeframe']
+    return expanded
+
+class Replay:
+    """Recorded responses plus a cursor, only candles before the cursor are 'on the exchange' yet"""
+    def __init__(self, fixture, reserve_bars=10, latency=0):
+        self.fixture = fixture
+        bars = min(len(rows) for rows in fixture['ohlcv'].values())
+        self.cursor = max(bars - reserve_bars, 1)
+        self.latency = latency
+        self.requests = 0
+
+    def advance(self, bars=1):
+        """Let the next candle(s) close"""
+        self.cursor += bars
+
+    def now_ms(self):
+        """Replayed exchange time, a few seconds into the newest (forming) bar"""
+        rows = next(iter(self.fixture['ohlcv'].values()))
+        return rows[self.cursor - 1][0] + 3000
+
+    def kline_response(self, symbol, since=None, limit=None):
+        """The candles as Bybit's /v5/market/kline answers them, newest first and as strings"""
+        rows = self.ohlcv(symbol, since, limit)
+        return {
+            'retCode': 0,
+            'retMsg': 'OK',
+            'result': {
+                'category': 'linear',
+                'list': [[str(int(row[0])), *(str(value) for value in row[1:6]), '0'] for row in reversed(rows)],
+            },
+        }
+
+    def ohlcv(self, symbol, since=None, limit=None):
+        self.requests += 1
+        rows = self.fixture['ohlcv'][symbol][:self.cursor]
+        if since is not None:
+            rows = [row for row in rows if row[0] >= since]
+            rows = rows[:limit] if limit else rows
+        elif limit:
+            rows = rows[-limit:]
+        # ccxt hands out freshly parsed lists on every call
+        return [list(row) for row in rows]
+
+    def get(self, key, symbol):
+        self.requests += 1
+        return dict(self.fixture[key][symbol])
+
+class FakeExchange:
+    """Stands in for ccxt.bybit, everything the scanner calls is answered from the replay"""
+    timeframes = {'1m': '1', '5m': '5', '15m': '15', '1h': '60', '4h': '240', '1d': 'D'}
+
+    def __init__(self, replay):
+        self.replay = replay
+        self.markets = None
+        self.symbols_by_id = {market['id']: symbol for symbol, market in replay.fixture['markets'].items()}
+
+    def wait(self):
+        if self.replay.latency:
+            time.sleep(self.replay.latency)
+
+    def load_markets(self, reload=False):
+        self.wait()
+        self.markets = dict(self.replay.fixture['markets'])
+        return self.markets
+
+    def market(self, symbol):
+        return self.replay.fixture['markets'][symbol]
+
+    def fetch_tickers(self):
+        self.wait()
+        self.replay.requests += 1
+        tickers = {}
+        for symbol, ticker in self.replay.fixture['tickers'].items():
+            # Right after a close the last price is the close of the bar that just ended
+            rows = self.replay.fixture['ohlcv'][symbol]
+            tickers[symbol] = {**ticker, 'last': rows[min(self.replay.cursor, len(rows)) - 2][4]}
+        return tickers
+
+    def fetch_ohlcv(self, symbol, timeframe='15m', since=None, limit=None, params={}):
+        self.wait()
+        return self.replay.ohlcv(symbol, since, limit)
+
+    def publicGetV5MarketKline(self, params):
+        self.wait()
+        return self.replay.kline_response(self.symbols_by_id[params['symbol']], params.get('start'), params.get('limit'))
+
+    def fetch_funding_rate(self, symbol):
+        self.wait()
+        return self.replay.get('funding', symbol)
+
+    def fetch_open_interest(self, symbol):
+        self.wait()
+        return self.replay.get('open_interest', symbol)
+
+    def fetch_ticker(self, symbol):
+        self.wait()
+        return self.replay.get('tickers', symbol)
+
+    def fetch_long_short_ratio_history(self, symbol, timeframe=None, since=None, limit=None):
+        self.wait()
+        self.replay.requests += 1
+        return [{'symbol': symbol, 'longShortRatio': 1.0}]
+
+class FakeAsyncExchange:
+    """Async twin of FakeExchange for AsyncScanner"""
+    def __init__(self, replay):
+        self.replay = replay
+        self.markets = None
+
+    async def wait(self):
+        if self.replay.latency:
+            await asyncio.sleep(self.replay.latency)
+
+    def set_markets(self, markets):
+        self.markets = markets
+
+    async def load_markets(self, reload=False):
+        await self.wait()
+        self.markets = dict(self.replay.fixture['markets'])
+        return self.markets
+
+    async def fetch_ohlcv(self, symbol, timeframe='15m', since=None, limit=None, params={}):
+        await self.wait()
+        return self.replay.ohlcv(symbol, since, limit)
+
+    async def close(self):
+        pass
+
+class ReplayAdapter(BybitAdapter):
+    """Bybit adapter whose clients replay a fixture instead of going to the network"""
+    label = 'Replay'
+    # The replay has no rate limit, request pacing would hide the pipeline's own cost
+    requests_per_second = 1_000_000
+
+    def __init__(self, replay):
+        self.replay = replay
+
+    def create_exchange(self):
+        return FakeExchange(self.replay)
+
+    def create_async_exchange(self):
+        return FakeAsyncExchange(self.replay)
@@ -0,0 +1,89 @@
+import argparse
+import gzip
+import json
+import os
+import time
+import numpy as np
+
+DEFAULT_FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'bybit.json.gz')
+TIMEFRAME_MS = 15 * 60 * 1000
+
+def save_fixture(fixture, path):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'wt') as f:
+        json.dump(fixture, f)
+
+def load_fixture(path):
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt') as f:
+        return json.load(f)
+
+def record(symbols=50, bars=120, timeframe='15m'):
+    """Download tickers, OHLCV, funding and open interest of the most traded Bybit perpetuals"""
+    import ccxt
+    exchange = ccxt.bybit({'enableRateLimit': True, 'options': {'defaultType': 'swap'}})
+    exchange.load_markets()
+    tickers = exchange.fetch_tickers()
+    usdt = [symbol for symbol, ticker in tickers.items() if '/USDT' in symbol and ticker.get('quoteVolume')]
+    usdt.sort(key=lambda symbol: tickers[symbol]['quoteVolume'], reverse=True)
+
+    fixture = {'timeframe': timeframe, 'tickers': {}, 'markets': {}, 'ohlcv': {}, 'funding': {}, 'open_interest': {}}
+    for symbol in usdt[:symbols]:
+        print(f"Recording {symbol}...", end='\r')
+        fixture['tickers'][symbol] = tickers[symbol]
+        market = exchange.market(symbol)
+        fixture['markets'][symbol] = {'id': market['id'], 'symbol': symbol, 'type': market['type']}
+        fixture['ohlcv'][symbol] = exchange.fetch_ohlcv(symbol, timeframe=timeframe, limit=bars)
+        fixture['funding'][symbol] = exchange.fetch_funding_rate(symbol)
+        fixture['open_interest'][symbol] = exchange.fetch_open_interest(symbol)
+    print(f"\nRecorded {len(fixture['ohlcv'])} symbols")
+    return fixture
+
+def synthetic(symbols=50, bars=120, seed=0, end=1_700_000_000_000):
+    """Seeded random walks in the same layout as a recording, for machines without network access"""
+    rng = np.random.default_rng(seed)
+    end -= end % TIMEFRAME_MS
+    start = end - bars * TIMEFRAME_MS
+    fixture = {'timeframe': '15m', 'tickers': {}, 'markets': {}, 'ohlcv': {}, 'funding': {}, 'open_interest': {}}
+    for i in range(symbols):
+        symbol = f"SYN{i}/USDT:USDT"
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, bars)))
+        open_ = np.r_[close[0], close[:-1]]
+        high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.005, bars))
+        low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.005, bars))
+        volume = rng.uniform(100, 1000, bars)
+        timestamps = start + np.arange(bars) * TIMEFRAME_MS
+        fixture['ohlcv'][symbol] = np.c_[timestamps, open_, high, low, close, volume].tolist()
+        turnover = float(rng.uniform(5e6, 5e8))
+        fixture['tickers'][symbol] = {
+            'symbol': symbol, 'last': float(close[-1]), 'quoteVolume': turnover,
+            'info': {
+                'symbol': f"SYN{i}USDT", 'turnover24h': str(turnover),
+                'fundingRate': str(rng.normal(0, 0.0001)), 'nextFundingTime': str(end + 3600_000),
+                'openInterest': str(rng.uniform(1e5, 1e7))
+            }
+        }
+        fixture['markets'][symbol] = {'id': f"SYN{i}USDT", 'symbol': symbol, 'type': 'swap'}
+        fixture['funding'][symbol] = {'symbol': symbol, 'fundingRate': 0.0001, 'fundingTimestamp': end + 3600_000}
+        fixture['open_interest'][symbol] = {'symbol': symbol, 'openInterestAmount': 1e6}
+    return fixture
+
+def main():
+    parser = argparse.ArgumentParser(description="Create benchmark fixtures")
+    parser.add_argument('mode', choices=['record', 'synthetic'])
+    parser.add_argument('--symbols', type=int, default=50)
+    parser.add_argument('--bars', type=int, default=120, help="Candles per symbol, a few more than CANDLE_HISTORY_LIMIT")
+    parser.add_argument('--output', default=DEFAULT_FIXTURE)
+    args = parser.parse_args()
+
+    start = time.time()
+    if args.mode == 'record':
+        fixture = record(args.symbols, args.bars)
+    else:
+        fixture = synthetic(args.symbols, args.bars)
+    save_fixture(fixture, args.output)
+    print(f"Saved {args.output} in {time.time() - start:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Keep the benchmark away from the real candle store and CoinGecko database
+_scratch = tempfile.mkdtemp(prefix='scanner-bench-')
+os.environ['CANDLE_STORE_PATH'] = os.path.join(_scratch, 'candles')
+os.environ['COINGECKO_DB_PATH'] = os.path.join(_scratch, 'coingecko.sqlite3')
+
+from benchmarks.fixtures import DEFAULT_FIXTURE, load_fixture, synthetic
+from benchmarks.fake_exchange import Replay, ReplayAdapter, expand_fixture
+from src.batch_indicators import build_panel, compute_indicators, signal_masks
+from src.candles import Candles
+from src.main import scan_venue
+from src.scanner import Scanner
+from src.scanner_service import Venue
+
+DEFAULT_SIZES = (50, 200, 500, 2000)
+STAGES = ('dataframe', 'indicators', 'td', 'signal', 'candles', 'arrays', 'batch', 'job_cold', 'job_warm')
+
+class OfflineCoinGecko:
+    def get_coin_details(self, symbol):
+        return None
+
+class NullSender:
+    def __init__(self):
+        self.messages = 0
+
+    def send_message(self, message):
+        self.messages += 1
+
+def pipeline_stages(fixture, size, latency):
+    """Callables for every stage, each one returns the number of signals (or rows) it produced"""
+    universe = expand_fixture(fixture, size)
+    replay = Replay(universe)
+    scanner = Scanner(adapter=ReplayAdapter(replay), cg_manager=OfflineCoinGecko())
+    rows = {symbol: replay.ohlcv(symbol, limit=100) for symbol in universe['ohlcv']}
+    responses = {symbol: replay.kline_response(symbol, limit=100) for symbol in universe['ohlcv']}
+    state = {}
+
+    def dataframe():
+        state['frames'] = {symbol: Candles.from_rows(ohlcv).to_dataframe() for symbol, ohlcv in rows.items()}
+        return len(state['frames'])
+
+    def indicators():
+        state['frames'] = {symbol: scanner.calculate_indicators(df) for symbol, df in state['frames'].items()}
+        return len(state['frames'])
+
+    def td():
+        for df in state['frames'].values():
+            scanner.calculate_td_sequential(df)
+        return len(state['frames'])
+
+    def signal():
+        # The strategy rules on the pandas_ta columns
+        return sum(
+            1 for df in state['frames'].values()
+            if scanner.evaluate({name: df[name].to_numpy() for name in df.columns})[0]
+        )
+
+    def candles():
+        # Raw kline responses straight to column arrays, the hot path's replacement for dataframe
+        state['candles'] = {symbol: Candles.from_bybit_kline(response) for symbol, response in responses.items()}
+        return len(state['candles'])
+
+    def arrays():
+        # Per-symbol indicators and signal rules on the arrays, instead of indicators + td + signal
+        return sum(
+            1 for candles in state['candles'].values()
+            if scanner.evaluate(scanner.candle_indicators(candles))[0]
+        )
+
+    def batch():
+        symbols, timestamps, panel = build_panel(rows)
+        long, short, _ = signal_masks(compute_indicators(timestamps, panel))
+        return int((long[:, -2] | short[:, -2]).sum())
+
+    def job_cold():
+        # A fresh venue has empty caches and store, like the very first scan
+        shutil.rmtree(os.environ['CANDLE_STORE_PATH'], ignore_errors=True)
+        live = Replay(universe, latency=latency)
+        state['venue'] = Venue(ReplayAdapter(live), OfflineCoinGecko())
+        state['venue'].set_clock(live.now_ms)
+        state['replay'] = live
+        sender = NullSender()
+        scan_venue(state['venue'], sender)
+        return sender.messages
+
+    def job_warm():
+        # One more candle closed since the cold scan, caches only need the newest bar and
+        # the pre-filter skips pairs far from the thresholds
+        state['replay'].advance()
+        sender = NullSender()
+        scan_venue(state['venue'], sender)
+        return sender.messages
+
+    return {
+        'dataframe': dataframe, 'indicators': indicators, 'td': td, 'signal': signal,
+        'candles': candles, 'arrays': arrays, 'batch': batch, 'job_cold': job_cold, 'job_warm': job_warm,
+    }
+
+def run_size(fixture, size, repeat, latency, trace_memory):
+    timings = {stage: [] for stage in STAGES}
+    outputs = {}
+    peaks = {}
+    quiet = io.StringIO()
+    for attempt in range(repeat + trace_memory):
+        traced = attempt == repeat
+        stages = pipeline_stages(fixture, size, latency)
+        for stage in STAGES:
+            with contextlib.redirect_stdout(quiet):
+                if traced:
+                    # Separate pass, tracemalloc slows everything down
+                    tracemalloc.start()
+                    stages[stage]()
+                    peaks[stage] = tracemalloc.get_traced_memory()[1]
+                    tracemalloc.stop()
+                else:
+                    start = time.perf_counter()
+                    outputs[stage] = stages[stage]()
+                    timings[stage].append(time.perf_counter() - start)
+        quiet.seek(0)
+        quiet.truncate()
+
+    results = {}
+    for stage in STAGES:
+        results[stage] = {
+            'median': statistics.median(timings[stage]),
+            'min': min(timings[stage]),
+            'output': outputs[stage],
+        }
+        if stage in peaks:
+            results[stage]['peak_mb'] = peaks[stage] / 1024 / 1024
+    return results
+
+def print_results(size, results, baseline=None):
+    print(f"\n{size} symbols")
+    print(f"{'stage':<12}{'median':>11}{'min':>11}{'peak MB':>10}{'output':>8}{'vs base':>10}")
+    for stage, result in results.items():
+        peak = f"{result['peak_mb']:.1f}" if 'peak_mb' in result else '-'
+        change = ''
+        reference = (baseline or {}).get(str(size), {}).get(stage)
+        if reference:
+            change = f"{(result['median'] / reference['median'] - 1) * 100:+.0f}%"
+        print(
+            f"{stage:<12}{result['median'] * 1000:>9.1f}ms{result['min'] * 1000:>9.1f}ms"
+            f"{peak:>10}{result['output']:>8}{change:>10}"
+        )
+
+def regressions(all_results, baseline, tolerance):
+    found = []
+    for size, results in all_results.items():
+        for stage, result in results.items():
+            reference = baseline.get(size, {}).get(stage)
+            if reference and result['median'] > reference['median'] * (1 + tolerance):
+                found.append(f"{stage} at {size} symbols: {reference['median'] * 1000:.1f}ms -> {result['median'] * 1000:.1f}ms")
+    return found
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the scanner pipeline against recorded exchange responses")
+    parser.add_argument('--fixture', default=DEFAULT_FIXTURE, help="Recording from python -m benchmarks.fixtures record")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES), help="Universe sizes to run")
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per size, the median is reported")
+    parser.add_argument('--latency', type=float, default=0, help="Simulated seconds per exchange request in the job stages")
+    parser.add_argument('--no-memory', action='store_true', help="Skip the tracemalloc pass")
+    parser.add_argument('--save', help="Write the results to this JSON file")
+    parser.add_argument('--baseline', help="Compare against a JSON file written by --save")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed slowdown against the baseline")
+    args = parser.parse_args()
+
+    if os.path.exists(args.fixture):
+        fixture = load_fixture(args.fixture)
+        print(f"Replaying {len(fixture['ohlcv'])} recorded symbols from {args.fixture}")
+    else:
+        print(f"{args.fixture} not found, using seeded synthetic candles (record one with python -m benchmarks.fixtures record)")
+        fixture = synthetic()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+
+    all_results = {}
+    for size in args.sizes:
+        results = run_size(fixture, size, args.repeat, args.latency, not args.no_memory)
+        all_results[str(size)] = results
+        print_results(size, results, baseline)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'created_at': time.time(), 'fixture': args.fixture, 'results': all_results}, f, indent=2)
+        print(f"\nSaved results to {args.save}")
+
+    if baseline:
+        found = regressions(all_results, baseline, args.tolerance)
+        if found:
+            print(f"\nSlower than the baseline by more than {args.tolerance:.0%}:")
+            for line in found:
+                print(f"  {line}")
+            sys.exit(1)
+        print("\nNo regressions against the baseline.")
+
+if __name__ == "__main__":
+    main()
@@ -1,40 +1,79 @@
+import multiprocessing
 import threading
 import time
 import os
-from flask import Flask
-from src.main import job
-from src.telegram_sender import TelegramSender
+from flask import Flask, Response, jsonify
+from src.metrics import metrics
+from src.startup import Startup
 
 app = Flask(__name__)
 
 # Global variable to control the loop
 running = True
+# Set once the bot thread has started, with several Gunicorn workers only the leader scans
+leader = None
+# ccxt, telegram and markets are loaded by the bot thread, so health checks answer right away
+startup = Startup()
 
 def run_bot():
+    global leader
     print("Bot thread started...")
-    sender = TelegramSender()
-    startup_msg = "🚀 rsi_mfi_scanner Bot Started Scanning (Server Mode)"
-    try:
-        sender.send_message(startup_msg)
-    except Exception as e:
-        print(f"Failed to send startup message: {e}")
-    
-    sent_alerts = {}
-    
     while running:
         try:
-            print("Running scan job...")
-            job(sent_alerts)
-            print("Scan job finished. Waiting 5 minutes...")
-            time.sleep(300) # 5 minutes sleep
+            service = startup.load()
+            break
+        except Exception:
+            time.sleep(60) # Wait 1 minute before retrying the startup
+
+    from src.main import run_scheduled, run_stream
+    from src.config import STREAM_MODE_ENABLED
+    from src.state_store import LeaderLock
+    sender = service.sender
+    leader = LeaderLock(service.state, on_elected=service.reload_state)
+    leader.keep_alive()
+    announced = False
+
+    while running:
+        try:
+            if not leader.is_leader:
+                time.sleep(leader.ttl / 3)
+                continue
+            if not announced:
+                announced = True
+                startup_msg = "🚀 rsi_mfi_scanner Bot Started Scanning (Server Mode)"
+                try:
+                    sender.send_message(startup_msg)
+                except Exception as e:
+                    print(f"Failed to send startup message: {e}")
+
+            if STREAM_MODE_ENABLED:
+                run_stream(leader)
+                continue
+
+            wait_seconds = run_scheduled(service.scheduler)
+            print(f"Waiting {wait_seconds}s for the next scan...")
+            time.sleep(wait_seconds)
         except Exception as e:
             print(f"Error in bot loop: {e}")
             time.sleep(60) # Wait 1 minute on error before retrying
 
 @app.route('/')
 def health_check():
+    # Liveness only, see /ready for whether the scanner is loaded
     return "Bot is running!", 200
 
+@app.route('/ready')
+def readiness():
+    return jsonify(startup.status()), 200 if startup.ready.is_set() else 503
+
+@app.route('/metrics')
+def prometheus_metrics():
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/status')
+def status():
+    return jsonify({'running': running, 'leader': bool(leader and leader.is_leader), 'startup': startup.status(), **metrics.status()})
+
 def start_bot_thread():
     thread = threading.Thread(target=run_bot)
     thread.daemon = True
@@ -45,6 +84,7 @@ if __name__ == "__main__":
     # Get port from environment variable for Render
     port = int(os.environ.get("PORT", 10000))
     app.run(host="0.0.0.0", port=port)
-else:
-    # Start thread when imported by Gunicorn
+elif multiprocessing.parent_process() is None:
+    # Start thread when imported by Gunicorn, but not when a spawned shard worker
+    # re-imports this module as __mp_main__
     start_bot_thread()
@@ -0,0 +1,87 @@
+import asyncio
+import time
+from src.exchanges import BybitAdapter
+from src.metrics import metrics
+from src.config import TIMEFRAME, CANDLE_HISTORY_LIMIT, SCAN_CONCURRENCY
+
+class AsyncScanner:
+    def __init__(self, adapter=None, concurrency=SCAN_CONCURRENCY, candle_cache=None):
+        # Requests are paced by the adapter's rate limiter, shared with the venue's sync client
+        self.adapter = adapter or BybitAdapter()
+        self.concurrency = concurrency
+        self.candle_cache = candle_cache
+        # Client and event loop are kept across scans so the HTTP session and markets stay warm
+        self.loop = None
+        self.exchange = None
+        self.markets = None
+
+    def create_exchange(self):
+        return self.adapter.create_async_exchange()
+
+    def get_exchange(self):
+        if self.exchange is None:
+            self.exchange = self.create_exchange()
+            if self.markets:
+                self.exchange.set_markets(self.markets)
+        return self.exchange
+
+    def set_markets(self, markets):
+        """Share markets already loaded by the sync client instead of downloading them again"""
+        self.markets = markets
+        if self.exchange is not None:
+            self.exchange.set_markets(markets)
+
+    async def fetch_ohlcv(self, exchange, symbol, semaphore, limit, timeframe):
+        since = None
+        if self.candle_cache is not None:
+            since, limit = self.candle_cache.fetch_params(symbol, timeframe, limit)
+        # Venues cap the candles per request, let ccxt page through longer histories
+        params = {'paginate': True} if limit > self.adapter.max_candles_per_request else {}
+        async with semaphore:
+            try:
+                with metrics.timer('ohlcv_request_seconds', venue=self.adapter.name):
+                    ohlcv = await exchange.fetch_ohlcv(symbol, timeframe=timeframe, since=since, limit=limit, params=params)
+                return symbol, ohlcv
+            except Exception as e:
+                print(f"Error fetching OHLCV for {symbol}: {e}")
+                return symbol, None
+
+    async def fetch_all_ohlcv_async(self, symbols, limit=CANDLE_HISTORY_LIMIT, timeframe=TIMEFRAME):
+        exchange = self.get_exchange()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        # Load markets up front (a no-op once shared) so the concurrent fetches don't race to do it
+        if not exchange.markets:
+            await exchange.load_markets()
+        results = await asyncio.gather(*[
+            self.fetch_ohlcv(exchange, symbol, semaphore, limit, timeframe)
+            for symbol in symbols
+        ])
+
+        if self.candle_cache is None:
+            return {symbol: ohlcv for symbol, ohlcv in results if ohlcv}
+        # Merge the new bars and hand back the full cached history
+        return {
+            symbol: self.candle_cache.update(symbol, timeframe, ohlcv)
+            for symbol, ohlcv in results if ohlcv is not None
+        }
+
+    def fetch_all_ohlcv(self, symbols, limit=CANDLE_HISTORY_LIMIT, timeframe=TIMEFRAME):
+        """Fetch OHLCV for all symbols concurrently"""
+        start = time.time()
+        if self.loop is None:
+            self.loop = asyncio.new_event_loop()
+        try:
+            candles = self.loop.run_until_complete(self.fetch_all_ohlcv_async(symbols, limit, timeframe))
+        except Exception as e:
+            print(f"Error in async OHLCV fetch: {e}")
+            return {}
+        print(f"Fetched {self.adapter.label} OHLCV for {len(candles)}/{len(symbols)} pairs in {time.time() - start:.1f}s")
+        return candles
+
+    def close(self):
+        if self.exchange is not None:
+            self.loop.run_until_complete(self.exchange.close())
+            self.exchange = None
+        if self.loop is not None:
+            self.loop.close()
+            self.loop = None
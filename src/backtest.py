@@ -0,0 +1,149 @@
+import argparse
+import os
+import numpy as np
+import pandas as pd
+from src.config import (
+    TIMEFRAME,
+    RSI_OVERSOLD, MFI_OVERSOLD, RSI_OVERBOUGHT, MFI_OVERBOUGHT,
+    PSAR_ENABLED, PSAR_AF, PSAR_MAX, PSAR_CONSECUTIVE_BARS, TD_SEQ_ENABLED
+)
+from src.batch_indicators import build_panel, compute_indicators, signal_masks
+from src.candle_store import CandleStore, to_rows
+
+DEFAULT_HORIZONS = (1, 4, 16)  # Bars after the signal to measure the return at
+
+# Strategy parameters, same names as the signal_masks / compute_indicators arguments
+DEFAULT_PARAMS = {
+    'rsi_oversold': RSI_OVERSOLD,
+    'mfi_oversold': MFI_OVERSOLD,
+    'rsi_overbought': RSI_OVERBOUGHT,
+    'mfi_overbought': MFI_OVERBOUGHT,
+    'psar_enabled': PSAR_ENABLED,
+    'psar_af': PSAR_AF,
+    'psar_max': PSAR_MAX,
+    'psar_bars': PSAR_CONSECUTIVE_BARS,
+    'td_enabled': TD_SEQ_ENABLED,
+}
+INDICATOR_PARAMS = ('psar_af', 'psar_max')
+
+def read_candle_file(path):
+    """OHLCV rows (timestamp ms, open, high, low, close, volume) from a CSV or Parquet file"""
+    if path.endswith('.parquet'):
+        df = pd.read_parquet(path)
+    else:
+        df = pd.read_csv(path)
+    df.columns = [str(column).lower() for column in df.columns]
+    timestamps = df['timestamp']
+    if not pd.api.types.is_numeric_dtype(timestamps):
+        timestamps = pd.to_datetime(timestamps, utc=True).astype('int64') // 1_000_000
+    rows = np.column_stack([
+        timestamps.to_numpy(dtype=np.float64),
+        df[['open', 'high', 'low', 'close', 'volume']].to_numpy(dtype=np.float64)
+    ])
+    return rows[np.argsort(rows[:, 0], kind='stable')]
+
+def load_candles(data_dir, symbols=None):
+    """Load <SYMBOL>.csv / <SYMBOL>.parquet files from a directory"""
+    candles = {}
+    for name in sorted(os.listdir(data_dir)):
+        symbol, ext = os.path.splitext(name)
+        if ext not in ('.csv', '.parquet'):
+            continue
+        if symbols and symbol not in symbols:
+            continue
+        candles[symbol] = read_candle_file(os.path.join(data_dir, name))
+    return candles
+
+def load_store(timeframe=TIMEFRAME, symbols=None, store=None):
+    """Load the full history of the local candle store"""
+    store = store or CandleStore()
+    candles = {}
+    for symbol in symbols or store.symbols(timeframe):
+        records = store.read(symbol, timeframe)
+        if len(records):
+            candles[symbol] = to_rows(records)
+    return candles
+
+def split_params(params):
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    indicator_params = {key: params.pop(key) for key in INDICATOR_PARAMS}
+    return indicator_params, params
+
+def new_signals(mask):
+    """Keep only the first bar of every run of signals, like live alerts that fire on state changes"""
+    kept = mask.copy()
+    kept[:, 1:] &= ~mask[:, :-1]
+    return kept
+
+def evaluate(indicators, params=None, horizons=DEFAULT_HORIZONS, new_only=False):
+    """Hit rates and forward returns of the signals for already computed indicators"""
+    _, mask_params = split_params(params)
+    long, short, _ = signal_masks(indicators, **mask_params)
+    close = indicators['close']
+
+    stats = {}
+    if new_only:
+        long, short = new_signals(long), new_signals(short)
+    sides = {
+        'LONG': (long, 1.0),
+        'SHORT': (short, -1.0),
+    }
+    for side, (mask, direction) in sides.items():
+        rows, cols = np.nonzero(mask)
+        side_stats = {'signals': len(rows), 'horizons': {}}
+        for h in horizons:
+            valid = cols + h < close.shape[1]
+            entry = close[rows[valid], cols[valid]]
+            exit_ = close[rows[valid], cols[valid] + h]
+            returns = direction * (exit_ / entry - 1)
+            returns = returns[~np.isnan(returns)]
+            side_stats['horizons'][h] = {
+                'count': len(returns),
+                'hit_rate': float((returns > 0).mean()) if len(returns) else float('nan'),
+                'mean': float(returns.mean()) if len(returns) else float('nan'),
+                'median': float(np.median(returns)) if len(returns) else float('nan'),
+            }
+        stats[side] = side_stats
+    return stats
+
+def run_backtest(candles, params=None, horizons=DEFAULT_HORIZONS, new_only=False):
+    """Replay stored candles through the live signal rules"""
+    indicator_params, _ = split_params(params)
+    symbols, timestamps, panel = build_panel(candles, bars=None)
+    if not symbols:
+        return {}
+    indicators = compute_indicators(timestamps, panel, **indicator_params)
+    return evaluate(indicators, params, horizons, new_only)
+
+def print_report(stats):
+    for side, side_stats in stats.items():
+        print(f"{side}: {side_stats['signals']} signals")
+        for h, s in side_stats['horizons'].items():
+            print(
+                f"  +{h:>3} bars: hit rate {s['hit_rate']:.1%}, "
+                f"mean {s['mean']:+.3%}, median {s['median']:+.3%} (n={s['count']})"
+            )
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest the RSI/MFI strategy on stored candles")
+    parser.add_argument('data_dir', nargs='?', help="Directory with <SYMBOL>.csv or <SYMBOL>.parquet OHLCV files, defaults to the local candle store")
+    parser.add_argument('--symbols', nargs='*', help="Only these symbols (file names without extension)")
+    parser.add_argument('--horizons', nargs='*', type=int, default=list(DEFAULT_HORIZONS))
+    parser.add_argument('--all-bars', action='store_true', help="Count every bar that signals, not only the first one of a run")
+    for name, default in DEFAULT_PARAMS.items():
+        if isinstance(default, bool):
+            parser.add_argument(f"--{name.replace('_', '-')}", type=lambda v: v.lower() in ('1', 'true', 'yes'), default=default)
+        else:
+            parser.add_argument(f"--{name.replace('_', '-')}", type=type(default), default=default)
+    args = parser.parse_args()
+
+    if args.data_dir:
+        candles = load_candles(args.data_dir, args.symbols)
+    else:
+        candles = load_store(TIMEFRAME, args.symbols)
+    print(f"Loaded {len(candles)} symbols from {args.data_dir or 'the candle store'}")
+    params = {name: getattr(args, name) for name in DEFAULT_PARAMS}
+    print_report(run_backtest(candles, params, args.horizons, not args.all_bars))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+import numpy as np
+from src.config import (
+    CANDLE_HISTORY_LIMIT, RSI_PERIOD, MFI_PERIOD,
+    RSI_OVERSOLD, MFI_OVERSOLD, RSI_OVERBOUGHT, MFI_OVERBOUGHT,
+    PSAR_ENABLED, PSAR_AF, PSAR_MAX, PSAR_CONSECUTIVE_BARS,
+    TD_SEQ_ENABLED
+)
+from src.td_sequential import td_setup_counts
+
+ADX_PERIOD = 14
+DAY_MS = 86400000
+FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+def build_panel(candles_by_symbol, bars=CANDLE_HISTORY_LIMIT):
+    """Stack per-symbol OHLCV rows into one (symbols x bars x fields) array aligned on timestamps
+
+    Only the last `bars` timestamps are kept, pass bars=None to keep the full history.
+    """
+    symbols = []
+    arrays = []
+    for symbol, ohlcv in candles_by_symbol.items():
+        rows = np.asarray(ohlcv, dtype=np.float64)
+        if rows.ndim == 2 and len(rows):
+            symbols.append(symbol)
+            arrays.append(rows)
+    if not arrays:
+        return [], np.empty(0, dtype=np.int64), np.empty((0, 0, len(FIELDS)))
+
+    timestamps = np.unique(np.concatenate([rows[:, 0] for rows in arrays]))
+    if bars:
+        timestamps = timestamps[-bars:]
+    panel = np.full((len(arrays), len(timestamps), len(FIELDS)), np.nan)
+    for i, rows in enumerate(arrays):
+        rows = rows[rows[:, 0] >= timestamps[0]]
+        panel[i, np.searchsorted(timestamps, rows[:, 0])] = rows[:, 1:6]
+    return symbols, timestamps.astype(np.int64), panel
+
+def rma(x, length):
+    """pandas_ta rma (adjusted EWM, alpha = 1 / length) along the bar axis of a 2-D array"""
+    decay = 1.0 - 1.0 / length
+    num = np.zeros(x.shape[0])
+    den = np.zeros(x.shape[0])
+    count = np.zeros(x.shape[0])
+    out = np.full(x.shape, np.nan)
+    for t in range(x.shape[1]):
+        valid = ~np.isnan(x[:, t])
+        num = num * decay + np.where(valid, x[:, t], 0.0)
+        den = den * decay + valid
+        count += valid
+        with np.errstate(invalid='ignore', divide='ignore'):
+            out[:, t] = np.where(count >= length, num / den, np.nan)
+    return out
+
+def rolling_sum(x, length):
+    """Trailing window sum along the bar axis, NaN until the window holds `length` valid values"""
+    filled = np.nan_to_num(x)
+    csum = np.cumsum(filled, axis=1)
+    cvalid = np.cumsum(~np.isnan(x), axis=1)
+    out = csum.copy()
+    out[:, length:] -= csum[:, :-length]
+    valid = cvalid.copy()
+    valid[:, length:] -= cvalid[:, :-length]
+    out[valid < length] = np.nan
+    return out
+
+def shift(x, periods=1):
+    out = np.full(x.shape, np.nan)
+    out[:, periods:] = x[:, :-periods]
+    return out
+
+def average_gain_loss(close, length=RSI_PERIOD):
+    """Wilder averages of up and down moves, the state behind RSI"""
+    diff = close - shift(close)
+    gain = rma(np.where(diff > 0, diff, np.where(np.isnan(diff), np.nan, 0.0)), length)
+    loss = rma(np.where(diff < 0, -diff, np.where(np.isnan(diff), np.nan, 0.0)), length)
+    return gain, loss
+
+def rsi(close, length=RSI_PERIOD):
+    gain, loss = average_gain_loss(close, length)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return 100 * gain / (gain + loss)
+
+def mfi(high, low, close, volume, length=MFI_PERIOD):
+    typical_price = (high + low + close) / 3.0
+    raw_flow = typical_price * volume
+    tp_diff = typical_price - shift(typical_price)
+    missing = np.isnan(raw_flow)
+    positive = np.where(tp_diff > 0, raw_flow, np.where(missing, np.nan, 0.0))
+    negative = np.where(tp_diff < 0, raw_flow, np.where(missing, np.nan, 0.0))
+    pos_sum = rolling_sum(positive, length)
+    neg_sum = rolling_sum(negative, length)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return 100 * pos_sum / (pos_sum + neg_sum)
+
+def vwap(timestamps, high, low, close, volume):
+    """Daily anchored VWAP, bars share one timestamp grid so the day boundaries are common"""
+    day = timestamps // DAY_MS
+    idx = np.arange(len(timestamps))
+    seg_start = np.maximum.accumulate(np.where(np.r_[True, day[1:] != day[:-1]], idx, 0))
+
+    def day_cumsum(x):
+        csum = np.cumsum(np.nan_to_num(x), axis=1)
+        base = np.where(seg_start > 0, csum[:, seg_start - 1], 0.0)
+        return csum - base
+
+    price_volume = (high + low + close) / 3.0 * volume
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out = day_cumsum(price_volume) / day_cumsum(volume)
+    out[np.isnan(price_volume)] = np.nan
+    return out
+
+def adx(high, low, close, length=ADX_PERIOD):
+    prev_close = shift(close)
+    true_range = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    true_range[np.isnan(prev_close)] = np.nan
+    up = high - shift(high)
+    down = shift(low) - low
+    missing = np.isnan(up) | np.isnan(down)
+    plus = np.where(missing, np.nan, np.where((up > down) & (up > 0), up, 0.0))
+    minus = np.where(missing, np.nan, np.where((down > up) & (down > 0), down, 0.0))
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        k = 100 / rma(true_range, length)
+        dmp = k * rma(plus, length)
+        dmn = k * rma(minus, length)
+        dx = 100 * np.abs(dmp - dmn) / (dmp + dmn)
+    return rma(dx, length), dmp, dmn
+
+def psar(high, low, close, af0=PSAR_AF, max_af=PSAR_MAX):
+    """Parabolic SAR for all symbols at once, stepping bars in time and symbols as vectors"""
+    n_symbols, n_bars = close.shape
+    out = np.full(close.shape, np.nan)
+    sar = np.zeros(n_symbols)
+    ep = np.zeros(n_symbols)
+    af = np.full(n_symbols, af0)
+    falling = np.zeros(n_symbols, dtype=bool)
+    seen = np.zeros(n_symbols, dtype=np.int64)
+    prev_high = np.zeros(n_symbols)
+    prev_low = np.zeros(n_symbols)
+    older_high = np.zeros(n_symbols)
+    older_low = np.zeros(n_symbols)
+
+    for t in range(n_bars):
+        h, l, c = high[:, t], low[:, t], close[:, t]
+        valid = ~np.isnan(c)
+        first = valid & (seen == 0)
+        second = valid & (seen == 1)
+        step = valid & (seen >= 1)
+
+        # Each symbol's first bar seeds the state, its second one fixes the initial direction
+        sar = np.where(first, c, sar)
+        older_high = np.where(first, h, older_high)
+        older_low = np.where(first, l, older_low)
+        up = h - prev_high
+        down = prev_low - l
+        start_falling = (down > up) & (down > 0)
+        falling = np.where(second, start_falling, falling)
+        ep = np.where(second, np.where(start_falling, prev_low, prev_high), ep)
+
+        candidate = sar + af * (ep - sar)
+        reverse = np.where(falling, h > candidate, l < candidate)
+        extends = np.where(falling, l < ep, h > ep)
+        new_ep = np.where(extends, np.where(falling, l, h), ep)
+        new_af = np.where(extends, np.minimum(af + af0, max_af), af)
+        candidate = np.where(
+            falling,
+            np.maximum(np.maximum(prev_high, older_high), candidate),
+            np.minimum(np.minimum(prev_low, older_low), candidate)
+        )
+        candidate = np.where(reverse, new_ep, candidate)
+        new_af = np.where(reverse, af0, new_af)
+        new_falling = falling ^ reverse
+        new_ep = np.where(reverse, np.where(new_falling, l, h), new_ep)
+
+        sar = np.where(step, candidate, sar)
+        ep = np.where(step, new_ep, ep)
+        af = np.where(step, new_af, af)
+        falling = np.where(step, new_falling, falling)
+        out[:, t] = np.where(step, candidate, np.nan)
+
+        older_high = np.where(step, prev_high, older_high)
+        older_low = np.where(step, prev_low, older_low)
+        prev_high = np.where(valid, h, prev_high)
+        prev_low = np.where(valid, l, prev_low)
+        seen += valid
+    return out
+
+def compute_indicators(timestamps, panel, psar_af=PSAR_AF, psar_max=PSAR_MAX):
+    """Calculate every indicator for the whole panel, returns (symbols x bars) arrays by column name"""
+    high, low, close, volume = panel[:, :, 1], panel[:, :, 2], panel[:, :, 3], panel[:, :, 4]
+    indicators = {
+        'close': close,
+        'RSI': rsi(close),
+        'MFI': mfi(high, low, close, volume),
+        'VWAP': vwap(timestamps, high, low, close, volume),
+    }
+    indicators[f'ADX_{ADX_PERIOD}'], indicators[f'DMP_{ADX_PERIOD}'], indicators[f'DMN_{ADX_PERIOD}'] = \
+        adx(high, low, close)
+    if PSAR_ENABLED:
+        indicators['PSAR'] = psar(high, low, close, psar_af, psar_max)
+    if TD_SEQ_ENABLED:
+        indicators['TD_Buy'], indicators['TD_Sell'] = td_setup_counts(close)
+    return indicators
+
+def rolling_all(mask, window):
+    """True where the last `window` bars (inclusive) are all True"""
+    count = np.cumsum(mask, axis=1)
+    count[:, window:] -= count[:, :-window].copy()
+    full = np.zeros(mask.shape, dtype=bool)
+    full[:, window - 1:] = True
+    return (count == window) & full
+
+def rolling_any(mask, window):
+    count = np.cumsum(mask, axis=1)
+    count[:, window:] -= count[:, :-window].copy()
+    return count > 0
+
+def signal_masks(indicators, rsi_oversold=RSI_OVERSOLD, mfi_oversold=MFI_OVERSOLD,
+                 rsi_overbought=RSI_OVERBOUGHT, mfi_overbought=MFI_OVERBOUGHT,
+                 psar_enabled=PSAR_ENABLED, psar_bars=PSAR_CONSECUTIVE_BARS,
+                 td_enabled=TD_SEQ_ENABLED):
+    """Apply the Scanner.analyze_coin rules at every bar
+
+    Returns (long, short, td_13) boolean arrays, td_13 marks signals confirmed
+    by a TD 13 rather than a TD 9.
+    """
+    rsi_, mfi_ = indicators['RSI'], indicators['MFI']
+    with np.errstate(invalid='ignore'):
+        long = (rsi_ < rsi_oversold) & (mfi_ < mfi_oversold)
+        short = ~long & (rsi_ > rsi_overbought) & (mfi_ > mfi_overbought)
+
+        if psar_enabled and 'PSAR' in indicators:
+            close, psar_ = indicators['close'], indicators['PSAR']
+            long &= rolling_all(close < psar_, psar_bars)
+            short &= rolling_all(close > psar_, psar_bars)
+
+    td_13 = np.zeros(long.shape, dtype=bool)
+    if td_enabled and 'TD_Buy' in indicators:
+        # TD 9 or 13 within the last 5 closed candles
+        buy_13 = rolling_any(indicators['TD_Buy'] == 13, 5)
+        sell_13 = rolling_any(indicators['TD_Sell'] == 13, 5)
+        long &= rolling_any(indicators['TD_Buy'] == 9, 5) | buy_13
+        short &= rolling_any(indicators['TD_Sell'] == 9, 5) | sell_13
+        td_13 = (long & buy_13) | (short & sell_13)
+    return long, short, td_13
+
+def screen(candles_by_symbol):
+    """Signals on the last closed candle of every symbol, the batch path without enrichment
+
+    Returns (bar, evaluations, skipped): the open time of that candle, one (symbol, signal, td_note,
+    last_candle) per symbol that has it and the symbols left unevaluated. last_candle holds the
+    indicator values and is only filled in for signals.
+    """
+    symbols, timestamps, panel = build_panel(candles_by_symbol)
+    if not symbols or len(timestamps) < max(RSI_PERIOD, 2):
+        return None, [], symbols
+
+    indicators = compute_indicators(timestamps, panel)
+    long, short, td_13 = signal_masks(indicators)
+
+    # Column -2 is the last closed candle, -1 is still forming
+    evaluations = []
+    skipped = []
+    for i, symbol in enumerate(symbols):
+        if np.isnan(panel[i, -2, 3]) or np.isnan(panel[i, -1, 3]):
+            # Behind the other symbols, its column -2 is missing or still forming, evaluate it again next scan
+            skipped.append(symbol)
+            continue
+        signal = 'LONG' if long[i, -2] else 'SHORT' if short[i, -2] else None
+        td_note = ""
+        last_candle = None
+        if signal:
+            if TD_SEQ_ENABLED:
+                side = "Buy" if signal == 'LONG' else "Sell"
+                td_note = f"TD {side} {13 if td_13[i, -2] else 9}"
+            last_candle = {name: values[i, -2] for name, values in indicators.items()}
+        evaluations.append((symbol, signal, td_note, last_candle))
+    return int(timestamps[-2]), evaluations, skipped
@@ -0,0 +1,103 @@
+import time
+import ccxt
+import numpy as np
+from src.config import CANDLE_HISTORY_LIMIT
+
+class CandleBuffer:
+    """Fixed-size NumPy ring buffer with the most recent candles of one symbol"""
+    def __init__(self, capacity):
+        # Columns: timestamp, open, high, low, close, volume (ms timestamps are exact in float64)
+        self.data = np.zeros((capacity, 6), dtype=np.float64)
+        self.capacity = capacity
+        self.start = 0
+        self.size = 0
+
+    def last_timestamp(self):
+        if self.size == 0:
+            return None
+        return int(self.data[(self.start + self.size - 1) % self.capacity, 0])
+
+    def merge(self, ohlcv):
+        """Merge candles sorted by time, replacing the still-forming last bar"""
+        rows = np.asarray(ohlcv, dtype=np.float64)
+        if rows.size == 0:
+            return
+        last_ts = self.last_timestamp()
+        if last_ts is not None:
+            rows = rows[rows[:, 0] >= last_ts]
+            if len(rows) and rows[0, 0] == last_ts:
+                self.data[(self.start + self.size - 1) % self.capacity] = rows[0]
+                rows = rows[1:]
+        # Only the newest `capacity` rows can survive anyway
+        rows = rows[-self.capacity:]
+        for row in rows:
+            end = (self.start + self.size) % self.capacity
+            self.data[end] = row
+            if self.size < self.capacity:
+                self.size += 1
+            else:
+                self.start = (self.start + 1) % self.capacity
+
+    def to_array(self):
+        """Candles in chronological order"""
+        idx = (self.start + np.arange(self.size)) % self.capacity
+        return self.data[idx]
+
+class CandleCache:
+    """In-memory OHLCV history keyed by symbol and timeframe
+
+    With a CandleStore attached, cold symbols are seeded from disk and every
+    closed candle is persisted, so restarts only fetch what happened meanwhile.
+    """
+    def __init__(self, capacity=CANDLE_HISTORY_LIMIT, store=None):
+        self.capacity = capacity
+        self.buffers = {}
+        self.store = store
+        # Milliseconds on the exchange clock, replaced by the scheduler's skew corrected clock
+        self.clock = lambda: time.time() * 1000
+
+    def fetch_params(self, symbol, timeframe, limit):
+        """Return (since, limit) for the next fetch, only asking for bars we don't have yet"""
+        if (symbol, timeframe) not in self.buffers and self.store is not None:
+            stored = self.store.tail(symbol, timeframe, self.capacity)
+            if len(stored):
+                self.buffers[(symbol, timeframe)] = CandleBuffer(self.capacity)
+                self.buffers[(symbol, timeframe)].merge(stored)
+        buffer = self.buffers.get((symbol, timeframe))
+        last_ts = buffer.last_timestamp() if buffer else None
+        if last_ts is None:
+            return None, limit
+
+        timeframe_ms = ccxt.Exchange.parse_timeframe(timeframe) * 1000
+        missing = int((self.clock() - last_ts) // timeframe_ms) + 1
+        if missing >= limit:
+            # Too far behind, a full refetch is as cheap as filling the gap
+            self.buffers.pop((symbol, timeframe), None)
+            return None, limit
+        # Start at the cached forming bar so it gets replaced by its final values
+        return last_ts, missing + 1
+
+    def update(self, symbol, timeframe, ohlcv):
+        buffer = self.buffers.get((symbol, timeframe))
+        if buffer is None:
+            buffer = CandleBuffer(self.capacity)
+            self.buffers[(symbol, timeframe)] = buffer
+        buffer.merge(ohlcv)
+        rows = buffer.to_array()
+        if self.store is not None and len(rows) > 1:
+            # The last bar is still forming, only closed ones go to disk
+            try:
+                self.store.append(symbol, timeframe, rows[:-1])
+            except Exception as e:
+                print(f"Error writing {symbol} candles to store: {e}")
+        return rows
+
+    def last_timestamp(self, symbol, timeframe):
+        buffer = self.buffers.get((symbol, timeframe))
+        return buffer.last_timestamp() if buffer else None
+
+    def get(self, symbol, timeframe):
+        buffer = self.buffers.get((symbol, timeframe))
+        if buffer is None or buffer.size == 0:
+            return None
+        return buffer.to_array()
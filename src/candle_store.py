@@ -0,0 +1,195 @@
+import argparse
+import os
+import time
+from urllib.parse import quote, unquote
+import ccxt
+import numpy as np
+from src.config import CANDLE_STORE_ENABLED, CANDLE_STORE_PATH, TIMEFRAME
+
+# Fixed-width records so files can be appended to and memory-mapped directly
+CANDLE_DTYPE = np.dtype([
+    ('timestamp', '<i8'), ('open', '<f8'), ('high', '<f8'),
+    ('low', '<f8'), ('close', '<f8'), ('volume', '<f8')
+])
+EMPTY = np.zeros(0, dtype=CANDLE_DTYPE)
+
+def to_records(ohlcv):
+    rows = np.asarray(ohlcv, dtype=np.float64).reshape(-1, 6)
+    records = np.empty(len(rows), dtype=CANDLE_DTYPE)
+    records['timestamp'] = rows[:, 0].astype(np.int64)
+    for i, name in enumerate(CANDLE_DTYPE.names[1:], start=1):
+        records[name] = rows[:, i]
+    return records
+
+def to_rows(records):
+    """Records as the (n x 6) float array used by the candle cache and batch panel"""
+    rows = np.empty((len(records), 6), dtype=np.float64)
+    for i, name in enumerate(CANDLE_DTYPE.names):
+        rows[:, i] = records[name]
+    return rows
+
+class CandleStore:
+    """Closed candles on disk, one append-only file per timeframe and symbol"""
+    def __init__(self, root=CANDLE_STORE_PATH):
+        self.root = root
+        self.last_timestamps = {}
+        self.migrated = set()
+
+    def path(self, symbol, timeframe):
+        # BTC/USDT:USDT -> BTC%2FUSDT%3AUSDT.bin, reversible for any symbol
+        if timeframe not in self.migrated:
+            self.migrate(timeframe)
+        return os.path.join(self.root, timeframe, f"{quote(symbol, safe='')}.bin")
+
+    def migrate(self, timeframe):
+        """Rename files named the old way (BTC_USDT__USDT.bin), which lost any '_' in the symbol"""
+        self.migrated.add(timeframe)
+        directory = os.path.join(self.root, timeframe)
+        if not os.path.isdir(directory):
+            return
+        for name in os.listdir(directory):
+            if name.endswith('.bin') and '_' in name and '%' not in name:
+                symbol = name[:-4].replace('__', ':').replace('_', '/')
+                try:
+                    os.replace(os.path.join(directory, name), os.path.join(directory, f"{quote(symbol, safe='')}.bin"))
+                except OSError:
+                    # Already renamed by another process sharing the store
+                    pass
+
+    def symbols(self, timeframe):
+        if timeframe not in self.migrated:
+            self.migrate(timeframe)
+        directory = os.path.join(self.root, timeframe)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(unquote(name[:-4]) for name in os.listdir(directory) if name.endswith('.bin'))
+
+    def read(self, symbol, timeframe, start=None, end=None):
+        """Memory-mapped records in [start, end), no data is copied"""
+        path = self.path(symbol, timeframe)
+        if not os.path.exists(path) or os.path.getsize(path) < CANDLE_DTYPE.itemsize:
+            return EMPTY
+        records = np.memmap(path, dtype=CANDLE_DTYPE, mode='r')
+        lo = 0 if start is None else int(np.searchsorted(records['timestamp'], start))
+        hi = len(records) if end is None else int(np.searchsorted(records['timestamp'], end))
+        return records[lo:hi]
+
+    def tail(self, symbol, timeframe, count):
+        return to_rows(self.read(symbol, timeframe)[-count:])
+
+    def last_timestamp(self, symbol, timeframe):
+        key = (symbol, timeframe)
+        if key not in self.last_timestamps:
+            records = self.read(symbol, timeframe)
+            self.last_timestamps[key] = int(records['timestamp'][-1]) if len(records) else None
+        return self.last_timestamps[key]
+
+    def append(self, symbol, timeframe, ohlcv):
+        """Append closed candles newer than the last stored one"""
+        records = to_records(ohlcv)
+        last_ts = self.last_timestamp(symbol, timeframe)
+        if last_ts is not None:
+            records = records[records['timestamp'] > last_ts]
+        if not len(records):
+            return 0
+        path = self.path(symbol, timeframe)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'ab') as f:
+            f.write(records.tobytes())
+        self.last_timestamps[(symbol, timeframe)] = int(records['timestamp'][-1])
+        return len(records)
+
+    def write(self, symbol, timeframe, ohlcv):
+        """Merge candles anywhere in the history (gap fills), rewriting the file atomically"""
+        merged = np.concatenate([np.array(self.read(symbol, timeframe)), to_records(ohlcv)])
+        # On duplicate timestamps the newly written candle wins
+        _, keep = np.unique(merged['timestamp'][::-1], return_index=True)
+        merged = merged[::-1][keep]
+        path = self.path(symbol, timeframe)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(merged.tobytes())
+        os.replace(tmp_path, path)
+        self.last_timestamps[(symbol, timeframe)] = int(merged['timestamp'][-1]) if len(merged) else None
+
+    def gaps(self, symbol, timeframe):
+        """(start, end) timestamp ranges of missing candles inside the stored history"""
+        timeframe_ms = ccxt.Exchange.parse_timeframe(timeframe) * 1000
+        timestamps = self.read(symbol, timeframe)['timestamp']
+        if len(timestamps) < 2:
+            return []
+        breaks = np.flatnonzero(np.diff(timestamps) > timeframe_ms)
+        return [(int(timestamps[i]) + timeframe_ms, int(timestamps[i + 1])) for i in breaks]
+
+def create_store(adapter):
+    """The store of one venue, None when CANDLE_STORE_ENABLED is off"""
+    if not CANDLE_STORE_ENABLED:
+        return None
+    if adapter.store_subdir:
+        return CandleStore(os.path.join(CANDLE_STORE_PATH, adapter.store_subdir))
+    return CandleStore()
+
+def fetch_range(exchange, symbol, timeframe, since, until):
+    """Page through fetch_ohlcv for [since, until), only closed candles"""
+    timeframe_ms = ccxt.Exchange.parse_timeframe(timeframe) * 1000
+    now = exchange.milliseconds()
+    rows = []
+    while since < until:
+        batch = exchange.fetch_ohlcv(symbol, timeframe=timeframe, since=since, limit=1000)
+        if not batch:
+            break
+        rows.extend(row for row in batch if row[0] < until and row[0] + timeframe_ms <= now)
+        next_since = batch[-1][0] + timeframe_ms
+        if next_since <= since:
+            break
+        since = next_since
+    return rows
+
+def backfill(store, exchange, symbols, timeframe, days):
+    """Fill the last `days` of history and every gap inside the stored history"""
+    timeframe_ms = ccxt.Exchange.parse_timeframe(timeframe) * 1000
+    now = exchange.milliseconds()
+    start = now - days * 86400000
+    start -= start % timeframe_ms
+
+    for i, symbol in enumerate(symbols, start=1):
+        try:
+            records = store.read(symbol, timeframe)
+            ranges = []
+            if not len(records):
+                ranges.append((start, now))
+            else:
+                if records['timestamp'][0] > start:
+                    ranges.append((start, int(records['timestamp'][0])))
+                ranges.extend(store.gaps(symbol, timeframe))
+                ranges.append((int(records['timestamp'][-1]) + timeframe_ms, now))
+
+            rows = []
+            for since, until in ranges:
+                rows.extend(fetch_range(exchange, symbol, timeframe, since, until))
+            if rows:
+                store.write(symbol, timeframe, rows)
+            print(f"[{i}/{len(symbols)}] {symbol}: {len(rows)} candles added")
+        except Exception as e:
+            print(f"Error backfilling {symbol}: {e}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Local candle store maintenance")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    backfill_parser = subparsers.add_parser('backfill', help="Download missing history into the store")
+    backfill_parser.add_argument('--days', type=int, default=30)
+    backfill_parser.add_argument('--timeframe', default=TIMEFRAME)
+    backfill_parser.add_argument('--symbols', nargs='*', help="Defaults to every pair passing the volume filter")
+    args = parser.parse_args()
+
+    # Imported here so reading the store (backtests) doesn't load the exchange clients
+    from src.scanner import Scanner
+    scanner = Scanner()
+    symbols = args.symbols or scanner.get_tickers() or []
+    started = time.time()
+    backfill(CandleStore(), scanner.exchange, symbols, args.timeframe, args.days)
+    print(f"Backfill finished in {time.time() - started:.0f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import numpy as np
+
+class Candles:
+    """OHLCV of one symbol as contiguous column arrays, oldest first, the last candle still forming
+
+    Timestamps are int64 milliseconds, prices and volume float64. This is all the hot path
+    needs, a DataFrame is only built by to_dataframe() for debugging and the pandas_ta path.
+    """
+    __slots__ = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+
+    def __init__(self, timestamp, open, high, low, close, volume):
+        self.timestamp = timestamp
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+
+    @classmethod
+    def from_rows(cls, rows):
+        """From ccxt OHLCV rows or a cached (bars x 6) array, None when there are no candles"""
+        if rows is None or len(rows) == 0:
+            return None
+        rows = np.asarray(rows, dtype=np.float64)
+        return cls(
+            rows[:, 0].astype(np.int64),
+            *(np.ascontiguousarray(rows[:, i]) for i in range(1, 6))
+        )
+
+    @classmethod
+    def from_bybit_kline(cls, response):
+        """From the raw /v5/market/kline response, whose rows are newest first and all strings"""
+        rows = response['result']['list']
+        if not rows:
+            return None
+        # [startTime, open, high, low, close, volume, turnover], numpy parses the strings itself
+        values = np.array(rows, dtype=np.float64)[::-1]
+        return cls(
+            values[:, 0].astype(np.int64),
+            *(np.ascontiguousarray(values[:, i]) for i in range(1, 6))
+        )
+
+    def __len__(self):
+        return len(self.timestamp)
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in self.__slots__)
+
+    def rows(self):
+        """(bars x 6) float64 array in the CandleCache and CandleStore layout"""
+        return np.column_stack([self.timestamp, self.open, self.high, self.low, self.close, self.volume])
+
+    def to_dataframe(self):
+        import pandas as pd
+        df = pd.DataFrame({
+            'open': self.open, 'high': self.high, 'low': self.low,
+            'close': self.close, 'volume': self.volume,
+        }, index=pd.to_datetime(self.timestamp, unit='ms'))
+        df.index.name = 'timestamp'
+        return df
@@ -1,65 +1,171 @@
+import re
+import threading
 import requests
 import time
+from src.coingecko_store import CoinGeckoStore
+from src.metrics import instrument_session
+from src.config import (
+    COINGECKO_DB_PATH, COINGECKO_REFRESH_SECONDS, COINGECKO_POLL_SECONDS, COINGECKO_MARKETS_PAGES,
+    COINGECKO_DETAILS_TTL, COINGECKO_MARKETS_TTL, COINGECKO_REQUEST_INTERVAL
+)
 
 class CoinGeckoManager:
-    def __init__(self):
+    def __init__(self, db_path=COINGECKO_DB_PATH):
         self.base_url = "https://api.coingecko.com/api/v3"
-        self.coin_map = {}
-        self.last_update = 0
+        # One session so connections are reused between requests
+        self.session = instrument_session(requests.Session(), 'coingecko')
         self.update_interval = 86400 # Update map once a day
-        
-        # Cache for coin details: {coin_id: (data, timestamp)}
-        self.details_cache = {}
-        self.cache_duration = 3600 # 1 hour cache for details
-        
+
+        # Symbol map, market data and details are persisted so they survive restarts
+        self.store = CoinGeckoStore(db_path)
+        self.cache_duration = 3600 # Market cap / rank older than 1 hour is refreshed
+        self.details_ttl = COINGECKO_DETAILS_TTL # Categories and descriptions rarely change
+
+        # When the background refresher runs, lookups never touch the network
+        self.background_thread = None
+        self.pending_ids = set()
+        self.pending_lock = threading.Lock()
+
     def update_coin_map(self):
         """Fetch coin list and create a symbol -> id map"""
         try:
             # Check if update is needed
-            if time.time() - self.last_update < self.update_interval and self.coin_map:
+            if time.time() - self.store.get_meta('coin_list_updated') < self.update_interval:
                 return
 
             print("Updating CoinGecko coin list...")
             url = f"{self.base_url}/coins/list"
-            response = requests.get(url)
+            response = self.session.get(url, timeout=30)
             if response.status_code == 200:
-                data = response.json()
-                # Create map: symbol (lowercase) -> id
-                # Note: There are duplicates (e.g. multiple coins with symbol 'ETH'). 
-                # We usually take the one with highest rank, but this list doesn't have rank.
-                # We'll just take the first one or try to match exact names if possible.
-                # For better accuracy, we might need to check 'coins/markets' but that's heavy.
-                # Let's stick to simple mapping for now.
-                self.coin_map = {item['symbol'].lower(): item['id'] for item in data}
-                self.last_update = time.time()
+                # There are duplicate symbols (e.g. multiple coins with symbol 'ETH') and this list
+                # has no rank, ranked entries from /coins/markets take precedence in the store
+                self.store.save_coin_list(response.json())
+                self.store.set_meta('coin_list_updated', time.time())
                 print("CoinGecko map updated.")
             else:
                 print(f"Failed to fetch CoinGecko list: {response.status_code}")
         except Exception as e:
             print(f"Error updating CoinGecko map: {e}")
 
-    def get_coin_details(self, symbol):
-        """Get coin details by symbol (e.g., BTC)"""
+    def get_markets(self, **params):
+        """One /coins/markets page of up to 250 coins, None on errors and rate limits"""
+        response = self.session.get(f"{self.base_url}/coins/markets", params={
+            'vs_currency': 'usd',
+            'per_page': 250,
+            'sparkline': 'false',
+            **params
+        }, timeout=30)
+        if response.status_code == 429:
+            print("CoinGecko Rate Limit Hit! Stopping market prefetch.")
+            return None
+        if response.status_code != 200:
+            print(f"CoinGecko API Error: {response.status_code}")
+            return None
+        return response.json()
+
+    def prefetch_markets(self, pages=COINGECKO_MARKETS_PAGES):
+        """Bulk load market cap and rank for the top coins, 250 per request"""
+        for page in range(1, pages + 1):
+            try:
+                items = self.get_markets(order='market_cap_desc', page=page)
+                if not items:
+                    return
+                self.store.save_markets(items)
+            except Exception as e:
+                print(f"Error prefetching CoinGecko markets: {e}")
+                return
+            time.sleep(COINGECKO_REQUEST_INTERVAL)
+
+    def prefetch_markets_by_id(self, coin_ids):
+        """Market cap and rank of coins outside the prefetched pages, 250 per request"""
+        coin_ids = sorted(coin_ids)
+        for start in range(0, len(coin_ids), 250):
+            try:
+                items = self.get_markets(ids=",".join(coin_ids[start:start + 250]))
+                if items is None:
+                    return
+                self.store.save_markets(items)
+            except Exception as e:
+                print(f"Error prefetching CoinGecko markets: {e}")
+                return
+            time.sleep(COINGECKO_REQUEST_INTERVAL)
+
+    def prefetch_details(self, symbols):
+        """Fetch missing or expired details for the given symbols, paced for the free API tier"""
+        coin_ids = {self.resolve_coin_id(symbol) for symbol in symbols}
+        with self.pending_lock:
+            coin_ids |= self.pending_ids
+            self.pending_ids = set()
+
+        now = time.time()
+        stale_details = []
+        stale_markets = []
+        for coin_id in coin_ids:
+            if not coin_id:
+                continue
+            details = self.store.get_details(coin_id)
+            if details is None or now - details[2] >= self.details_ttl:
+                # The details request brings the market data along
+                stale_details.append(coin_id)
+                continue
+            market = self.store.get_market(coin_id)
+            if market is None or now - market[2] >= self.cache_duration:
+                stale_markets.append(coin_id)
+
+        self.prefetch_markets_by_id(stale_markets)
+        for index, coin_id in enumerate(stale_details):
+            result = self.fetch_coin_details(coin_id)
+            if result is None:
+                # Rate limited, the rest waits for the next poll
+                with self.pending_lock:
+                    self.pending_ids.update(stale_details[index:])
+                return
+            time.sleep(COINGECKO_REQUEST_INTERVAL)
+
+    def refresh(self, symbols):
         self.update_coin_map()
-        
+        self.prefetch_markets()
+        self.prefetch_details(symbols)
+        # Map rows missing from a week of daily coin list updates were delisted on CoinGecko
+        self.store.evict(self.update_interval * 7, COINGECKO_MARKETS_TTL, self.details_ttl)
+
+    def start_background_refresh(self, symbols_provider, interval=COINGECKO_REFRESH_SECONDS,
+                                 poll_interval=COINGECKO_POLL_SECONDS):
+        """Keep the store warm from a daemon thread, symbols_provider returns the scanned symbols"""
+        def run():
+            while True:
+                symbols = symbols_provider()
+                try:
+                    self.refresh(symbols)
+                except Exception as e:
+                    print(f"Error refreshing CoinGecko store: {e}")
+                # Between full refreshes, pick up the pairs of the first scan and coins waiting for details
+                deadline = time.time() + interval
+                while time.time() < deadline:
+                    time.sleep(poll_interval)
+                    if not symbols and symbols_provider():
+                        break
+                    if self.pending_ids:
+                        try:
+                            self.prefetch_details([])
+                        except Exception as e:
+                            print(f"Error refreshing CoinGecko details: {e}")
+
+        self.background_thread = threading.Thread(target=run, daemon=True)
+        self.background_thread.start()
+
+    def resolve_coin_id(self, symbol):
         # Clean symbol (e.g. BTC/USDT -> btc)
         base_symbol = symbol.split('/')[0].lower()
-        
-        coin_id = self.coin_map.get(base_symbol)
-        if not coin_id:
-            # Try some common fixes
-            if base_symbol == '1000pepe': coin_id = 'pepe'
-            # Add more manual mappings if needed
-            
-        if not coin_id:
-            return None
 
-        # Check cache
-        if coin_id in self.details_cache:
-            cached_data, timestamp = self.details_cache[coin_id]
-            if time.time() - timestamp < self.cache_duration:
-                return cached_data
+        coin_id = self.store.get_coin_id(base_symbol)
+        if not coin_id:
+            # Multiplied contracts (1000PEPE, 10000SATS) are listed under the plain symbol
+            coin_id = self.store.get_coin_id(re.sub(r'^1000+', '', base_symbol))
+        return coin_id
 
+    def fetch_coin_details(self, coin_id):
+        """Download /coins/{id} into the store, returns None when rate limited"""
         try:
             url = f"{self.base_url}/coins/{coin_id}"
             params = {
@@ -70,54 +176,70 @@ class CoinGeckoManager:
                 'developer_data': 'false',
                 'sparkline': 'false'
             }
-            
+
             # Single request with timeout, no retries
-            response = requests.get(url, params=params, timeout=5)
-            
+            response = self.session.get(url, params=params, timeout=5)
+
             if response.status_code == 200:
                 data = response.json()
-                
+
                 description = data.get('description', {}).get('en', '')
                 if not description:
                     description = 'Description not found.'
-                
+
                 # Truncate description if too long
                 if len(description) > 500:
                     description = description[:497] + "..."
 
-                result = {
+                self.store.save_details(coin_id, ", ".join(data.get('categories', [])), description)
+                self.store.save_markets([{
+                    'id': coin_id,
+                    'symbol': data.get('symbol', ''),
                     'market_cap': data.get('market_data', {}).get('market_cap', {}).get('usd', 0),
-                    'rank': data.get('market_cap_rank', 'N/A'),
-                    'categories': ", ".join(data.get('categories', [])),
-                    'description': description
-                }
-                
-                # Save to cache
-                self.details_cache[coin_id] = (result, time.time())
-                return result
-                
+                    'market_cap_rank': data.get('market_cap_rank')
+                }])
+                return True
+
             elif response.status_code == 429:
                 print("CoinGecko Rate Limit Hit! Skipping.")
-                return {
-                    'market_cap': 'N/A',
-                    'rank': 'N/A',
-                    'categories': 'N/A',
-                    'description': '⚠️ CoinGecko Rate Limit Hit (Skipped)'
-                }
+                return None
             else:
                 print(f"CoinGecko API Error: {response.status_code}")
-                return {
-                    'market_cap': 'N/A',
-                    'rank': 'N/A',
-                    'categories': 'N/A',
-                    'description': f'⚠️ CoinGecko Error: {response.status_code}'
-                }
-            
+                return False
+
         except Exception as e:
             print(f"Error fetching CoinGecko details: {e}")
-            return {
-                'market_cap': 'N/A',
-                'rank': 'N/A',
-                'categories': 'N/A',
-                'description': '⚠️ CoinGecko Connection Error'
-            }
+            return False
+
+    def get_coin_details(self, symbol):
+        """Get coin details by symbol (e.g., BTC)"""
+        if self.background_thread is None:
+            self.update_coin_map()
+
+        coin_id = self.resolve_coin_id(symbol)
+        if not coin_id:
+            return None
+
+        now = time.time()
+        market = self.store.get_market(coin_id)
+        details = self.store.get_details(coin_id)
+        stale = (
+            market is None or now - market[2] >= self.cache_duration
+            or details is None or now - details[2] >= self.details_ttl
+        )
+        if stale:
+            if self.background_thread is not None:
+                # Served from whatever is stored, the refresher picks the coin up next round
+                with self.pending_lock:
+                    self.pending_ids.add(coin_id)
+            else:
+                self.fetch_coin_details(coin_id)
+                market = self.store.get_market(coin_id)
+                details = self.store.get_details(coin_id)
+
+        return {
+            'market_cap': market[0] if market and market[0] is not None else 'N/A',
+            'rank': market[1] if market and market[1] is not None else 'N/A',
+            'categories': details[0] if details else 'N/A',
+            'description': details[1] if details else '⚠️ CoinGecko details not cached yet'
+        }
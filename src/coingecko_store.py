@@ -0,0 +1,100 @@
+import os
+import sqlite3
+import threading
+import time
+
+class CoinGeckoStore:
+    """SQLite store for the CoinGecko symbol map, market data and coin details"""
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS coin_map ("
+                "symbol TEXT PRIMARY KEY, coin_id TEXT NOT NULL, rank INTEGER, updated_at REAL NOT NULL)"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS coin_markets ("
+                "coin_id TEXT PRIMARY KEY, market_cap REAL, rank INTEGER, updated_at REAL NOT NULL)"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS coin_details ("
+                "coin_id TEXT PRIMARY KEY, categories TEXT, description TEXT, updated_at REAL NOT NULL)"
+            )
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value REAL)")
+
+    def get_meta(self, key, default=0):
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value):
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def save_coin_list(self, items):
+        """Symbols from /coins/list, which has no rank so ranked entries are never replaced"""
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT INTO coin_map (symbol, coin_id, rank, updated_at) VALUES (?, ?, NULL, ?) "
+                "ON CONFLICT(symbol) DO UPDATE SET updated_at = excluded.updated_at",
+                [(item['symbol'].lower(), item['id'], now) for item in items]
+            )
+
+    def save_markets(self, items):
+        """Rows from /coins/markets, the best ranked coin wins a shared symbol"""
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO coin_markets (coin_id, market_cap, rank, updated_at) VALUES (?, ?, ?, ?)",
+                [(item['id'], item.get('market_cap'), item.get('market_cap_rank'), now) for item in items]
+            )
+            self.conn.executemany(
+                "INSERT INTO coin_map (symbol, coin_id, rank, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(symbol) DO UPDATE SET coin_id = excluded.coin_id, rank = excluded.rank, "
+                "updated_at = excluded.updated_at "
+                "WHERE coin_map.rank IS NULL OR coin_map.coin_id = excluded.coin_id OR excluded.rank <= coin_map.rank",
+                [
+                    (item['symbol'].lower(), item['id'], item.get('market_cap_rank'), now)
+                    for item in items if item.get('market_cap_rank')
+                ]
+            )
+
+    def save_details(self, coin_id, categories, description):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO coin_details (coin_id, categories, description, updated_at) VALUES (?, ?, ?, ?)",
+                (coin_id, categories, description, time.time())
+            )
+
+    def get_coin_id(self, symbol):
+        with self.lock:
+            row = self.conn.execute("SELECT coin_id FROM coin_map WHERE symbol = ?", (symbol,)).fetchone()
+        return row[0] if row else None
+
+    def get_market(self, coin_id):
+        """(market_cap, rank, updated_at) or None"""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT market_cap, rank, updated_at FROM coin_markets WHERE coin_id = ?", (coin_id,)
+            ).fetchone()
+
+    def get_details(self, coin_id):
+        """(categories, description, updated_at) or None"""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT categories, description, updated_at FROM coin_details WHERE coin_id = ?", (coin_id,)
+            ).fetchone()
+
+    def evict(self, map_ttl, markets_ttl, details_ttl):
+        """Drop rows that were not refreshed within their TTL"""
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM coin_map WHERE updated_at < ?", (now - map_ttl,))
+            self.conn.execute("DELETE FROM coin_markets WHERE updated_at < ?", (now - markets_ttl,))
+            self.conn.execute("DELETE FROM coin_details WHERE updated_at < ?", (now - details_ttl,))
@@ -5,11 +5,17 @@ load_dotenv()
 
 BYBIT_API_KEY = os.getenv("BYBIT_API_KEY")
 BYBIT_API_SECRET = os.getenv("BYBIT_API_SECRET")
+BINANCE_API_KEY = os.getenv("BINANCE_API_KEY")
+BINANCE_API_SECRET = os.getenv("BINANCE_API_SECRET")
+OKX_API_KEY = os.getenv("OKX_API_KEY")
+OKX_API_SECRET = os.getenv("OKX_API_SECRET")
+OKX_API_PASSWORD = os.getenv("OKX_API_PASSWORD")
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
 
 # Trading Settings
 TIMEFRAME = '15m'
+CANDLE_HISTORY_LIMIT = 100  # Number of candles kept per symbol for indicator calculation
 RSI_PERIOD = 14
 MFI_PERIOD = 14
 
@@ -28,8 +34,100 @@ PSAR_CONSECUTIVE_BARS = 10  # Number of bars the price must be below (for LONG)
 # TD Sequential Settings
 TD_SEQ_ENABLED = True
 
+# Async Scan Settings
+ASYNC_SCAN_ENABLED = True
+SCAN_CONCURRENCY = 20  # Maximum number of OHLCV requests in flight at the same time
+SCAN_REQUESTS_PER_SECOND = 50  # Request weight per second shared by every Bybit request (Bybit allows 600 requests per 5s per IP)
+
+# Exchange Settings
+# Venues scanned in parallel (bybit, binance, okx), stream mode uses the first one and needs it to be bybit
+EXCHANGES = [name.strip() for name in os.getenv("EXCHANGES", "bybit").split(",") if name.strip()]
+EXCHANGE_REQUESTS_PER_SECOND = {  # Separate request budget per venue
+    'bybit': SCAN_REQUESTS_PER_SECOND,
+    'binance': 20,  # 2400 request weight per minute, klines cost 1-2
+    'okx': 15,  # 40 candle requests per 2s
+}
+
+# Rate Limit Settings
+# Weight of one request per endpoint, other endpoints weigh what ccxt charges for them (Bybit: 1)
+ENDPOINT_WEIGHTS = {
+    'bybit': {
+        'v5/market/tickers': 5,  # Every linear contract in one response
+        'v5/market/instruments-info': 5,
+    },
+}
+RATE_LIMIT_BACKOFF_SECONDS = 1  # First pause after a rate limit response, doubled on each one in a row
+RATE_LIMIT_MAX_BACKOFF_SECONDS = 60
+RATE_LIMIT_MIN_FRACTION = 0.2  # The budget is halved per rate limit response, but not below this share
+RATE_LIMIT_RECOVERY = 0.02  # Share of the full budget regained per successful response
+
+# Candle Cache Settings
+CANDLE_CACHE_ENABLED = True  # Keep candles between scans and only fetch the bars that are new
+
+# Candle Store Settings
+CANDLE_STORE_ENABLED = True  # Persist closed candles to disk and seed the cache from them after a restart
+CANDLE_STORE_PATH = os.getenv("CANDLE_STORE_PATH", "data/candles")
+
+# Streaming Indicator Settings
+STREAMING_INDICATORS_ENABLED = True  # Update indicators per closed candle from saved state instead of recomputing with pandas_ta
+
+# Batch Indicator Settings
+BATCH_INDICATORS_ENABLED = True  # Screen all prefetched symbols at once on a stacked NumPy panel
+
+# Sharding Settings
+# Worker processes per venue that fetch candles and screen them, each for a fixed slice of the pairs.
+# 0 scans in the scanning process itself, set it to about the number of CPU cores for large universes
+SHARD_WORKERS = int(os.getenv("SHARD_WORKERS", "0"))
+
+# WebSocket Stream Settings
+STREAM_MODE_ENABLED = False  # Check signals on each candle close pushed by Bybit's kline stream instead of polling every 5 minutes
+STREAM_UNIVERSE_REFRESH_SECONDS = 3600  # Re-apply the volume filter and resubscribe this often
+
+# Enrichment Settings
+ENRICH_MAX_WORKERS = 8  # Parallel long/short ratio requests when several coins signal in one scan
+
+# Pre-filter Settings
+PREFILTER_ENABLED = True  # Only fetch OHLCV for pairs whose RSI, estimated from the ticker price, is near a threshold
+PREFILTER_RSI_MARGIN = 10  # RSI points of slack around RSI_OVERSOLD / RSI_OVERBOUGHT for the estimate
+PREFILTER_REFRESH_CYCLES = 8  # Fetch skipped pairs anyway after this many scans to correct the estimate (>= 1)
+
+# Scheduler Settings
+SCAN_ALIGN_TO_CANDLE_CLOSE = True  # Start each scan just after a candle closes instead of every SCAN_INTERVAL_SECONDS
+SCAN_CLOSE_DELAY_SECONDS = 3  # Give the exchange a moment to finalize the closed candle
+SCAN_INTERVAL_SECONDS = 300  # Fixed pause between scans when not aligned
+SCAN_RETRY_SECONDS = 60  # A candle is only marked scanned once every venue succeeded, failed scans are retried after this long
+CLOCK_SYNC_SECONDS = 3600  # Re-measure the exchange clock offset this often
+
+# Scanner Service Settings
+MARKETS_REFRESH_SECONDS = 6 * 3600  # Reload exchange market metadata (new listings, delistings) this often
+
+# CoinGecko Settings
+COINGECKO_DB_PATH = os.getenv("COINGECKO_DB_PATH", "data/coingecko.sqlite3")
+COINGECKO_BACKGROUND_REFRESH = True  # Prefetch metadata in a background thread so alerts only do local lookups
+COINGECKO_REFRESH_SECONDS = 3600  # How often the background thread refreshes market data
+COINGECKO_POLL_SECONDS = 30  # How often the background thread checks for new pairs and coins waiting for details
+COINGECKO_MARKETS_PAGES = 4  # /coins/markets pages of 250 coins to prefetch (top 1000 by market cap)
+COINGECKO_MARKETS_TTL = 2 * 86400  # Evict market cap / rank not refreshed for this long
+COINGECKO_DETAILS_TTL = 7 * 86400  # Categories and descriptions are refetched after this long
+COINGECKO_REQUEST_INTERVAL = 2.5  # Seconds between background requests (free tier allows ~30 per minute)
+
+# Telegram Settings
+TELEGRAM_QUEUE_SIZE = 100  # Pending messages kept before new ones are dropped
+TELEGRAM_BATCH_WINDOW_SECONDS = 2  # Messages queued within this window are merged into one
+TELEGRAM_MIN_INTERVAL_SECONDS = 1.0  # Telegram allows about one message per second per chat
+TELEGRAM_MAX_RETRIES = 3
+
+# Multi-Timeframe Settings
+MTF_ENABLED = False  # Scan several timeframes and only alert when enough of them agree
+MTF_BASE_TIMEFRAME = '5m'  # Fetched from the exchange, the other timeframes are resampled from it
+MTF_TIMEFRAMES = ['5m', '15m', '1h', '4h']
+MTF_MIN_CONFLUENCE = 2  # Number of timeframes that must show the same signal
+
 # Filters
 MIN_24H_VOLUME_USDT = 5000000  # Minimum 5 Million USDT volume to ensure liquidity
 
-# Alert Settings
-ALERT_COOLDOWN_MINUTES = 60  # Minutes to wait before sending another alert for the same coin
+# State Settings
+STATE_BACKEND = os.getenv("STATE_BACKEND", "sqlite")  # sqlite (workers on one host), redis (several hosts) or memory
+STATE_DB_PATH = os.getenv("STATE_DB_PATH", "data/state.sqlite3")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+LEADER_LOCK_TTL_SECONDS = 60  # A standby worker takes over this long after the scanning worker died
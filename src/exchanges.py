@@ -0,0 +1,173 @@
+import math
+import re
+import ccxt
+import ccxt.async_support as ccxt_async
+from requests.adapters import HTTPAdapter
+from src.candles import Candles
+from src.market_data import to_float
+from src.metrics import instrument_exchange
+from src.rate_limiter import AdaptiveRateLimiter, limit_exchange
+from src.config import (
+    BYBIT_API_KEY, BYBIT_API_SECRET, BINANCE_API_KEY, BINANCE_API_SECRET,
+    OKX_API_KEY, OKX_API_SECRET, OKX_API_PASSWORD,
+    EXCHANGE_REQUESTS_PER_SECOND, ENDPOINT_WEIGHTS, ENRICH_MAX_WORKERS
+)
+
+def normalize_symbol(symbol):
+    """Venue independent pair for a ccxt symbol, e.g. 1000PEPE/USDT:USDT -> PEPE/USDT"""
+    pair = symbol.split(':')[0]
+    base, _, quote = pair.partition('/')
+    # Binance and Bybit list some small caps as 1000x contracts, OKX uses the plain coin
+    return f"{re.sub(r'^1000+', '', base)}/{quote}"
+
+class ExchangeAdapter:
+    """Everything venue specific: clients, request limits, tickers payload and L/S ratio"""
+    name = None
+    label = None
+    max_candles_per_request = 1000
+    store_subdir = None
+    # ccxt's cost of a plain request, costs are divided by it to get request weights
+    cost_unit = 1
+    # Share of the venue's request budget used by this process, split when scanning with shard workers
+    budget_share = 1
+    # Period of the long/short ratio, in the venue's own notation
+    ls_ratio_period = '15m'
+    _limiter = None
+
+    def __getstate__(self):
+        # Handed to shard worker processes, which build their own limiter and clients
+        state = dict(self.__dict__)
+        state.pop('_limiter', None)
+        return state
+
+    def credentials(self):
+        return {}
+
+    def client_config(self):
+        return {
+            **self.credentials(),
+            'enableRateLimit': True,
+            'options': {
+                'defaultType': 'swap',  # Use 'swap' for perpetual futures
+            }
+        }
+
+    @property
+    def requests_per_second(self):
+        return EXCHANGE_REQUESTS_PER_SECOND[self.name]
+
+    @property
+    def limiter(self):
+        """Request budget shared by every client of this venue"""
+        if self._limiter is None:
+            self._limiter = AdaptiveRateLimiter(
+                self.name, self.requests_per_second * self.budget_share, ENDPOINT_WEIGHTS.get(self.name), self.cost_unit
+            )
+        return self._limiter
+
+    def create_exchange(self):
+        """Sync client with its own HTTP connection pool, sized for the enrichment threads"""
+        exchange = getattr(ccxt, self.name)(self.client_config())
+        pool = HTTPAdapter(pool_connections=1, pool_maxsize=ENRICH_MAX_WORKERS)
+        exchange.session.mount('https://', pool)
+        return instrument_exchange(limit_exchange(exchange, self.limiter), self.name)
+
+    def create_async_exchange(self):
+        exchange = getattr(ccxt_async, self.name)(self.client_config())
+        return instrument_exchange(limit_exchange(exchange, self.limiter), self.name)
+
+    def snapshot_fields(self, info):
+        """Funding, open interest and volume found in one raw fetch_tickers() entry"""
+        return {}
+
+    def fetch_candles(self, exchange, symbol, timeframe, since=None, limit=None):
+        """Candles of one symbol from the sync client"""
+        return Candles.from_rows(exchange.fetch_ohlcv(symbol, timeframe=timeframe, since=since, limit=limit))
+
+    def fetch_ls_ratio(self, exchange, symbol):
+        try:
+            history = exchange.fetch_long_short_ratio_history(symbol, self.ls_ratio_period, None, 1)
+            if history:
+                return history[-1].get('longShortRatio', 'N/A')
+        except Exception as e:
+            print(f"Error fetching L/S ratio for {symbol}: {e}")
+        return 'N/A'
+
+class BybitAdapter(ExchangeAdapter):
+    name = 'bybit'
+    label = 'Bybit'
+    # Bybit keeps the top level of the candle store so existing stores and backtests keep working
+    store_subdir = None
+    cost_unit = 5
+    # ccxt passes the period straight to /v5/market/account-ratio, which only knows 5min, 15min, ...
+    ls_ratio_period = '15min'
+
+    def credentials(self):
+        return {'apiKey': BYBIT_API_KEY, 'secret': BYBIT_API_SECRET}
+
+    def fetch_candles(self, exchange, symbol, timeframe, since=None, limit=None):
+        # Parse the raw kline response straight into arrays, ccxt's fetch_ohlcv builds a list of floats per candle
+        exchange.load_markets()
+        market = exchange.market(symbol)
+        request = {
+            'category': 'linear' if market.get('linear', True) else 'inverse',
+            'symbol': market['id'],
+            'interval': exchange.timeframes.get(timeframe, timeframe),
+            'limit': limit or 200,
+        }
+        if since is not None:
+            # Same rounding as ccxt, start at the first bar opening at or after since
+            duration = ccxt.Exchange.parse_timeframe(timeframe) * 1000
+            request['start'] = int(math.ceil(since / duration)) * duration
+        return Candles.from_bybit_kline(exchange.publicGetV5MarketKline(request))
+
+    def snapshot_fields(self, info):
+        # Bybit's tickers payload already carries 24h turnover, funding rate, next funding time and open interest
+        return {
+            'funding_rate': to_float(info.get('fundingRate')),
+            'next_funding_ts': to_float(info.get('nextFundingTime')),
+            'open_interest': to_float(info.get('openInterest')),
+            'volume_24h': to_float(info.get('turnover24h')),
+        }
+
+class BinanceAdapter(ExchangeAdapter):
+    name = 'binance'
+    label = 'Binance'
+    max_candles_per_request = 1500
+    store_subdir = 'binance'
+
+    def credentials(self):
+        return {'apiKey': BINANCE_API_KEY, 'secret': BINANCE_API_SECRET}
+
+    def snapshot_fields(self, info):
+        return {'volume_24h': to_float(info.get('quoteVolume'))}
+
+class OkxAdapter(ExchangeAdapter):
+    name = 'okx'
+    label = 'OKX'
+    max_candles_per_request = 300
+    store_subdir = 'okx'
+    # ccxt charges 0.5 per candle request, which EXCHANGE_REQUESTS_PER_SECOND counts as one
+    cost_unit = 0.5
+
+    def credentials(self):
+        return {'apiKey': OKX_API_KEY, 'secret': OKX_API_SECRET, 'password': OKX_API_PASSWORD}
+
+    def snapshot_fields(self, info):
+        # volCcy24h is in the base coin for swaps
+        volume = to_float(info.get('volCcy24h'))
+        last = to_float(info.get('last'))
+        return {'volume_24h': volume * last if volume is not None and last is not None else None}
+
+ADAPTERS = {adapter.name: adapter for adapter in (BybitAdapter, BinanceAdapter, OkxAdapter)}
+
+def get_adapters(names):
+    """Adapter instances for the configured exchange names, unknown names are skipped"""
+    adapters = []
+    for name in names:
+        adapter = ADAPTERS.get(name.lower())
+        if adapter is None:
+            print(f"Unknown exchange '{name}', supported: {', '.join(ADAPTERS)}")
+            continue
+        adapters.append(adapter())
+    return adapters or [BybitAdapter()]
@@ -1,93 +1,219 @@
+import asyncio
 import time
-import sys
-from datetime import datetime, timedelta
-from src.scanner import Scanner
-from src.telegram_sender import TelegramSender
-from src.config import ALERT_COOLDOWN_MINUTES
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from src.candles import Candles
+from src.scanner_service import get_service
+from src.metrics import metrics
+from src.state_store import LeaderLock
+from src.ws_stream import KlineStream, WebSocketTransport
+from src.config import (
+    BATCH_INDICATORS_ENABLED,
+    STREAM_MODE_ENABLED, STREAM_UNIVERSE_REFRESH_SECONDS, SCAN_RETRY_SECONDS
+)
 
-def job(sent_alerts):
-    print(f"\nStarting scan at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    scanner = Scanner()
-    sender = TelegramSender()
+def format_message(result):
+    """Build the Telegram message for a signal"""
+    signal_type = result['signal']
+    emoji = "🟢" if signal_type == 'LONG' else "🔴"
+
+    # Safe formatting
+    vol = result['volume_24h']
+    if isinstance(vol, (int, float)):
+        vol_str = f"{vol:,.0f} USDT"
+    else:
+        vol_str = str(vol)
+
+    fr = result['funding_rate']
+    if isinstance(fr, (int, float)):
+        fr_str = f"{fr:.6f}"
+    else:
+        fr_str = str(fr)
+
+    # ADX Interpretation
+    adx_val = result.get('adx', 0)
+    adx_str = "N/A"
+    if isinstance(adx_val, (int, float)):
+        if adx_val < 20:
+            trend_strength = "Weak Trend"
+        elif adx_val < 25:
+            trend_strength = "Weak to Moderate Trend"
+        elif adx_val < 50:
+            trend_strength = "Strong Trend"
+        elif adx_val < 75:
+            trend_strength = "Very Strong Trend"
+        else:
+            trend_strength = "Extremely Strong Trend"
+        adx_str = f"{adx_val:.2f} - {trend_strength}"
+
+    # Confluence signals list the timeframes that agree
+    timeframes_str = ""
+    if result.get('timeframes'):
+        timeframes_str = f"Timeframes: {', '.join(result['timeframes'])}\n"
+
+    message = (
+        f"{emoji} {signal_type} signal detected.\n"
+        f"Coin: {result['symbol']}\n"
+        f"Exchange: {result.get('exchange', 'N/A')}\n"
+        f"{timeframes_str}"
+        f"Price: {result['price']}\n"
+        f"RSI: {result['rsi']:.2f}\n"
+        f"MFI: {result['mfi']:.2f}\n"
+        f"ADX: {adx_str}\n"
+        f"VWAP: {result['vwap']:.4f}\n"
+        f"Funding Rate: {fr_str} (Next: {result.get('next_funding', 'N/A')})\n"
+        f"Long/Short Ratio: {result['ls_ratio']}\n"
+        f"24h Volume: {vol_str}\n"
+        f"24h Open Interest: {result['open_interest']}\n"
+        f"--------------------------------\n"
+        f"Market Cap: {result.get('market_cap', 'N/A')}\n"
+        f"Rank: #{result.get('rank', 'N/A')}\n"
+        f"Category: {result.get('categories', 'N/A')}\n"
+        f"Description: {result.get('description', 'N/A')}"
+    )
+    return message
+
+def send_alert(sender, result):
+    """Send a signal, results only contain signals that are new on their candle"""
+    print(f"Sending signal for {result['symbol']}")
+    sender.send_message(format_message(result))
+
+def all_evaluated(signals, symbols):
+    """True when every symbol was evaluated on the last closed candle, the others are reported"""
+    missed = signals.pending(symbols)
+    if missed:
+        print(f"\n{len(missed)} pairs were not evaluated on the last closed candle.")
+    return not missed
+
+def scan_venue(venue, sender):
+    """One scan pass over the pairs of a single exchange, returns False when pairs were left unscanned"""
+    venue.refresh_markets()
+    scanner = venue.scanner
     
     tickers = scanner.get_tickers()
+    if tickers is None:
+        return False
+    tickers = venue.prioritize(tickers)
+
+    if venue.mtf_scanner is not None:
+        for result in venue.mtf_scanner.scan(venue.mtf_scanner.signals.pending(tickers)):
+            send_alert(sender, result)
+        venue.save_state()
+        return all_evaluated(venue.mtf_scanner.signals, tickers)
+
+    metrics.set('scanned_symbols', len(tickers), venue=venue.adapter.name)
+    # Pairs already evaluated on the last closed candle have nothing new until the next one
+    pending = venue.signals.pending(tickers)
+    metrics.set('unchanged_symbols', len(tickers) - len(pending), venue=venue.adapter.name)
+    if len(pending) < len(tickers):
+        print(f"Skipping {len(tickers) - len(pending)} pairs already evaluated on this candle.")
+    tickers = pending
+
+    if venue.prefilter is not None:
+        # Only pairs whose estimated RSI is near a threshold get the full scan
+        with metrics.phase('prefilter', venue.adapter.name):
+            candidates = venue.prefilter.select(tickers, scanner.last_prices)
+        print(f"Pre-filter kept {len(candidates)}/{len(tickers)} pairs.")
+        metrics.set('prefilter_candidates', len(candidates), venue=venue.adapter.name)
+        kept = set(candidates)
+        venue.signals.carry([symbol for symbol in tickers if symbol not in kept], venue.signals.closed_bar())
+        tickers = candidates
+
+    if venue.shards is not None:
+        # Candles are fetched and screened by the shard workers, signals come back merged
+        with metrics.phase('shards', venue.adapter.name):
+            results = venue.shards.scan(tickers)
+        for result in results:
+            send_alert(sender, result)
+        venue.save_state()
+        return not venue.shards.failed and all_evaluated(venue.signals, tickers)
+
+    # Fetch all candles concurrently up front, symbols that failed fall back to a sequential fetch
+    with metrics.phase('ohlcv', venue.adapter.name):
+        prefetched = venue.prefetch_ohlcv(tickers)
+    if venue.prefilter is not None:
+        venue.prefilter.seed(prefetched)
+
+    remaining = tickers
+    if BATCH_INDICATORS_ENABLED and prefetched:
+        try:
+            start = time.perf_counter()
+            results = scanner.scan_batch(prefetched)
+            # The screen handles all pairs at once, each one is charged an equal share of it
+            metrics.observe(
+                'symbol_seconds', (time.perf_counter() - start) / len(prefetched),
+                venue=venue.adapter.name, path='batch'
+            )
+            for result in results:
+                send_alert(sender, result)
+            remaining = [symbol for symbol in tickers if symbol not in prefetched]
+        except Exception as e:
+            print(f"\nError in batch scan, falling back to per-symbol analysis: {e}")
     
-    for symbol in tickers:
+    for symbol in remaining:
         try:
-            result = scanner.analyze_coin(symbol)
+            with metrics.timer('symbol_seconds', venue=venue.adapter.name, path='sequential'):
+                result = scanner.analyze_coin(symbol, Candles.from_rows(prefetched.get(symbol)))
             if result:
-                # Check cooldown
-                if symbol in sent_alerts:
-                    last_alert_time = sent_alerts[symbol]
-                    if datetime.now() - last_alert_time < timedelta(minutes=ALERT_COOLDOWN_MINUTES):
-                        print(f"Skipping alert for {symbol} (Cooldown active)")
-                        continue
-
-                # Update last alert time
-                sent_alerts[symbol] = datetime.now()
-
-                # Format Message
-                signal_type = result['signal']
-                emoji = "🟢" if signal_type == 'LONG' else "🔴"
-                
-                # Safe formatting
-                vol = result['volume_24h']
-                if isinstance(vol, (int, float)):
-                    vol_str = f"{vol:,.0f} USDT"
-                else:
-                    vol_str = str(vol)
-
-                fr = result['funding_rate']
-                if isinstance(fr, (int, float)):
-                    fr_str = f"{fr:.6f}"
-                else:
-                    fr_str = str(fr)
-
-                # ADX Interpretation
-                adx_val = result.get('adx', 0)
-                adx_str = "N/A"
-                if isinstance(adx_val, (int, float)):
-                    if adx_val < 20:
-                        trend_strength = "Weak Trend"
-                    elif adx_val < 25:
-                        trend_strength = "Weak to Moderate Trend"
-                    elif adx_val < 50:
-                        trend_strength = "Strong Trend"
-                    elif adx_val < 75:
-                        trend_strength = "Very Strong Trend"
-                    else:
-                        trend_strength = "Extremely Strong Trend"
-                    adx_str = f"{adx_val:.2f} - {trend_strength}"
-
-                message = (
-                    f"{emoji} {signal_type} signal detected.\n"
-                    f"Coin: {result['symbol']}\n"
-                    f"Price: {result['price']}\n"
-                    f"RSI: {result['rsi']:.2f}\n"
-                    f"MFI: {result['mfi']:.2f}\n"
-                    f"ADX: {adx_str}\n"
-                    f"VWAP: {result['vwap']:.4f}\n"
-                    f"Funding Rate: {fr_str} (Next: {result.get('next_funding', 'N/A')})\n"
-                    f"Long/Short Ratio: {result['ls_ratio']}\n"
-                    f"24h Volume: {vol_str}\n"
-                    f"24h Open Interest: {result['open_interest']}\n"
-                    f"--------------------------------\n"
-                    f"Market Cap: {result.get('market_cap', 'N/A')}\n"
-                    f"Rank: #{result.get('rank', 'N/A')}\n"
-                    f"Category: {result.get('categories', 'N/A')}\n"
-                    f"Description: {result.get('description', 'N/A')}"
-                )
-                
-                print(f"Sending signal for {symbol}")
-                sender.send_message(message)
-                
-            # Sleep to avoid rate limits
-            time.sleep(0.1)
-            
+                send_alert(sender, result)
         except Exception as e:
             print(f"\nError processing {symbol}: {e}")
+    venue.save_state()
+    # Failed fetches, pairs behind the others and a bar the exchange had not opened yet all leave pairs pending
+    return all_evaluated(venue.signals, tickers)
+
+def job():
+    """Scan every venue, returns True when all of them were scanned"""
+    print(f"\nStarting scan at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    # Scanners, clients and caches are reused across scans
+    service = get_service()
+    sender = service.sender
+    metrics.start_cycle()
 
+    # Every venue has its own clients and request budget, so they are scanned side by side
+    # and a pass takes as long as the slowest exchange
+    with ThreadPoolExecutor(max_workers=len(service.venues)) as executor:
+        futures = {
+            executor.submit(scan_venue, venue, sender): venue
+            for venue in service.venues
+        }
+        complete = True
+        for future in as_completed(futures):
+            try:
+                if not future.result():
+                    print(f"\n{futures[future].adapter.label} scan was incomplete.")
+                    complete = False
+            except Exception as e:
+                print(f"\nError scanning {futures[future].adapter.label}: {e}")
+                complete = False
+
+    metrics.end_cycle()
     print("\nScan completed.")
+    return complete
+
+def run_stream(leader=None):
+    """Check signals on every candle close pushed over the WebSocket, re-filtering the universe periodically"""
+    service = get_service()
+    service.refresh_markets()
+    scanner = service.scanner
+    sender = service.sender
+
+    tickers = scanner.get_tickers()
+    if not tickers:
+        print("No pairs to stream, retrying in 1 minute...")
+        time.sleep(60)
+        return
+    # Warm the cache over REST so the first closed bar already has full history
+    service.prefetch_ohlcv(tickers)
+
+    stream = KlineStream(
+        scanner, tickers, WebSocketTransport(),
+        on_signal=lambda result: send_alert(sender, result), leader=leader
+    )
+    try:
+        asyncio.run(asyncio.wait_for(stream.run(), timeout=STREAM_UNIVERSE_REFRESH_SECONDS))
+    except asyncio.TimeoutError:
+        print("\nRefreshing streamed universe...")
 
 def countdown(t):
     while t:
@@ -98,25 +224,51 @@ def countdown(t):
         t -= 1
     print(" " * 20, end="\r") # Clear line
 
+def run_scheduled(scheduler):
+    """Scan unless the last closed candle was already scanned, returns the seconds until the next scan"""
+    if scheduler.due():
+        bar = scheduler.last_closed_bar()
+        if not job():
+            # Pairs already evaluated on this candle are skipped by the retry
+            print(f"Retrying the scan in {SCAN_RETRY_SECONDS}s.")
+            return SCAN_RETRY_SECONDS
+        scheduler.mark_scanned(bar)
+    return scheduler.seconds_until_next_scan()
+
 def main():
-    sender = TelegramSender()
-    startup_msg = "🚀 rsi_mfi_scanner Bot Started Scanning"
-    print(startup_msg)
-    sender.send_message(startup_msg)
-    
-    sent_alerts = {}
+    service = get_service()
+    sender = service.sender
+
+    # Another process may already be scanning (e.g. the server), only one of them may
+    leader = LeaderLock(service.state, on_elected=service.reload_state)
+    leader.keep_alive()
+    announced = False
 
     try:
         while True:
-            job(sent_alerts)
-            
-            # Wait 5 minutes with countdown
-            wait_seconds = 5 * 60
-            print(f"Waiting {wait_seconds/60:.0f} minutes for next scan...")
+            if not leader.is_leader:
+                print("Another worker is scanning, standing by...", end="\r")
+                time.sleep(leader.ttl / 3)
+                continue
+            if not announced:
+                startup_msg = "🚀 rsi_mfi_scanner Bot Started Scanning"
+                print(startup_msg)
+                sender.send_message(startup_msg)
+                announced = True
+
+            if STREAM_MODE_ENABLED:
+                run_stream(leader)
+                continue
+
+            # Wake up right after the next candle close
+            wait_seconds = run_scheduled(service.scheduler)
+            print(f"Waiting {wait_seconds / 60:.1f} minutes for next scan...")
             countdown(wait_seconds)
             
     except KeyboardInterrupt:
         print("\nBot stopped by user.")
+        leader.release()
+        sender.flush(timeout=5)
     except KeyboardInterrupt:
         print("\nBot stopped by user.")
 
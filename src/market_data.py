@@ -0,0 +1,118 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from src.config import ENRICH_MAX_WORKERS
+
+def format_countdown(next_ts):
+    """Time until a millisecond timestamp as HH:MM:SS"""
+    diff = next_ts - time.time() * 1000
+    if diff > 0:
+        return str(timedelta(milliseconds=diff)).split('.')[0]
+    return "00:00:00"
+
+def to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+class MarketDataEnricher:
+    """Market data for signalled symbols, taken from the bulk tickers snapshot where possible
+
+    What the venue's tickers payload carries is read by the exchange adapter (Bybit has
+    turnover, funding rate, next funding time and open interest), the remaining fields
+    and the long/short ratio are requested per symbol.
+    Results are cached until the next snapshot (one scan cycle).
+    """
+    def __init__(self, exchange, adapter, max_workers=ENRICH_MAX_WORKERS):
+        self.exchange = exchange
+        self.adapter = adapter
+        self.max_workers = max_workers
+        # Raw ticker fields by ccxt symbol
+        self.snapshot = {}
+        self.cache = {}
+
+    def set_snapshot(self, tickers):
+        """Start a new scan cycle from a ccxt fetch_tickers() result"""
+        self.snapshot = {symbol: ticker.get('info') or {} for symbol, ticker in tickers.items()}
+        self.cache = {}
+
+    def update_ticker(self, symbol, fields):
+        """Merge streamed ticker fields (snapshot or delta) for one symbol"""
+        self.snapshot.setdefault(symbol, {}).update(fields)
+        self.cache.pop(symbol, None)
+
+    def get(self, symbol):
+        if symbol not in self.cache:
+            self.cache[symbol] = self.fetch(symbol)
+        return self.cache[symbol]
+
+    def prefetch(self, symbols):
+        """Fill the cache for several symbols concurrently"""
+        missing = [symbol for symbol in dict.fromkeys(symbols) if symbol not in self.cache]
+        if not missing:
+            return
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(missing))) as executor:
+            for symbol, data in zip(missing, executor.map(self.fetch, missing)):
+                self.cache[symbol] = data
+
+    def fetch(self, symbol):
+        data = self.from_snapshot(self.adapter.snapshot_fields(self.snapshot.get(symbol) or {}))
+        self.fetch_rest(symbol, data)
+        data['ls_ratio'] = self.adapter.fetch_ls_ratio(self.exchange, symbol)
+        return data
+
+    def from_snapshot(self, fields):
+        data = {
+            'funding_rate': 'N/A',
+            'next_funding': 'N/A',
+            'open_interest': 'N/A',
+            'volume_24h': 'N/A',
+        }
+        funding_rate = fields.get('funding_rate')
+        if funding_rate is not None:
+            data['funding_rate'] = funding_rate
+        next_funding_ts = fields.get('next_funding_ts')
+        if next_funding_ts:
+            data['next_funding'] = format_countdown(next_funding_ts)
+        oi_val = fields.get('open_interest')
+        if oi_val:
+            data['open_interest'] = f"{oi_val:,.0f}"
+        volume = fields.get('volume_24h')
+        if volume is not None:
+            data['volume_24h'] = volume
+        return data
+
+    def fetch_rest(self, symbol, data):
+        """Request the fields the snapshot did not have, one request per field"""
+        # Funding Rate
+        if data['funding_rate'] == 'N/A':
+            try:
+                funding_info = self.exchange.fetch_funding_rate(symbol)
+                data['funding_rate'] = funding_info.get('fundingRate', 'N/A')
+
+                next_funding_ts = funding_info.get('fundingTimestamp')
+                if next_funding_ts:
+                    data['next_funding'] = format_countdown(next_funding_ts)
+            except Exception as e:
+                print(f"Error fetching funding rate for {symbol}: {e}")
+
+        # Open Interest
+        if data['open_interest'] == 'N/A':
+            try:
+                oi_data = self.exchange.fetch_open_interest(symbol)
+                oi_val = oi_data.get('openInterestAmount')
+                if oi_val:
+                    data['open_interest'] = f"{oi_val:,.0f}"
+            except Exception as e:
+                print(f"Error fetching open interest for {symbol}: {e}")
+
+        # 24h Stats for Volume
+        if data['volume_24h'] == 'N/A':
+            try:
+                ticker = self.exchange.fetch_ticker(symbol)
+                data['volume_24h'] = ticker.get('quoteVolume', 'N/A')
+            except Exception as e:
+                print(f"Error fetching ticker for {symbol}: {e}")
+
+        return data
@@ -0,0 +1,194 @@
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+PREFIX = 'scanner_'
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            yield bound, total
+
+def format_labels(labels, extra=None):
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in items) + "}"
+
+class Metrics:
+    """In-process counters, gauges and histograms, rendered for /metrics and /status"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started_at = time.time()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        # Seconds per (venue, phase) of the scan cycle in progress and of the last finished one
+        self.cycle_started = None
+        self.cycle_phases = {}
+        self.last_cycle = None
+
+    def key(self, name, labels):
+        return name, tuple(sorted((key, str(value)) for key, value in labels.items() if value is not None))
+
+    def inc(self, name, value=1, **labels):
+        key = self.key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        with self.lock:
+            self.gauges[self.key(name, labels)] = value
+
+    def observe(self, name, value, **labels):
+        key = self.key(name, labels)
+        with self.lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram()
+            self.histograms[key].observe(value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Observe the duration of a block into a histogram"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    @contextmanager
+    def phase(self, phase, venue=None):
+        """Time one phase of a scan and add it to the current cycle's breakdown"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.observe('phase_seconds', elapsed, phase=phase, venue=venue)
+            with self.lock:
+                key = (venue or '', phase)
+                self.cycle_phases[key] = self.cycle_phases.get(key, 0) + elapsed
+
+    def start_cycle(self):
+        with self.lock:
+            self.cycle_started = time.time()
+            self.cycle_phases = {}
+
+    def end_cycle(self):
+        if self.cycle_started is None:
+            return
+        now = time.time()
+        duration = now - self.cycle_started
+        with self.lock:
+            phases = {}
+            for (venue, phase), seconds in self.cycle_phases.items():
+                phases.setdefault(venue or 'all', {})[phase] = round(seconds, 4)
+            self.last_cycle = {
+                'started_at': self.cycle_started,
+                'finished_at': now,
+                'duration': round(duration, 4),
+                'phases': phases,
+            }
+            self.cycle_started = None
+        self.inc('cycles_total')
+        self.observe('cycle_seconds', duration)
+        self.set('last_cycle_timestamp_seconds', now)
+        self.set('last_cycle_duration_seconds', duration)
+
+    def render_prometheus(self):
+        """Prometheus text exposition format"""
+        with self.lock:
+            counters = sorted(self.counters.items())
+            gauges = sorted(self.gauges.items())
+            histograms = sorted(self.histograms.items(), key=lambda item: item[0])
+            lines = []
+            typed = set()
+
+            def declare(name, kind):
+                if name not in typed:
+                    typed.add(name)
+                    lines.append(f"# TYPE {PREFIX}{name} {kind}")
+
+            for (name, labels), value in counters:
+                declare(name, 'counter')
+                lines.append(f"{PREFIX}{name}{format_labels(labels)} {value}")
+            for (name, labels), value in gauges:
+                declare(name, 'gauge')
+                lines.append(f"{PREFIX}{name}{format_labels(labels)} {value}")
+            for (name, labels), histogram in histograms:
+                declare(name, 'histogram')
+                for bound, count in histogram.cumulative():
+                    lines.append(f"{PREFIX}{name}_bucket{format_labels(labels, ('le', bound))} {count}")
+                lines.append(f"{PREFIX}{name}_bucket{format_labels(labels, ('le', '+Inf'))} {histogram.count}")
+                lines.append(f"{PREFIX}{name}_sum{format_labels(labels)} {histogram.sum}")
+                lines.append(f"{PREFIX}{name}_count{format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def status(self):
+        """Summary for the /status endpoint"""
+        with self.lock:
+            counters = {}
+            for (name, labels), value in self.counters.items():
+                label = ",".join(f"{key}={value}" for key, value in labels)
+                counters.setdefault(name, {})[label or 'total'] = value
+            latencies = {}
+            for (name, labels), histogram in self.histograms.items():
+                label = ",".join(f"{key}={value}" for key, value in labels)
+                latencies.setdefault(name, {})[label or 'total'] = {
+                    'count': histogram.count,
+                    'avg': round(histogram.sum / histogram.count, 4) if histogram.count else None,
+                }
+            return {
+                'uptime': round(time.time() - self.started_at, 1),
+                'cycle_in_progress': self.cycle_started is not None,
+                'last_cycle': self.last_cycle,
+                'counters': counters,
+                'latencies': latencies,
+            }
+
+# Process-wide registry
+metrics = Metrics()
+
+def is_rate_limited(code, body):
+    # Bybit answers rate limited requests with HTTP 200 and retCode 10006
+    return code in (403, 418, 429) or '"retCode":10006' in (body or '')
+
+def instrument_exchange(exchange, venue):
+    """Count every HTTP response of a ccxt client and the ones that signal rate limiting"""
+    original = exchange.on_rest_response
+
+    def on_rest_response(code, reason, url, method, response_headers, response_body, request_headers, request_body):
+        metrics.inc('http_requests_total', venue=venue, status=code)
+        if is_rate_limited(code, response_body):
+            metrics.inc('rate_limit_hits_total', venue=venue)
+        return original(code, reason, url, method, response_headers, response_body, request_headers, request_body)
+
+    exchange.on_rest_response = on_rest_response
+    return exchange
+
+def instrument_session(session, venue):
+    """Same as instrument_exchange for a requests.Session"""
+    def on_response(response, *args, **kwargs):
+        metrics.inc('http_requests_total', venue=venue, status=response.status_code)
+        if response.status_code == 429:
+            metrics.inc('rate_limit_hits_total', venue=venue)
+
+    session.hooks['response'].append(on_response)
+    return session
@@ -0,0 +1,111 @@
+import ccxt
+import numpy as np
+from src.config import (
+    CANDLE_HISTORY_LIMIT, TD_SEQ_ENABLED, RSI_PERIOD,
+    MTF_BASE_TIMEFRAME, MTF_TIMEFRAMES, MTF_MIN_CONFLUENCE
+)
+from src.batch_indicators import build_panel, compute_indicators, signal_masks
+from src.metrics import metrics
+
+def timeframe_ms(timeframe):
+    return ccxt.Exchange.parse_timeframe(timeframe) * 1000
+
+def resample(rows, target_timeframe, base_timeframe=MTF_BASE_TIMEFRAME):
+    """Aggregate base candles into a higher timeframe, the last bucket stays the forming bar"""
+    rows = np.asarray(rows, dtype=np.float64)
+    if rows.size == 0:
+        return rows.reshape(0, 6)
+    target_ms = timeframe_ms(target_timeframe)
+    buckets = (rows[:, 0] // target_ms) * target_ms
+    _, starts = np.unique(buckets, return_index=True)
+    out = np.empty((len(starts), 6))
+    ends = np.r_[starts[1:], len(rows)] - 1
+    out[:, 0] = buckets[starts]
+    out[:, 1] = rows[starts, 1]
+    out[:, 2] = np.maximum.reduceat(rows[:, 2], starts)
+    out[:, 3] = np.minimum.reduceat(rows[:, 3], starts)
+    out[:, 4] = rows[ends, 4]
+    out[:, 5] = np.add.reduceat(rows[:, 5], starts)
+    # A first bucket that started before our history would have a wrong open/high/low
+    if rows[0, 0] != buckets[0]:
+        out = out[1:]
+    return out
+
+class MultiTimeframeScanner:
+    """Fetches the base timeframe once and derives higher timeframes locally for confluence signals"""
+    def __init__(self, scanner, async_scanner, base_timeframe=MTF_BASE_TIMEFRAME,
+                 timeframes=MTF_TIMEFRAMES, min_confluence=MTF_MIN_CONFLUENCE, signals=None):
+        self.scanner = scanner
+        self.async_scanner = async_scanner
+        # SignalMemo on the base timeframe, confluence signals alert when they are new
+        self.signals = signals
+        self.base_timeframe = base_timeframe
+        self.timeframes = sorted(timeframes, key=timeframe_ms)
+        self.min_confluence = min_confluence
+        # Enough base bars for a full indicator window on the largest timeframe
+        ratio = timeframe_ms(self.timeframes[-1]) // timeframe_ms(base_timeframe)
+        self.base_bars = (CANDLE_HISTORY_LIMIT + 1) * ratio
+
+    def timeframe_signals(self, base_candles, timeframe):
+        """Signals on the last closed candle of one timeframe: {symbol: (signal, td_note, last_candle)}"""
+        if timeframe == self.base_timeframe:
+            candles = base_candles
+        else:
+            candles = {symbol: resample(rows, timeframe, self.base_timeframe) for symbol, rows in base_candles.items()}
+        symbols, timestamps, panel = build_panel(candles, bars=CANDLE_HISTORY_LIMIT)
+        if not symbols or len(timestamps) < max(RSI_PERIOD, 2):
+            return {}
+
+        with metrics.phase('indicators', self.scanner.adapter.name):
+            indicators = compute_indicators(timestamps, panel)
+            long, short, td_13 = signal_masks(indicators)
+        signals = {}
+        for i in np.flatnonzero(long[:, -2] | short[:, -2]):
+            signal = 'LONG' if long[i, -2] else 'SHORT'
+            td_note = ""
+            if TD_SEQ_ENABLED:
+                side = "Buy" if signal == 'LONG' else "Sell"
+                td_note = f"TD {side} {13 if td_13[i, -2] else 9}"
+            last_candle = {name: values[i, -2] for name, values in indicators.items()}
+            signals[symbols[i]] = (signal, td_note, last_candle)
+        return signals
+
+    def scan(self, symbols):
+        """Enriched results for symbols where at least min_confluence timeframes agree"""
+        with metrics.phase('ohlcv', self.scanner.adapter.name):
+            base_candles = self.async_scanner.fetch_all_ohlcv(symbols, self.base_bars, self.base_timeframe)
+        if not base_candles:
+            return []
+
+        per_timeframe = {timeframe: self.timeframe_signals(base_candles, timeframe) for timeframe in self.timeframes}
+
+        confluent = []
+        for symbol, rows in base_candles.items():
+            found = None
+            # LONG wins when both sides have confluence, as on a single timeframe
+            for signal in ('LONG', 'SHORT'):
+                agreeing = [
+                    timeframe for timeframe in self.timeframes
+                    if per_timeframe[timeframe].get(symbol, (None,))[0] == signal
+                ]
+                if len(agreeing) >= self.min_confluence:
+                    found = (symbol, signal, agreeing)
+                    break
+            if self.signals is not None:
+                if len(rows) < 2 or not self.signals.record(symbol, int(rows[-2][0]), found and found[1]):
+                    continue
+            if found:
+                confluent.append(found)
+        with metrics.phase('enrichment', self.scanner.adapter.name):
+            self.scanner.market_data.prefetch([symbol for symbol, _, _ in confluent])
+
+        results = []
+        for symbol, signal, agreeing in confluent:
+            # Details come from the fastest agreeing timeframe
+            _, td_note, last_candle = per_timeframe[agreeing[0]][symbol]
+            print(f"\nConfluence signal for {symbol}: {signal} on {', '.join(agreeing)}")
+            result = self.scanner.build_result(symbol, signal, td_note, last_candle)
+            if result:
+                result['timeframes'] = agreeing
+                results.append(result)
+        return results
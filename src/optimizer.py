@@ -0,0 +1,145 @@
+import argparse
+import itertools
+import os
+import random
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from src.config import TIMEFRAME
+from src.batch_indicators import build_panel, rsi, mfi, psar
+from src.td_sequential import td_setup_counts
+from src.backtest import DEFAULT_PARAMS, load_candles, load_store, evaluate
+
+# Per-process state, set up once by init_worker
+_panel = None
+_base_indicators = None
+_psar_cache = {}
+
+def init_worker(data_dir):
+    """Map the shared candle arrays read-only instead of receiving a pickled copy"""
+    global _panel, _base_indicators, _psar_cache
+    _panel = np.load(os.path.join(data_dir, 'panel.npy'), mmap_mode='r')
+    _base_indicators = None
+    _psar_cache = {}
+
+def base_indicators():
+    """Indicators that no swept parameter changes, computed once per worker"""
+    global _base_indicators
+    if _base_indicators is None:
+        high, low, close, volume = (np.asarray(_panel[:, :, i]) for i in (1, 2, 3, 4))
+        td_buy, td_sell = td_setup_counts(close)
+        _base_indicators = {
+            'close': close,
+            'RSI': rsi(close),
+            'MFI': mfi(high, low, close, volume),
+            'TD_Buy': td_buy,
+            'TD_Sell': td_sell,
+        }
+    return _base_indicators
+
+def psar_for(af, max_af):
+    key = (af, max_af)
+    if key not in _psar_cache:
+        base = base_indicators()
+        _psar_cache[key] = psar(np.asarray(_panel[:, :, 1]), np.asarray(_panel[:, :, 2]), base['close'], af, max_af)
+    return _psar_cache[key]
+
+def evaluate_chunk(chunk, horizons, new_only):
+    results = []
+    for params in chunk:
+        indicators = dict(base_indicators())
+        if params['psar_enabled']:
+            indicators['PSAR'] = psar_for(params['psar_af'], params['psar_max'])
+        results.append((params, evaluate(indicators, params, horizons, new_only)))
+    return results
+
+def parameter_grid(space, samples=None, seed=0):
+    """All combinations of the value lists in space, or a random sample of them"""
+    names = list(space)
+    combos = itertools.product(*(space[name] for name in names))
+    if samples:
+        total = int(np.prod([len(space[name]) for name in names]))
+        if samples < total:
+            rng = random.Random(seed)
+            picked = set(rng.sample(range(total), samples))
+            combos = (combo for i, combo in enumerate(combos) if i in picked)
+    grid = [dict(zip(names, combo)) for combo in combos]
+    # Keep runs sharing a PSAR setting together so each worker computes that PSAR only once
+    grid.sort(key=lambda params: (params['psar_af'], params['psar_max']))
+    return grid
+
+def score(stats, horizon, metric):
+    """Signal count and combined LONG+SHORT metric at one horizon"""
+    signals = 0
+    weighted = 0.0
+    for side_stats in stats.values():
+        s = side_stats['horizons'][horizon]
+        if s['count']:
+            signals += s['count']
+            weighted += s[metric] * s['count']
+    return signals, (weighted / signals if signals else float('nan'))
+
+def optimize(candles, space, samples=None, horizons=(4,), new_only=True, workers=None):
+    """Evaluate every parameter combination over the stored history on all cores"""
+    symbols, _, panel = build_panel(candles, bars=None)
+    grid = parameter_grid(space, samples)
+    workers = workers or os.cpu_count() or 1
+    print(f"Evaluating {len(grid)} combinations on {len(symbols)} symbols x {panel.shape[1]} bars with {workers} workers")
+
+    data_dir = tempfile.mkdtemp(prefix='optimizer_')
+    try:
+        np.save(os.path.join(data_dir, 'panel.npy'), panel)
+        del panel
+        chunk_size = max(1, len(grid) // (workers * 4))
+        chunks = [grid[i:i + chunk_size] for i in range(0, len(grid), chunk_size)]
+        results = []
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(data_dir,)) as executor:
+            for chunk_results in executor.map(evaluate_chunk, chunks, itertools.repeat(horizons), itertools.repeat(new_only)):
+                results.extend(chunk_results)
+        return results
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Grid/random search over the strategy parameters")
+    parser.add_argument('data_dir', nargs='?', help="Directory with <SYMBOL>.csv or <SYMBOL>.parquet OHLCV files, defaults to the local candle store")
+    parser.add_argument('--symbols', nargs='*')
+    parser.add_argument('--random', type=int, help="Evaluate this many random combinations instead of the full grid")
+    parser.add_argument('--horizon', type=int, default=4, help="Bars after the signal to score the return at")
+    parser.add_argument('--metric', choices=['mean', 'median', 'hit_rate'], default='mean')
+    parser.add_argument('--min-signals', type=int, default=30)
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--workers', type=int)
+    for name, default in DEFAULT_PARAMS.items():
+        if isinstance(default, bool):
+            parser.add_argument(f"--{name.replace('_', '-')}", nargs='*', type=lambda v: v.lower() in ('1', 'true', 'yes'), default=[default])
+        else:
+            parser.add_argument(f"--{name.replace('_', '-')}", nargs='*', type=type(default), default=[default])
+    args = parser.parse_args()
+
+    if args.data_dir:
+        candles = load_candles(args.data_dir, args.symbols)
+    else:
+        candles = load_store(TIMEFRAME, args.symbols)
+    space = {name: getattr(args, name) for name in DEFAULT_PARAMS}
+
+    start = time.time()
+    results = optimize(candles, space, args.random, (args.horizon,), True, args.workers)
+    print(f"Done in {time.time() - start:.1f}s")
+
+    ranked = []
+    for params, stats in results:
+        signals, value = score(stats, args.horizon, args.metric)
+        if signals >= args.min_signals:
+            ranked.append((value, signals, params))
+    ranked.sort(key=lambda item: item[0], reverse=True)
+
+    swept = [name for name in DEFAULT_PARAMS if len(space[name]) > 1]
+    for value, signals, params in ranked[:args.top]:
+        settings = ", ".join(f"{name}={params[name]}" for name in swept)
+        print(f"{args.metric} {value:+.4f} over {signals} signals: {settings}")
+
+if __name__ == "__main__":
+    main()
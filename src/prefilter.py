@@ -0,0 +1,88 @@
+import time
+import zlib
+import ccxt
+import numpy as np
+from src.config import (
+    TIMEFRAME, RSI_PERIOD, RSI_OVERSOLD, RSI_OVERBOUGHT,
+    PREFILTER_RSI_MARGIN, PREFILTER_REFRESH_CYCLES
+)
+from src.batch_indicators import build_panel, average_gain_loss
+
+class RsiPrefilter:
+    """Cheap first stage that drops pairs whose RSI cannot be near a signal threshold
+
+    Every signal needs RSI < RSI_OVERSOLD or RSI > RSI_OVERBOUGHT on the last closed
+    candle. The Wilder averages behind RSI are kept per symbol, so the RSI of a
+    candle that just closed follows from its close alone, and right after the close
+    the ticker's last price is that close. Only pairs within PREFILTER_RSI_MARGIN of
+    a threshold get their OHLCV fetched and the full indicator set. The others advance
+    their state with the estimate, and they are fetched anyway after
+    PREFILTER_REFRESH_CYCLES scans to correct the drift.
+    """
+    def __init__(self, timeframe=TIMEFRAME, period=RSI_PERIOD, margin=PREFILTER_RSI_MARGIN,
+                 refresh_cycles=PREFILTER_REFRESH_CYCLES):
+        self.timeframe = timeframe
+        self.period_ms = ccxt.Exchange.parse_timeframe(timeframe) * 1000
+        self.alpha = 1.0 / period
+        self.low = RSI_OVERSOLD + margin
+        self.high = RSI_OVERBOUGHT - margin
+        self.refresh_cycles = refresh_cycles
+        # symbol -> [open time of last closed bar, its close, avg gain, avg loss, estimated scans since exact]
+        self.states = {}
+        self.clock = lambda: time.time() * 1000
+
+    def near_threshold(self, gain, loss):
+        total = gain + loss
+        if total <= 0:
+            return True
+        value = 100 * gain / total
+        return value < self.low or value > self.high
+
+    def select(self, symbols, last_prices):
+        """Candidates that need the full scan, the rest are advanced with their ticker price"""
+        closed_bar = int(self.clock() // self.period_ms - 1) * self.period_ms
+        candidates = []
+        for symbol in symbols:
+            state = self.states.get(symbol)
+            price = last_prices.get(symbol)
+            if state is None or not price or state[4] >= self.refresh_cycles:
+                candidates.append(symbol)
+                continue
+
+            bar, close, gain, loss, cycles = state
+            if bar == closed_bar:
+                # Scanned earlier in this bar already
+                if self.near_threshold(gain, loss):
+                    candidates.append(symbol)
+                continue
+            if bar != closed_bar - self.period_ms:
+                # More than one bar behind, the ticker price says nothing about the bars in between
+                candidates.append(symbol)
+                continue
+
+            change = price - close
+            gain += self.alpha * (max(change, 0.0) - gain)
+            loss += self.alpha * (max(-change, 0.0) - loss)
+            if self.near_threshold(gain, loss):
+                candidates.append(symbol)
+            else:
+                self.states[symbol] = [closed_bar, price, gain, loss, cycles + 1]
+        return candidates
+
+    def seed(self, candles_by_symbol):
+        """Exact state from freshly fetched candles (the last row of each is still forming)"""
+        symbols, timestamps, panel = build_panel(candles_by_symbol)
+        if len(timestamps) < 2:
+            return
+        close = panel[:, :-1, 3]
+        gain, loss = average_gain_loss(close)
+        bar = int(timestamps[-2])
+        # Symbols without the newest (forming) bar are behind, their last column is not closed yet
+        current = np.isfinite(panel[:, -1, 3])
+        for i, symbol in enumerate(symbols):
+            if current[i] and np.isfinite(close[i, -1]) and np.isfinite(gain[i, -1]) and np.isfinite(loss[i, -1]):
+                cycles = 0
+                if symbol not in self.states:
+                    # First seen: start at a per-symbol offset so forced refreshes don't all land on one scan
+                    cycles = zlib.crc32(symbol.encode()) % self.refresh_cycles
+                self.states[symbol] = [bar, close[i, -1], gain[i, -1], loss[i, -1], cycles]
@@ -0,0 +1,113 @@
+import asyncio
+import threading
+import time
+from src.market_data import to_float
+from src.metrics import metrics, is_rate_limited
+from src.config import (
+    RATE_LIMIT_BACKOFF_SECONDS, RATE_LIMIT_MAX_BACKOFF_SECONDS,
+    RATE_LIMIT_MIN_FRACTION, RATE_LIMIT_RECOVERY
+)
+
+class AdaptiveRateLimiter:
+    """Weighted token bucket shared by every client of one venue, sync and async
+
+    Requests reserve their weight and sleep until the budget covers it, so waiters are served
+    in order without holding the lock while they sleep. The rate is halved on every rate limit
+    response (down to RATE_LIMIT_MIN_FRACTION of the budget) and slowly regained on successful
+    ones. Bybit's X-Bapi-Limit-Status header pauses everything until the window resets when it
+    reports the budget as used up.
+    """
+    def __init__(self, venue, requests_per_second, weights=None, cost_unit=1):
+        self.venue = venue
+        self.max_rate = requests_per_second
+        self.rate = requests_per_second
+        # Endpoint path -> weight, other endpoints use ccxt's cost divided by cost_unit
+        self.weights = weights or {}
+        self.cost_unit = cost_unit
+        self.tokens = requests_per_second
+        self.last_refill = time.monotonic()
+        self.backoff = 0
+        self.lock = threading.Lock()
+
+    def weight(self, path, cost):
+        if path in self.weights:
+            return self.weights[path]
+        return (cost or self.cost_unit) / self.cost_unit
+
+    def reserve(self, weight=1):
+        """Take weight from the bucket, returns how many seconds to wait before sending"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.last_refill) * self.rate)
+            self.last_refill = now
+            self.tokens -= weight
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait:
+            metrics.inc('throttle_seconds_total', wait, venue=self.venue)
+        return wait
+
+    def acquire(self, weight=1):
+        wait = self.reserve(weight)
+        if wait:
+            time.sleep(wait)
+
+    async def acquire_async(self, weight=1):
+        wait = self.reserve(weight)
+        if wait:
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds):
+        """Let nothing through for the next seconds, on top of what is already reserved"""
+        with self.lock:
+            self.tokens = min(self.tokens, -seconds * self.rate)
+
+    def observe(self, code, headers, body):
+        """Adapt to one response of the venue"""
+        if is_rate_limited(code, body):
+            with self.lock:
+                self.rate = max(self.max_rate * RATE_LIMIT_MIN_FRACTION, self.rate / 2)
+                delay = min(RATE_LIMIT_BACKOFF_SECONDS * 2 ** self.backoff, RATE_LIMIT_MAX_BACKOFF_SECONDS)
+                self.backoff += 1
+            delay = max(delay, to_float(header(headers, 'Retry-After')) or 0)
+            print(f"{self.venue} rate limit hit, backing off {delay:.1f}s at {self.rate:.1f} req/s")
+            self.pause(delay)
+        else:
+            with self.lock:
+                self.backoff = 0
+                self.rate = min(self.max_rate, self.rate + self.max_rate * RATE_LIMIT_RECOVERY)
+            remaining = to_float(header(headers, 'X-Bapi-Limit-Status'))
+            reset_ms = to_float(header(headers, 'X-Bapi-Limit-Reset-Timestamp'))
+            if remaining is not None and remaining <= 1 and reset_ms:
+                self.pause(max(0, reset_ms / 1000 - time.time()))
+        metrics.set('request_rate_limit', self.rate, venue=self.venue)
+
+def header(headers, name):
+    """Case insensitive lookup, async ccxt hands over a plain dict"""
+    if not headers:
+        return None
+    value = headers.get(name)
+    if value is None:
+        lowered = name.lower()
+        value = next((value for key, value in headers.items() if key.lower() == lowered), None)
+    return value
+
+def limit_exchange(exchange, limiter):
+    """Route a ccxt client's throttling through limiter, with our endpoint weights"""
+    calculate_cost = exchange.calculate_rate_limiter_cost
+    on_response = exchange.on_rest_response
+
+    def calculate_rate_limiter_cost(api, method, path, params, config={}):
+        return limiter.weight(path, calculate_cost(api, method, path, params, config))
+
+    def on_rest_response(code, reason, url, method, response_headers, response_body, request_headers, request_body):
+        limiter.observe(code, response_headers, response_body)
+        return on_response(code, reason, url, method, response_headers, response_body, request_headers, request_body)
+
+    exchange.enableRateLimit = True
+    exchange.calculate_rate_limiter_cost = calculate_rate_limiter_cost
+    exchange.on_rest_response = on_rest_response
+    if asyncio.iscoroutinefunction(exchange.throttle):
+        exchange.throttle = limiter.acquire_async
+    else:
+        exchange.throttle = limiter.acquire
+    return exchange
@@ -1,55 +1,82 @@
-import ccxt
-import pandas as pd
-import pandas_ta as ta
 import time
-from datetime import datetime, timedelta
 from src.config import (
-    BYBIT_API_KEY, BYBIT_API_SECRET, TIMEFRAME,
-    RSI_PERIOD, MFI_PERIOD, RSI_OVERSOLD, MFI_OVERSOLD,
-    RSI_OVERBOUGHT, MFI_OVERBOUGHT, MIN_24H_VOLUME_USDT,
-    PSAR_ENABLED, PSAR_AF, PSAR_MAX, PSAR_CONSECUTIVE_BARS,
-    TD_SEQ_ENABLED
+    TIMEFRAME, CANDLE_HISTORY_LIMIT,
+    RSI_PERIOD, MFI_PERIOD, MIN_24H_VOLUME_USDT,
+    PSAR_ENABLED, PSAR_AF, PSAR_MAX,
+    TD_SEQ_ENABLED, MARKETS_REFRESH_SECONDS
 )
+from src.candles import Candles
 from src.coingecko_manager import CoinGeckoManager
+from src.market_data import MarketDataEnricher
+from src.exchanges import BybitAdapter, normalize_symbol
+from src.metrics import metrics
+from src.streaming_indicators import IndicatorEngine
+from src.td_sequential import td_setup_counts
+from src.batch_indicators import screen, signal_masks
 
 class Scanner:
-    def __init__(self):
-        self.exchange = ccxt.bybit({
-            'apiKey': BYBIT_API_KEY,
-            'secret': BYBIT_API_SECRET,
-            'enableRateLimit': True,
-            'options': {
-                'defaultType': 'swap',  # Use 'swap' for perpetual futures
-            }
-        })
-        self.cg_manager = CoinGeckoManager()
+    def __init__(self, candle_cache=None, indicator_engine=None, adapter=None, cg_manager=None, signals=None):
+        self.adapter = adapter or BybitAdapter()
+        self.exchange = self.adapter.create_exchange()
+        # Venues can share one CoinGecko manager, the coin data does not depend on the exchange
+        self.cg_manager = cg_manager or CoinGeckoManager()
+        self.candle_cache = candle_cache
+        self.indicator_engine = indicator_engine
+        # SignalMemo, when attached only signals that are new on their candle are returned
+        self.signals = signals
+        self.market_data = MarketDataEnricher(self.exchange, self.adapter)
+        # Last traded price of every pair that passed the volume filter
+        self.last_prices = {}
+        self.markets_loaded_at = 0
+        # Last error loading markets, None once they loaded
+        self.markets_error = None
+
+    def refresh_markets(self):
+        """Load markets once and reload them every MARKETS_REFRESH_SECONDS, returns True when (re)loaded"""
+        if self.exchange.markets and time.time() - self.markets_loaded_at < MARKETS_REFRESH_SECONDS:
+            return False
+        try:
+            self.exchange.load_markets(reload=True)
+            self.markets_loaded_at = time.time()
+            self.markets_error = None
+            return True
+        except Exception as e:
+            self.markets_error = str(e)
+            print(f"Error loading {self.adapter.label} markets: {e}")
+            return False
 
     def get_tickers(self):
-        """Fetch all USDT tickers and filter by volume"""
+        """Fetch all USDT tickers and filter by volume, None when the tickers could not be fetched"""
         try:
-            tickers = self.exchange.fetch_tickers()
+            with metrics.phase('tickers', self.adapter.name):
+                tickers = self.exchange.fetch_tickers()
+            # Keep the snapshot, it already has volume, funding and open interest for enrichment
+            self.market_data.set_snapshot(tickers)
             filtered_symbols = []
+            self.last_prices = {}
             for symbol, data in tickers.items():
                 # Filter for USDT pairs and Volume
                 if '/USDT' in symbol and data['quoteVolume'] is not None:
                     if data['quoteVolume'] >= MIN_24H_VOLUME_USDT:
                         filtered_symbols.append(symbol)
+                        self.last_prices[symbol] = data.get('last')
             print(f"Found {len(filtered_symbols)} pairs matching criteria.")
             return filtered_symbols
         except Exception as e:
             print(f"Error fetching tickers: {e}")
-            return []
+            return None
 
-    def fetch_ohlcv(self, symbol, limit=100):
-        """Fetch OHLCV data"""
+    def fetch_ohlcv(self, symbol, limit=CANDLE_HISTORY_LIMIT):
+        """Fetch Candles, only requesting new bars when a candle cache is attached"""
         try:
-            ohlcv = self.exchange.fetch_ohlcv(symbol, timeframe=TIMEFRAME, limit=limit)
-            if not ohlcv:
-                return None
-            df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-            df.set_index('timestamp', inplace=True)
-            return df
+            with metrics.phase('ohlcv', self.adapter.name):
+                if self.candle_cache is None:
+                    return self.adapter.fetch_candles(self.exchange, symbol, TIMEFRAME, limit=limit)
+
+                since, fetch_limit = self.candle_cache.fetch_params(symbol, TIMEFRAME, limit)
+                candles = self.adapter.fetch_candles(self.exchange, symbol, TIMEFRAME, since, fetch_limit)
+                rows = candles.rows() if candles is not None else []
+                return Candles.from_rows(self.candle_cache.update(symbol, TIMEFRAME, rows))
         except Exception as e:
             print(f"Error fetching OHLCV for {symbol}: {e}")
             return None
@@ -57,38 +84,7 @@ class Scanner:
     def calculate_td_sequential(self, df):
         """Calculate TD Sequential Setup"""
         try:
-            close = df['close']
-            
-            td_buy = []
-            td_sell = []
-            
-            buy_count = 0
-            sell_count = 0
-            
-            for i in range(len(df)):
-                if i < 4:
-                    td_buy.append(0)
-                    td_sell.append(0)
-                    continue
-                    
-                c = close.iloc[i]
-                c4 = close.iloc[i-4]
-                
-                # Buy Setup: Close < Close[4]
-                if c < c4:
-                    buy_count += 1
-                else:
-                    buy_count = 0
-                    
-                # Sell Setup: Close > Close[4]
-                if c > c4:
-                    sell_count += 1
-                else:
-                    sell_count = 0
-                    
-                td_buy.append(buy_count)
-                td_sell.append(sell_count)
-                
+            td_buy, td_sell = td_setup_counts(df['close'].to_numpy())
             df['TD_Buy'] = td_buy
             df['TD_Sell'] = td_sell
             return df
@@ -97,7 +93,10 @@ class Scanner:
             return df
 
     def calculate_indicators(self, df):
-        """Calculate RSI, MFI, VWAP, and ADX"""
+        """Calculate RSI, MFI, VWAP, and ADX with pandas_ta, the reference for the array indicators"""
+        # Only tests and benchmarks still use it, scans go through the array indicators
+        import pandas as pd
+        import pandas_ta as ta
         try:
             # RSI
             df['RSI'] = ta.rsi(df['close'], length=RSI_PERIOD)
@@ -138,184 +137,123 @@ class Scanner:
 
     def get_market_data(self, symbol):
         """Fetch additional market data like Funding Rate and Open Interest"""
-        data = {
-            'funding_rate': 'N/A',
-            'next_funding': 'N/A',
-            'open_interest': 'N/A',
-            'volume_24h': 'N/A',
-            'ls_ratio': 'N/A'
-        }
-        
         try:
-            # Funding Rate
-            try:
-                funding_info = self.exchange.fetch_funding_rate(symbol)
-                data['funding_rate'] = funding_info.get('fundingRate', 'N/A')
-                
-                next_funding_ts = funding_info.get('fundingTimestamp')
-                if next_funding_ts:
-                    now = time.time() * 1000
-                    diff = next_funding_ts - now
-                    if diff > 0:
-                        td = timedelta(milliseconds=diff)
-                        # Format as HH:MM:SS
-                        data['next_funding'] = str(td).split('.')[0]
-                    else:
-                        data['next_funding'] = "00:00:00"
-            except Exception as e:
-                print(f"Error fetching funding rate for {symbol}: {e}")
-
-            # Open Interest
-            try:
-                oi_data = self.exchange.fetch_open_interest(symbol)
-                oi_val = oi_data.get('openInterestAmount')
-                if oi_val:
-                    data['open_interest'] = f"{oi_val:,.0f}"
-            except Exception as e:
-                print(f"Error fetching open interest for {symbol}: {e}")
-
-            # 24h Stats for Volume
-            try:
-                ticker = self.exchange.fetch_ticker(symbol)
-                data['volume_24h'] = ticker.get('quoteVolume', 'N/A')
-            except Exception as e:
-                print(f"Error fetching ticker for {symbol}: {e}")
-
-            # Long/Short Ratio
-            try:
-                # Bybit V5 API for Long/Short Ratio
-                # period: 5min, 15min, 30min, 1h, 4h, 1d
-                # We use the same timeframe as the bot or '15min' explicitly
-                market = self.exchange.market(symbol)
-                market_id = market['id']
-                
-                response = self.exchange.request(
-                    path='v5/market/account-ratio',
-                    api='public',
-                    method='GET',
-                    params={
-                        'category': 'linear',
-                        'symbol': market_id,
-                        'period': '15min',
-                        'limit': 1
-                    }
-                )
-                if response and 'result' in response and 'list' in response['result']:
-                    items = response['result']['list']
-                    if items:
-                        ratio = items[0].get('ratio', 'N/A')
-                        data['ls_ratio'] = ratio
-            except Exception as e:
-                # Silent fail or debug print
-                # print(f"Error fetching L/S ratio for {symbol}: {e}")
-                pass
-
-            return data
+            return self.market_data.get(symbol)
         except Exception as e:
             print(f"Error in get_market_data for {symbol}: {e}")
-            return data
+            return {
+                'funding_rate': 'N/A',
+                'next_funding': 'N/A',
+                'open_interest': 'N/A',
+                'volume_24h': 'N/A',
+                'ls_ratio': 'N/A'
+            }
 
-    def analyze_coin(self, symbol):
+    def analyze_coin(self, symbol, candles=None):
+        """Analyze a symbol, fetching its Candles unless prefetched ones are given"""
         print(f"Analyzing {symbol}...", end='\r')
-        df = self.fetch_ohlcv(symbol)
-        if df is None or len(df) < RSI_PERIOD:
+        if candles is None:
+            candles = self.fetch_ohlcv(symbol)
+        if candles is None:
+            return None
+        if len(candles) < RSI_PERIOD:
+            # Too short a history for a signal yet, it counts as evaluated on this candle
+            if self.signals is not None and len(candles) >= 2:
+                self.signals.record(symbol, int(candles.timestamp[-2]), None)
             return None
 
-        df = self.calculate_indicators(df)
-        
-        # Get latest completed candle (iloc[-2] usually, as -1 is current forming candle)
-        # However, for signals, sometimes we want the current forming candle or the last closed one.
-        # Let's use the last closed candle to avoid repainting.
-        last_candle = df.iloc[-2]
-        current_candle = df.iloc[-1] # Just for reference if needed
+        with metrics.phase('indicators', self.adapter.name):
+            indicators = self.candle_indicators(candles, symbol)
 
-        rsi = last_candle['RSI']
-        mfi = last_candle['MFI']
-        adx = last_candle.get('ADX_14', 0)
-        
-        signal = None
-        td_note = ""
+        signal, td_note = self.evaluate(indicators)
+        if self.signals is not None and not self.signals.record(symbol, int(candles.timestamp[-2]), signal):
+            return None
+        if signal:
+            print(f"\nSignal found for {symbol}: {signal} {td_note}")
+            last_candle = {name: values[-2] for name, values in indicators.items()}
+            return self.build_result(symbol, signal, td_note, last_candle)
         
-        # Strategy Logic
-        # Long: RSI < 20 and MFI < 25
-        if rsi < RSI_OVERSOLD and mfi < MFI_OVERSOLD:
-            signal = 'LONG'
-            if PSAR_ENABLED and 'PSAR' in df.columns:
-                # Check if price has been BELOW PSAR for the last N bars
-                # We look at the last N closed candles
-                last_n_candles = df.iloc[-(PSAR_CONSECUTIVE_BARS + 1):-1]
-                if len(last_n_candles) < PSAR_CONSECUTIVE_BARS:
-                    signal = None # Not enough data
-                else:
-                    # Check if ALL closes are < PSAR
-                    if not (last_n_candles['close'] < last_n_candles['PSAR']).all():
-                        signal = None
-            
-            if TD_SEQ_ENABLED and signal == 'LONG':
-                # Check last 5 closed candles for TD Buy 9 or 13
-                # df.iloc[-2] is last_candle (closed)
-                # We want range [-6:-1] -> indices -6, -5, -4, -3, -2
-                recent_td = df['TD_Buy'].iloc[-6:-1]
-                has_9 = (recent_td == 9).any()
-                has_13 = (recent_td == 13).any()
-                
-                if not (has_9 or has_13):
-                    signal = None
-                else:
-                    if has_13:
-                        td_note = "TD Buy 13"
-                    else:
-                        td_note = "TD Buy 9"
+        return None
 
-        # Short: RSI > 80 and MFI > 80
-        elif rsi > RSI_OVERBOUGHT and mfi > MFI_OVERBOUGHT:
+    def candle_indicators(self, candles, symbol=None):
+        """Indicator arrays of one symbol by column name, calculate_indicators without a DataFrame"""
+        engine = self.indicator_engine
+        if engine is None or symbol is None:
+            # Scalar updates on a fresh state beat the panel functions' per-bar loops for one symbol
+            engine = IndicatorEngine()
+        indicators = engine.compute((symbol, TIMEFRAME), candles)
+        indicators['close'] = candles.close
+        return indicators
+
+    def evaluate(self, indicators):
+        """Apply the strategy rules to indicator arrays, returns (signal, td_note) for the last closed candle"""
+        long, short, td_13 = signal_masks({name: values[None, :] for name, values in indicators.items()})
+        if long[0, -2]:
+            signal = 'LONG'
+        elif short[0, -2]:
             signal = 'SHORT'
-            if PSAR_ENABLED and 'PSAR' in df.columns:
-                # Check if price has been ABOVE PSAR for the last N bars
-                last_n_candles = df.iloc[-(PSAR_CONSECUTIVE_BARS + 1):-1]
-                if len(last_n_candles) < PSAR_CONSECUTIVE_BARS:
-                    signal = None
-                else:
-                    # Check if ALL closes are > PSAR
-                    if not (last_n_candles['close'] > last_n_candles['PSAR']).all():
-                        signal = None
-            
-            if TD_SEQ_ENABLED and signal == 'SHORT':
-                # Check last 5 closed candles for TD Sell 9 or 13
-                recent_td = df['TD_Sell'].iloc[-6:-1]
-                has_9 = (recent_td == 9).any()
-                has_13 = (recent_td == 13).any()
-                
-                if not (has_9 or has_13):
-                    signal = None
-                else:
-                    if has_13:
-                        td_note = "TD Sell 13"
-                    else:
-                        td_note = "TD Sell 9"
-            
-        if signal:
-            print(f"\nSignal found for {symbol}: {signal} {td_note}")
+        else:
+            return None, ""
+        td_note = ""
+        if TD_SEQ_ENABLED:
+            side = "Buy" if signal == 'LONG' else "Sell"
+            td_note = f"TD {side} {13 if td_13[0, -2] else 9}"
+        return signal, td_note
+
+    def build_result(self, symbol, signal, td_note, last_candle):
+        """Enrich a signal with market and CoinGecko data"""
+        with metrics.phase('enrichment', self.adapter.name):
             market_data = self.get_market_data(symbol)
+        with metrics.phase('coingecko', self.adapter.name):
             cg_data = self.cg_manager.get_coin_details(symbol)
-            
-            if market_data:
-                result = {
-                    'symbol': symbol,
-                    'signal': signal,
-                    'rsi': rsi,
-                    'mfi': mfi,
-                    'adx': adx,
-                    'price': last_candle['close'],
-                    'vwap': last_candle['VWAP'],
-                    'psar': last_candle['PSAR'] if 'PSAR' in last_candle else 'N/A',
-                    'td_buy': last_candle.get('TD_Buy', 0),
-                    'td_sell': last_candle.get('TD_Sell', 0),
-                    'td_note': td_note,
-                    **market_data
-                }
-                if cg_data:
-                    result.update(cg_data)
-                return result
-        
+
+        if market_data:
+            result = {
+                'symbol': symbol,
+                'pair': normalize_symbol(symbol),
+                'exchange': self.adapter.label,
+                'signal': signal,
+                'rsi': last_candle['RSI'],
+                'mfi': last_candle['MFI'],
+                'adx': last_candle.get('ADX_14', 0),
+                'price': last_candle['close'],
+                'vwap': last_candle['VWAP'],
+                'psar': last_candle['PSAR'] if 'PSAR' in last_candle else 'N/A',
+                'td_buy': last_candle.get('TD_Buy', 0),
+                'td_sell': last_candle.get('TD_Sell', 0),
+                'td_note': td_note,
+                **market_data
+            }
+            if cg_data:
+                result.update(cg_data)
+            return result
         return None
+
+    def scan_batch(self, candles_by_symbol):
+        """Screen all symbols at once on a stacked NumPy panel, returns the enriched signals"""
+        with metrics.phase('indicators', self.adapter.name):
+            bar, evaluations, skipped = screen(candles_by_symbol)
+        if skipped:
+            print(f"\n{len(skipped)} pairs are behind the other symbols, leaving them for the next scan.")
+        return self.alert_results(bar, evaluations)
+
+    def alert_results(self, bar, evaluations):
+        """Record screened signals and enrich the ones that should alert"""
+        signalled = []
+        for symbol, signal, td_note, last_candle in evaluations:
+            if self.signals is not None:
+                if not self.signals.record(symbol, bar, signal):
+                    continue
+            elif not signal:
+                continue
+            signalled.append((symbol, signal, td_note, last_candle))
+        with metrics.phase('enrichment', self.adapter.name):
+            self.market_data.prefetch([symbol for symbol, _, _, _ in signalled])
+
+        results = []
+        for symbol, signal, td_note, last_candle in signalled:
+            print(f"\nSignal found for {symbol}: {signal} {td_note}")
+            result = self.build_result(symbol, signal, td_note, last_candle)
+            if result:
+                results.append(result)
+        return results
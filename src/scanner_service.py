@@ -0,0 +1,174 @@
+from src.scanner import Scanner
+from src.async_scanner import AsyncScanner
+from src.candle_cache import CandleCache
+from src.candle_store import create_store
+from src.streaming_indicators import IndicatorEngine
+from src.multi_timeframe import MultiTimeframeScanner
+from src.telegram_sender import TelegramSender
+from src.exchanges import get_adapters
+from src.scheduler import CandleScheduler
+from src.prefilter import RsiPrefilter
+from src.signal_memo import SignalMemo
+from src.sharding import ShardedScanner, budget_share
+from src.state_store import create_state, load_json_hash, save_json_hash
+from src.config import (
+    EXCHANGES, TIMEFRAME, MTF_BASE_TIMEFRAME, ASYNC_SCAN_ENABLED, CANDLE_CACHE_ENABLED, SHARD_WORKERS,
+    STREAMING_INDICATORS_ENABLED, STREAM_MODE_ENABLED, COINGECKO_BACKGROUND_REFRESH,
+    MTF_ENABLED, PREFILTER_ENABLED
+)
+
+class Venue:
+    """Scanner, async client and caches of one exchange"""
+    def __init__(self, adapter, cg_manager=None, state=None):
+        self.adapter = adapter
+        self.state = state
+        if SHARD_WORKERS > 0:
+            # Set before the first client is created, the shard workers take the rest of the budget
+            adapter.budget_share = budget_share(SHARD_WORKERS)
+        # Candles survive between scans so each pass only downloads the newest bars
+        self.candle_cache = None
+        if CANDLE_CACHE_ENABLED or STREAM_MODE_ENABLED:
+            self.candle_cache = CandleCache(store=create_store(self.adapter))
+        self.indicator_engine = IndicatorEngine() if STREAMING_INDICATORS_ENABLED else None
+        self.signals = SignalMemo(TIMEFRAME, state, f"signals:{adapter.name}")
+        self.scanner = Scanner(
+            candle_cache=self.candle_cache, indicator_engine=self.indicator_engine,
+            adapter=adapter, cg_manager=cg_manager, signals=self.signals
+        )
+        self.async_scanner = AsyncScanner(adapter=adapter, candle_cache=self.candle_cache)
+        # Needs the candles of the async prefetch to seed its state
+        self.prefilter = None
+        if PREFILTER_ENABLED and ASYNC_SCAN_ENABLED:
+            self.prefilter = RsiPrefilter()
+            if state is not None:
+                self.prefilter.states = load_json_hash(state, self.state_key())
+        # Fetching and indicators in worker processes, each one owning a stable slice of the pairs
+        self.shards = None
+        if SHARD_WORKERS > 0:
+            self.shards = ShardedScanner(self.scanner, self.prefilter, SHARD_WORKERS)
+        self.mtf_scanner = None
+        if MTF_ENABLED:
+            # Separate cache, it holds enough base candles for the largest timeframe
+            mtf_async_scanner = AsyncScanner(adapter=adapter)
+            self.mtf_scanner = MultiTimeframeScanner(
+                self.scanner, mtf_async_scanner,
+                signals=SignalMemo(MTF_BASE_TIMEFRAME, state, f"signals:{adapter.name}:mtf")
+            )
+            mtf_async_scanner.candle_cache = CandleCache(
+                capacity=self.mtf_scanner.base_bars, store=create_store(self.adapter)
+            )
+
+    def refresh_markets(self):
+        """Load markets on first use and on schedule, then share them with the async clients"""
+        if self.scanner.refresh_markets():
+            self.async_scanner.set_markets(self.scanner.exchange.markets)
+            if self.mtf_scanner is not None:
+                self.mtf_scanner.async_scanner.set_markets(self.scanner.exchange.markets)
+
+    def state_key(self):
+        return f"prefilter:{self.adapter.name}"
+
+    def reload_state(self):
+        """Pick up the pre-filter state and signals saved by whichever worker scanned last"""
+        if self.state is None:
+            return
+        if self.prefilter is not None:
+            self.prefilter.states = load_json_hash(self.state, self.state_key())
+        self.signals.reload()
+        if self.mtf_scanner is not None:
+            self.mtf_scanner.signals.reload()
+
+    def save_state(self):
+        """Persist the pre-filter state and signals so a restart resumes without refetching or re-alerting"""
+        if self.state is None:
+            return
+        try:
+            if self.prefilter is not None:
+                save_json_hash(self.state, self.state_key(), self.prefilter.states)
+            self.signals.save()
+            if self.mtf_scanner is not None:
+                self.mtf_scanner.signals.save()
+        except Exception as e:
+            print(f"Error saving {self.adapter.label} scan state: {e}")
+
+    def set_clock(self, clock):
+        self.signals.clock = clock
+        if self.prefilter is not None:
+            self.prefilter.clock = clock
+        if self.shards is not None:
+            self.shards.clock = clock
+        if self.mtf_scanner is not None:
+            self.mtf_scanner.signals.clock = clock
+        for cache in (self.candle_cache, self.mtf_scanner and self.mtf_scanner.async_scanner.candle_cache):
+            if cache is not None:
+                cache.clock = clock
+
+    def prioritize(self, symbols):
+        """Symbols whose cached candles are furthest behind first, a fresh close changes them the most"""
+        if self.candle_cache is None:
+            return symbols
+        return sorted(symbols, key=lambda symbol: self.candle_cache.last_timestamp(symbol, TIMEFRAME) or 0)
+
+    def prefetch_ohlcv(self, symbols):
+        if not ASYNC_SCAN_ENABLED or not symbols:
+            return {}
+        return self.async_scanner.fetch_all_ohlcv(symbols)
+
+class ScannerService:
+    """Scanners, exchange clients and caches that live for the whole process instead of one scan"""
+    def __init__(self):
+        # Signals, scan watermark and leader lock are shared by every worker and survive restarts
+        self.state = create_state()
+        adapters = get_adapters(EXCHANGES)
+        self.venues = [Venue(adapters[0], state=self.state)]
+        cg_manager = self.venues[0].scanner.cg_manager
+        self.venues += [Venue(adapter, cg_manager, self.state) for adapter in adapters[1:]]
+        # The first venue also serves stream mode and callers that only know one exchange
+        primary = self.venues[0]
+        self.candle_cache = primary.candle_cache
+        self.indicator_engine = primary.indicator_engine
+        self.scanner = primary.scanner
+        self.async_scanner = primary.async_scanner
+        self.mtf_scanner = primary.mtf_scanner
+        self.sender = TelegramSender()
+        # Scans follow the closes of the smallest scanned timeframe
+        self.scheduler = CandleScheduler(
+            primary.scanner.exchange, MTF_BASE_TIMEFRAME if self.mtf_scanner is not None else TIMEFRAME,
+            state=self.state
+        )
+        for venue in self.venues:
+            venue.set_clock(self.scheduler.now_ms)
+        if COINGECKO_BACKGROUND_REFRESH:
+            cg_manager.start_background_refresh(self.universe)
+
+    def universe(self):
+        """Every pair that passed the volume filter in the latest scans"""
+        symbols = []
+        for venue in self.venues:
+            symbols.extend(venue.scanner.last_prices)
+        return symbols
+
+    def reload_state(self):
+        """Called when this worker becomes the leader, the state it loaded at startup may be hours old"""
+        try:
+            self.scheduler.reload()
+            for venue in self.venues:
+                venue.reload_state()
+        except Exception as e:
+            print(f"Error reloading scan state: {e}")
+
+    def refresh_markets(self):
+        for venue in self.venues:
+            venue.refresh_markets()
+
+    def prefetch_ohlcv(self, symbols):
+        return self.venues[0].prefetch_ohlcv(symbols)
+
+_service = None
+
+def get_service():
+    """Process-wide ScannerService, created on first use"""
+    global _service
+    if _service is None:
+        _service = ScannerService()
+    return _service
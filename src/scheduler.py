@@ -0,0 +1,82 @@
+import math
+import time
+import ccxt
+from src.config import (
+    TIMEFRAME, SCAN_ALIGN_TO_CANDLE_CLOSE, SCAN_CLOSE_DELAY_SECONDS,
+    SCAN_INTERVAL_SECONDS, CLOCK_SYNC_SECONDS
+)
+
+class CandleScheduler:
+    """Times scans to just after each candle close, measured on the exchange's clock
+
+    A scan evaluates the last closed candle, so scanning once right after the close
+    sees every bar at its final values, and any further scan inside the same bar
+    cannot change a signal.
+    """
+    def __init__(self, exchange, timeframe=TIMEFRAME, aligned=SCAN_ALIGN_TO_CANDLE_CLOSE,
+                 close_delay=SCAN_CLOSE_DELAY_SECONDS, interval=SCAN_INTERVAL_SECONDS, state=None):
+        self.exchange = exchange
+        self.period_ms = ccxt.Exchange.parse_timeframe(timeframe) * 1000
+        self.aligned = aligned
+        self.close_delay = close_delay
+        self.interval = interval
+        # Exchange clock minus local clock
+        self.offset_ms = 0
+        self.synced_at = 0
+        # The watermark is persisted so a restart inside a bar doesn't scan it again
+        self.state = state
+        self.watermark_key = f"scan:last_bar:{timeframe}"
+        self.last_scanned_bar = None
+        self.reload()
+
+    def reload(self):
+        """Read the watermark back from the state backend, another worker may have scanned meanwhile"""
+        if self.state is not None:
+            stored = self.state.get(self.watermark_key)
+            self.last_scanned_bar = int(stored) if stored else None
+
+    def sync_clock(self):
+        try:
+            sent = time.time() * 1000
+            server_time = self.exchange.fetch_time()
+            received = time.time() * 1000
+            # Assume the server read its clock halfway through the round trip
+            self.offset_ms = server_time - (sent + received) / 2
+            if abs(self.offset_ms) > 1000:
+                print(f"Local clock is {-self.offset_ms / 1000:+.1f}s off the exchange clock")
+        except Exception as e:
+            print(f"Error syncing exchange time: {e}")
+        # Also after a failure, so an unreachable endpoint is not retried on every call
+        self.synced_at = time.time()
+
+    def maybe_sync(self):
+        if self.aligned and time.time() - self.synced_at >= CLOCK_SYNC_SECONDS:
+            self.sync_clock()
+
+    def now_ms(self):
+        """Current exchange time in milliseconds"""
+        return time.time() * 1000 + self.offset_ms
+
+    def last_closed_bar(self):
+        """Open time of the most recent closed candle"""
+        return int(self.now_ms() // self.period_ms - 1) * self.period_ms
+
+    def due(self):
+        """False while the last closed candle has already been scanned"""
+        if not self.aligned:
+            return True
+        self.maybe_sync()
+        return self.last_closed_bar() != self.last_scanned_bar
+
+    def mark_scanned(self, bar):
+        self.last_scanned_bar = bar
+        if self.state is not None:
+            self.state.set(self.watermark_key, bar)
+
+    def seconds_until_next_scan(self):
+        if not self.aligned:
+            return self.interval
+        self.maybe_sync()
+        now = self.now_ms()
+        next_close = (now // self.period_ms + 1) * self.period_ms
+        return math.ceil((next_close - now) / 1000 + self.close_delay)
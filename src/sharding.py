@@ -0,0 +1,152 @@
+import multiprocessing
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from src.async_scanner import AsyncScanner
+from src.batch_indicators import screen
+from src.candle_cache import CandleCache
+from src.candle_store import create_store
+from src.metrics import metrics
+from src.prefilter import RsiPrefilter
+from src.config import CANDLE_CACHE_ENABLED, PREFILTER_ENABLED, MARKETS_REFRESH_SECONDS, SHARD_WORKERS
+
+def shard_of(symbol, shards):
+    """Shard of a symbol, stable across scans and restarts (unlike hash(), which is salted per process)"""
+    return zlib.crc32(symbol.encode()) % shards
+
+def budget_share(shards):
+    """Share of the venue's request budget of each shard worker and of the scanning process,
+    which still fetches tickers and enrichment data"""
+    return 1 / (shards + 1)
+
+class ShardWorker:
+    """One worker process: async client, candle cache and pre-filter seeding for the pairs of its shard"""
+    def __init__(self, adapter, shard, shards):
+        self.adapter = adapter
+        self.shard = shard
+        adapter.budget_share = budget_share(shards)
+        self.exchange = adapter.create_exchange()
+        candle_cache = CandleCache(store=create_store(adapter)) if CANDLE_CACHE_ENABLED else None
+        self.async_scanner = AsyncScanner(adapter=adapter, candle_cache=candle_cache)
+        self.prefilter = RsiPrefilter() if PREFILTER_ENABLED else None
+        self.offset_ms = 0
+        if candle_cache is not None:
+            candle_cache.clock = lambda: time.time() * 1000 + self.offset_ms
+        self.markets_loaded_at = 0
+
+    def refresh_markets(self):
+        if time.time() - self.markets_loaded_at < MARKETS_REFRESH_SECONDS:
+            return
+        try:
+            self.exchange.load_markets(reload=True)
+            self.async_scanner.set_markets(self.exchange.markets)
+            self.markets_loaded_at = time.time()
+        except Exception as e:
+            print(f"Error loading markets in shard {self.shard}: {e}")
+
+    def scan(self, symbols, offset_ms=0):
+        """Fetch and screen symbols, returns what the scanning process needs to record and enrich signals"""
+        start = time.perf_counter()
+        self.offset_ms = offset_ms
+        self.refresh_markets()
+        candles = self.async_scanner.fetch_all_ohlcv(symbols)
+        states = {}
+        if self.prefilter is not None:
+            self.prefilter.seed(candles)
+            states = {symbol: self.prefilter.states[symbol] for symbol in candles if symbol in self.prefilter.states}
+        bar, evaluations, skipped = screen(candles)
+        return {
+            'bar': bar,
+            'evaluations': evaluations,
+            'prefilter': states,
+            'skipped': skipped,
+            'fetched': len(candles),
+            'seconds': time.perf_counter() - start,
+        }
+
+_worker = None
+
+def init_worker(adapter, shard, shards):
+    global _worker
+    _worker = ShardWorker(adapter, shard, shards)
+
+def scan_shard(symbols, offset_ms):
+    return _worker.scan(symbols, offset_ms)
+
+class ShardedScanner:
+    """Splits the pairs of a scan over worker processes, by a stable hash of the symbol
+
+    Parsing candles and computing indicators is CPU bound, so in one process the GIL keeps
+    the whole universe on one core. Each worker keeps a warm client, candle cache and store
+    for the pairs of its shard and only returns the screened signals. Recording them and
+    enriching the few that alert happens here, so all shards feed one alert stream.
+    """
+    def __init__(self, scanner, prefilter=None, workers=SHARD_WORKERS):
+        self.scanner = scanner
+        self.prefilter = prefilter
+        self.workers = workers
+        # One single-process pool per shard, so a shard always lands on the same warm worker
+        self.pools = [None] * workers
+        self.clock = lambda: time.time() * 1000
+        # Shards whose pairs went unscanned in the last scan
+        self.failed = []
+
+    def pool(self, shard):
+        if self.pools[shard] is None:
+            # Spawned rather than forked, a fork would copy locks held by the scanning process' threads
+            self.pools[shard] = ProcessPoolExecutor(
+                max_workers=1, mp_context=multiprocessing.get_context('spawn'),
+                initializer=init_worker, initargs=(self.scanner.adapter, shard, self.workers)
+            )
+        return self.pools[shard]
+
+    def split(self, symbols):
+        shards = [[] for _ in range(self.workers)]
+        for symbol in symbols:
+            shards[shard_of(symbol, self.workers)].append(symbol)
+        return shards
+
+    def scan(self, symbols):
+        """Screen symbols in the workers, returns the enriched signals of every shard"""
+        # Workers run on the same exchange clock as the scheduler
+        offset_ms = self.clock() - time.time() * 1000
+        name = self.scanner.adapter.name
+        futures = {}
+        for shard, part in enumerate(self.split(symbols)):
+            if part:
+                metrics.set('shard_symbols', len(part), venue=name, shard=shard)
+                futures[self.pool(shard).submit(scan_shard, part, offset_ms)] = shard
+
+        results = []
+        self.failed = []
+        for future in as_completed(futures):
+            shard = futures[future]
+            try:
+                outcome = future.result()
+            except BrokenProcessPool as e:
+                # Its pairs stay unevaluated and are scanned again by a fresh worker next time
+                print(f"\nShard {shard} of {self.scanner.adapter.label} died, restarting it: {e}")
+                self.close(shard)
+                self.failed.append(shard)
+                continue
+            except Exception as e:
+                print(f"\nError in shard {shard} of {self.scanner.adapter.label}: {e}")
+                self.failed.append(shard)
+                continue
+            metrics.set('shard_seconds', outcome['seconds'], venue=name, shard=shard)
+            if outcome['fetched']:
+                metrics.observe('symbol_seconds', outcome['seconds'] / outcome['fetched'], venue=name, path='shard')
+            if outcome['skipped']:
+                print(f"\n{len(outcome['skipped'])} pairs of shard {shard} are behind the other symbols, leaving them for the next scan.")
+            if self.prefilter is not None:
+                self.prefilter.states.update(outcome['prefilter'])
+            results.extend(self.scanner.alert_results(outcome['bar'], outcome['evaluations']))
+        return results
+
+    def close(self, shard=None):
+        """Stop one worker, or all of them"""
+        for index in range(self.workers) if shard is None else [shard]:
+            pool, self.pools[index] = self.pools[index], None
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,86 @@
+import threading
+import time
+import ccxt
+from src.config import TIMEFRAME
+from src.state_store import load_json_hash, save_json_hash
+
+class SignalMemo:
+    """Signal of every symbol on the last closed candle it was evaluated on
+
+    Symbols already evaluated on the current closed candle are skipped by the next scan,
+    and a signal only alerts when it is new: a symbol that keeps the same signal from one
+    candle to the next alerts once. Kept in the state backend, so restarts don't repeat alerts.
+    """
+    def __init__(self, timeframe=TIMEFRAME, state=None, name='signals'):
+        self.period_ms = ccxt.Exchange.parse_timeframe(timeframe) * 1000
+        self.state = state
+        self.name = name
+        # symbol -> [open time of the evaluated closed candle, 'LONG', 'SHORT' or None]
+        self.entries = {}
+        self.changed = {}
+        self.lock = threading.Lock()
+        self.reload()
+        # Milliseconds on the exchange clock, replaced by the scheduler's skew corrected clock
+        self.clock = lambda: time.time() * 1000
+
+    def reload(self):
+        """Catch up with the entries in the state backend, e.g. those of a previous leader"""
+        if self.state is None:
+            return
+        entries = load_json_hash(self.state, self.name)
+        with self.lock:
+            # Entries not saved yet are newer than the stored ones
+            entries.update(self.changed)
+            self.entries = entries
+
+    def closed_bar(self):
+        return int(self.clock() // self.period_ms - 1) * self.period_ms
+
+    def pending(self, symbols):
+        """Symbols that have not been evaluated on the last closed candle yet"""
+        bar = self.closed_bar()
+        return [symbol for symbol in symbols if (self.entries.get(symbol) or [None])[0] != bar]
+
+    def record(self, symbol, bar, signal):
+        """Remember the signal on the closed candle opening at bar, returns True when it should alert"""
+        with self.lock:
+            previous = self.entries.get(symbol)
+            if previous is not None and previous[0] > bar:
+                # Older candles than the ones already evaluated
+                return False
+            self.entries[symbol] = self.changed[symbol] = [bar, signal]
+        if signal is None:
+            return False
+        if previous is None:
+            return True
+        previous_bar, previous_signal = previous
+        # It carries on when the same or the previous candle already had it
+        return previous_signal != signal or bar - previous_bar not in (0, self.period_ms)
+
+    def carry(self, symbols, bar):
+        """Count symbols as evaluated on the closed candle opening at bar without evaluating them
+
+        For pairs the pre-filter dropped: a signal they had on the previous candle carries
+        on through this one, so it doesn't alert again when they are scanned next.
+        """
+        with self.lock:
+            for symbol in symbols:
+                previous = self.entries.get(symbol)
+                if previous is not None and previous[0] >= bar:
+                    continue
+                signal = previous[1] if previous is not None and bar - previous[0] == self.period_ms else None
+                self.entries[symbol] = self.changed[symbol] = [bar, signal]
+
+    def save(self):
+        """Write the entries recorded since the last save to the state backend"""
+        with self.lock:
+            changed, self.changed = self.changed, {}
+        if self.state is None or not changed:
+            return
+        try:
+            save_json_hash(self.state, self.name, changed)
+        except Exception:
+            # Keep them for the next save, newer entries recorded meanwhile win
+            with self.lock:
+                self.changed = {**changed, **self.changed}
+            raise
@@ -0,0 +1,88 @@
+import importlib
+import threading
+import time
+from src.metrics import metrics
+
+# Imported one by one so each one's cost shows up on its own, src.main last pulls in the rest of the bot
+HEAVY_MODULES = ('numpy', 'ccxt', 'ccxt.async_support', 'telegram', 'src.main')
+
+class Startup:
+    """Loads the heavy modules, the scanner service and markets in the background and tracks readiness"""
+    def __init__(self, modules=HEAVY_MODULES):
+        self.modules = modules
+        self.started_at = time.time()
+        self.stage = 'starting'
+        self.error = None
+        self.service = None
+        self.ready = threading.Event()
+        # Seconds per imported module and per loading step, in the order they ran
+        self.import_seconds = {}
+        self.step_seconds = {}
+
+    def step(self, name, function):
+        self.stage = name
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        self.step_seconds[name] = round(elapsed, 4)
+        metrics.set('startup_step_seconds', elapsed, step=name)
+        return result
+
+    def import_modules(self):
+        for name in self.modules:
+            start = time.perf_counter()
+            importlib.import_module(name)
+            elapsed = time.perf_counter() - start
+            self.import_seconds[name] = round(elapsed, 4)
+            metrics.set('import_seconds', elapsed, module=name)
+
+    def load(self):
+        """Import everything and build the service with markets loaded, returns the service"""
+        try:
+            self.step('imports', self.import_modules)
+            from src.scanner_service import get_service
+            self.service = self.step('service', get_service)
+            self.step('markets', self.service.refresh_markets)
+            # Each venue stands on its own, scans reload the markets of the ones that failed
+            missing = [venue.adapter.label for venue in self.service.venues if not venue.scanner.exchange.markets]
+            if len(missing) == len(self.service.venues):
+                raise RuntimeError(f"markets not loaded for {', '.join(missing)}")
+            if missing:
+                print(f"Markets not loaded for {', '.join(missing)}, retrying on every scan")
+        except Exception as e:
+            self.stage = 'failed'
+            self.error = str(e)
+            print(f"Startup failed: {e}")
+            raise
+        self.stage = 'ready'
+        self.error = None
+        metrics.set('ready', 1)
+        self.ready.set()
+        print(f"Ready in {time.time() - self.started_at:.2f}s ({self.summary()})")
+        return self.service
+
+    def summary(self):
+        return ", ".join(f"{name} {seconds:.2f}s" for name, seconds in {**self.import_seconds, **self.step_seconds}.items())
+
+    def venues(self):
+        """Whether each venue's markets are loaded, and why not"""
+        if self.service is None:
+            return {}
+        return {
+            venue.adapter.name: {
+                'markets_loaded': bool(venue.scanner.exchange.markets),
+                'error': venue.scanner.markets_error,
+            }
+            for venue in self.service.venues
+        }
+
+    def status(self):
+        return {
+            'stage': self.stage,
+            'ready': self.ready.is_set(),
+            'error': self.error,
+            'since_start': round(time.time() - self.started_at, 3),
+            'import_seconds': self.import_seconds,
+            'step_seconds': self.step_seconds,
+            'venues': self.venues(),
+        }
@@ -0,0 +1,234 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from src.config import (
+    STATE_BACKEND, STATE_DB_PATH, REDIS_URL, LEADER_LOCK_TTL_SECONDS
+)
+
+class MemoryState:
+    """In-process stand-in with the same interface, for a single process and for benchmarks"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {}
+        self.hashes = {}
+
+    def get(self, key):
+        with self.lock:
+            item = self.values.get(key)
+            if item is None or (item[1] is not None and item[1] <= time.time()):
+                return None
+            return item[0]
+
+    def set(self, key, value, ex=None, nx=False):
+        """Redis SET: ex is a TTL in seconds, nx only sets a missing key, returns whether it was set"""
+        with self.lock:
+            item = self.values.get(key)
+            if nx and item is not None and (item[1] is None or item[1] > time.time()):
+                return False
+            self.values[key] = (str(value), time.time() + ex if ex else None)
+            return True
+
+    def delete(self, key):
+        with self.lock:
+            self.values.pop(key, None)
+
+    def acquire_lock(self, key, token, ex):
+        """Take or refresh a lock that is free, expired or already held by token"""
+        with self.lock:
+            item = self.values.get(key)
+            if item is None or item[0] == token or item[1] <= time.time():
+                self.values[key] = (token, time.time() + ex)
+                return True
+            return False
+
+    def release_lock(self, key, token):
+        with self.lock:
+            item = self.values.get(key)
+            if item is not None and item[0] == token:
+                del self.values[key]
+
+    def hset(self, name, mapping):
+        with self.lock:
+            self.hashes.setdefault(name, {}).update({field: str(value) for field, value in mapping.items()})
+
+    def hgetall(self, name):
+        with self.lock:
+            return dict(self.hashes.get(name, {}))
+
+class SQLiteState:
+    """State shared by the processes of one host, in a SQLite file in WAL mode"""
+    def __init__(self, path=STATE_DB_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.lock = threading.Lock()
+        # Other processes hold the write lock only for single statements
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        with self.lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS hashes ("
+                "name TEXT NOT NULL, field TEXT NOT NULL, value TEXT NOT NULL, PRIMARY KEY (name, field))"
+            )
+
+    def get(self, key):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT value FROM kv WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, value, ex=None, nx=False):
+        now = time.time()
+        expires_at = now + ex if ex else None
+        with self.lock, self.conn:
+            if nx:
+                # Expired keys count as missing
+                cursor = self.conn.execute(
+                    "INSERT INTO kv (key, value, expires_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at "
+                    "WHERE kv.expires_at IS NOT NULL AND kv.expires_at <= ?",
+                    (key, str(value), expires_at, now)
+                )
+                return cursor.rowcount > 0
+            self.conn.execute(
+                "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, str(value), expires_at)
+            )
+            return True
+
+    def delete(self, key):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM kv WHERE key = ?", (key,))
+
+    def acquire_lock(self, key, token, ex):
+        now = time.time()
+        with self.lock, self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO kv (key, value, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at "
+                "WHERE kv.value = excluded.value OR kv.expires_at <= ?",
+                (key, token, now + ex, now)
+            )
+            return cursor.rowcount > 0
+
+    def release_lock(self, key, token):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM kv WHERE key = ? AND value = ?", (key, token))
+
+    def hset(self, name, mapping):
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO hashes (name, field, value) VALUES (?, ?, ?)",
+                [(name, field, str(value)) for field, value in mapping.items()]
+            )
+
+    def hgetall(self, name):
+        with self.lock:
+            rows = self.conn.execute("SELECT field, value FROM hashes WHERE name = ?", (name,)).fetchall()
+        return dict(rows)
+
+class RedisState:
+    """State shared between hosts, needs the optional redis package"""
+    # Refresh our own lock or take a free one in a single round trip
+    ACQUIRE_SCRIPT = (
+        "local owner = redis.call('GET', KEYS[1]) "
+        "if owner == false or owner == ARGV[1] then "
+        "redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2]) return 1 end "
+        "return 0"
+    )
+    RELEASE_SCRIPT = (
+        "if redis.call('GET', KEYS[1]) == ARGV[1] then return redis.call('DEL', KEYS[1]) end return 0"
+    )
+
+    def __init__(self, url=REDIS_URL):
+        import redis
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self.acquire_script = self.client.register_script(self.ACQUIRE_SCRIPT)
+        self.release_script = self.client.register_script(self.RELEASE_SCRIPT)
+
+    def get(self, key):
+        return self.client.get(key)
+
+    def set(self, key, value, ex=None, nx=False):
+        return bool(self.client.set(key, value, ex=int(ex) if ex else None, nx=nx))
+
+    def delete(self, key):
+        self.client.delete(key)
+
+    def acquire_lock(self, key, token, ex):
+        return bool(self.acquire_script(keys=[key], args=[token, int(ex)]))
+
+    def release_lock(self, key, token):
+        self.release_script(keys=[key], args=[token])
+
+    def hset(self, name, mapping):
+        if mapping:
+            self.client.hset(name, mapping=mapping)
+
+    def hgetall(self, name):
+        return self.client.hgetall(name)
+
+def create_state(backend=STATE_BACKEND):
+    if backend == 'redis':
+        try:
+            return RedisState()
+        except Exception as e:
+            print(f"Error connecting to Redis, falling back to SQLite state: {e}")
+    if backend == 'memory':
+        return MemoryState()
+    return SQLiteState()
+
+class LeaderLock:
+    """Only the worker holding this lock scans, the others stand by and take over when it expires"""
+    def __init__(self, state, name='scanner', ttl=LEADER_LOCK_TTL_SECONDS, on_elected=None):
+        self.state = state
+        # Called before scanning starts whenever this worker takes over the lock
+        self.on_elected = on_elected
+        self.key = f"lock:{name}"
+        self.ttl = ttl
+        self.token = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.is_leader = False
+        self.heartbeat = None
+
+    def acquire(self):
+        try:
+            leader = self.state.acquire_lock(self.key, self.token, self.ttl)
+        except Exception as e:
+            print(f"Error refreshing leader lock: {e}")
+            leader = False
+        if leader != self.is_leader:
+            print("This worker is now the scanning leader." if leader else "Lost scanning leadership, standing by.")
+            if leader and self.on_elected is not None:
+                self.on_elected()
+        self.is_leader = leader
+        return leader
+
+    def keep_alive(self):
+        """Refresh (or try to take) the lock from a daemon thread, well within its TTL"""
+        def run():
+            while True:
+                time.sleep(self.ttl / 3)
+                self.acquire()
+
+        self.acquire()
+        self.heartbeat = threading.Thread(target=run, daemon=True)
+        self.heartbeat.start()
+
+    def release(self):
+        self.state.release_lock(self.key, self.token)
+        self.is_leader = False
+
+def load_json_hash(state, name):
+    return {field: json.loads(value) for field, value in state.hgetall(name).items()}
+
+def save_json_hash(state, name, mapping):
+    state.hset(name, {field: json.dumps(value) for field, value in mapping.items()})
@@ -0,0 +1,266 @@
+import math
+from collections import deque
+import numpy as np
+from src.config import (
+    RSI_PERIOD, MFI_PERIOD, CANDLE_HISTORY_LIMIT,
+    PSAR_ENABLED, PSAR_AF, PSAR_MAX, TD_SEQ_ENABLED
+)
+
+NAN = float('nan')
+ADX_PERIOD = 14
+DAY_MS = 86400000
+
+class WilderAverage:
+    """Incremental version of pandas_ta's rma (adjusted EWM with alpha = 1 / length)"""
+    def __init__(self, length):
+        self.decay = 1.0 - 1.0 / length
+        self.min_periods = length
+        self.num = 0.0
+        self.den = 0.0
+        self.count = 0
+
+    def update(self, x):
+        # Missing values still age the previous weights, like pandas' ignore_na=False
+        self.num *= self.decay
+        self.den *= self.decay
+        if not math.isnan(x):
+            self.num += x
+            self.den += 1.0
+            self.count += 1
+        return self.value()
+
+    def value(self):
+        if self.count < self.min_periods:
+            return NAN
+        return self.num / self.den
+
+class RsiState:
+    def __init__(self, length=RSI_PERIOD):
+        self.gain = WilderAverage(length)
+        self.loss = WilderAverage(length)
+        self.prev_close = None
+
+    def update(self, close):
+        if self.prev_close is None:
+            diff = NAN
+        else:
+            diff = close - self.prev_close
+        self.prev_close = close
+        avg_gain = self.gain.update(max(diff, 0.0) if not math.isnan(diff) else NAN)
+        avg_loss = self.loss.update(max(-diff, 0.0) if not math.isnan(diff) else NAN)
+        if avg_gain + avg_loss == 0:
+            return NAN
+        return 100 * avg_gain / (avg_gain + avg_loss)
+
+class MfiState:
+    def __init__(self, length=MFI_PERIOD):
+        self.flows = deque(maxlen=length)
+        self.prev_tp = None
+
+    def update(self, high, low, close, volume):
+        tp = (high + low + close) / 3.0
+        raw_flow = tp * volume
+        positive = negative = 0.0
+        if self.prev_tp is not None:
+            if tp > self.prev_tp:
+                positive = raw_flow
+            elif tp < self.prev_tp:
+                negative = raw_flow
+        self.prev_tp = tp
+        self.flows.append((positive, negative))
+        if len(self.flows) < self.flows.maxlen:
+            return NAN
+        pos_sum = sum(f[0] for f in self.flows)
+        neg_sum = sum(f[1] for f in self.flows)
+        if pos_sum + neg_sum == 0:
+            return NAN
+        return 100 * pos_sum / (pos_sum + neg_sum)
+
+class VwapState:
+    """Daily anchored VWAP, reset at the UTC day boundary like pandas_ta's anchor='D'"""
+    def __init__(self):
+        self.day = None
+        self.price_volume = 0.0
+        self.volume = 0.0
+
+    def update(self, timestamp, high, low, close, volume):
+        day = timestamp // DAY_MS
+        if day != self.day:
+            self.day = day
+            self.price_volume = 0.0
+            self.volume = 0.0
+        self.price_volume += (high + low + close) / 3.0 * volume
+        self.volume += volume
+        if self.volume == 0:
+            return NAN
+        return self.price_volume / self.volume
+
+class AdxState:
+    def __init__(self, length=ADX_PERIOD):
+        self.atr = WilderAverage(length)
+        self.plus_dm = WilderAverage(length)
+        self.minus_dm = WilderAverage(length)
+        self.adx = WilderAverage(length)
+        self.prev = None
+
+    def update(self, high, low, close):
+        if self.prev is None:
+            true_range = plus = minus = NAN
+        else:
+            prev_high, prev_low, prev_close = self.prev
+            true_range = max(high - low, abs(high - prev_close), abs(low - prev_close))
+            up = high - prev_high
+            down = prev_low - low
+            plus = up if (up > down and up > 0) else 0.0
+            minus = down if (down > up and down > 0) else 0.0
+        self.prev = (high, low, close)
+
+        atr = self.atr.update(true_range)
+        k = 100 / atr if atr else NAN
+        dmp = k * self.plus_dm.update(plus)
+        dmn = k * self.minus_dm.update(minus)
+        dx = NAN
+        if dmp + dmn > 0:
+            dx = 100 * abs(dmp - dmn) / (dmp + dmn)
+        return self.adx.update(dx), dmp, dmn
+
+class PsarState:
+    """Parabolic SAR stepped one bar at a time, following pandas_ta.psar"""
+    def __init__(self, af0=PSAR_AF, max_af=PSAR_MAX):
+        self.af0 = af0
+        self.max_af = max_af
+        self.af = af0
+        self.falling = None
+        self.sar = None
+        self.ep = None
+        self.bars = []  # (high, low) of the last two bars
+
+    def update(self, high, low, close):
+        if not self.bars:
+            self.bars.append((high, low))
+            self.sar = close
+            return NAN
+
+        prev_high, prev_low = self.bars[-1]
+        if self.falling is None:
+            # Initial direction comes from the first two bars, as in pandas_ta
+            up = high - prev_high
+            down = prev_low - low
+            self.falling = down > up and down > 0
+            self.ep = prev_low if self.falling else prev_high
+        # pandas_ta wraps around to the last bar of the series here on the second bar,
+        # which a stream cannot know, so the oldest bar we have is used instead
+        older_high, older_low = self.bars[0]
+
+        sar = self.sar + self.af * (self.ep - self.sar)
+        if self.falling:
+            reverse = high > sar
+            if low < self.ep:
+                self.ep = low
+                self.af = min(self.af + self.af0, self.max_af)
+            sar = max(prev_high, older_high, sar)
+        else:
+            reverse = low < sar
+            if high > self.ep:
+                self.ep = high
+                self.af = min(self.af + self.af0, self.max_af)
+            sar = min(prev_low, older_low, sar)
+
+        if reverse:
+            sar = self.ep
+            self.af = self.af0
+            self.falling = not self.falling
+            self.ep = low if self.falling else high
+
+        self.sar = sar
+        self.bars = [self.bars[-1], (high, low)]
+        return sar
+
+class TdState:
+    def __init__(self):
+        self.closes = deque(maxlen=4)
+        self.buy_count = 0
+        self.sell_count = 0
+
+    def update(self, close):
+        if len(self.closes) == 4:
+            c4 = self.closes[0]
+            self.buy_count = self.buy_count + 1 if close < c4 else 0
+            self.sell_count = self.sell_count + 1 if close > c4 else 0
+        self.closes.append(close)
+        return self.buy_count, self.sell_count
+
+class SymbolIndicatorState:
+    """All indicator state of one symbol, advanced once per closed candle"""
+    def __init__(self, history=CANDLE_HISTORY_LIMIT):
+        self.rsi = RsiState()
+        self.mfi = MfiState()
+        self.vwap = VwapState()
+        self.adx = AdxState()
+        self.psar = PsarState() if PSAR_ENABLED else None
+        self.td = TdState() if TD_SEQ_ENABLED else None
+        self.last_timestamp = None
+        self.history = deque(maxlen=history)
+
+    def update(self, timestamp, high, low, close, volume):
+        values = {
+            'RSI': self.rsi.update(close),
+            'MFI': self.mfi.update(high, low, close, volume),
+            'VWAP': self.vwap.update(timestamp, high, low, close, volume),
+        }
+        values[f'ADX_{ADX_PERIOD}'], values[f'DMP_{ADX_PERIOD}'], values[f'DMN_{ADX_PERIOD}'] = \
+            self.adx.update(high, low, close)
+        if self.psar is not None:
+            values['PSAR'] = self.psar.update(high, low, close)
+        if self.td is not None:
+            values['TD_Buy'], values['TD_Sell'] = self.td.update(close)
+        self.last_timestamp = timestamp
+        self.history.append((timestamp, values))
+        return values
+
+class IndicatorEngine:
+    """Keeps indicator state per (symbol, timeframe) and only processes newly closed candles
+
+    The state reaches back past the cached window the batch screen sees, so RSI, ADX and PSAR
+    can differ slightly from it on the same candle (bounded in tests/test_indicator_window.py).
+    """
+    def __init__(self, history=CANDLE_HISTORY_LIMIT):
+        self.history = history
+        self.states = {}
+
+    def compute(self, key, candles):
+        """Indicator arrays aligned with candles, computing only the candles closed since the last call"""
+        timestamps = candles.timestamp
+        # The last row is the forming candle, it is never fed into the state
+        closed = len(candles) - 1
+
+        state = self.states.get(key)
+        if state is not None:
+            last_ts = state.last_timestamp
+            if last_ts is None or closed == 0 or last_ts < timestamps[0] or last_ts > timestamps[closed - 1]:
+                state = None
+            else:
+                start = int(np.searchsorted(timestamps[:closed], last_ts, side='right'))
+                if timestamps[start - 1] != last_ts:
+                    # Cached history was rewritten, start over
+                    state = None
+        if state is None:
+            state = SymbolIndicatorState(self.history)
+            self.states[key] = state
+            start = 0
+
+        high, low, close, volume = candles.high, candles.low, candles.close, candles.volume
+        for i in range(start, closed):
+            state.update(int(timestamps[i]), high[i], low[i], close[i], volume[i])
+
+        lookup = dict(state.history)
+        columns = {}
+        for i, ts in enumerate(timestamps):
+            values = lookup.get(int(ts))
+            if values is None:
+                continue
+            for name, value in values.items():
+                if name not in columns:
+                    columns[name] = np.full(len(candles), np.nan)
+                columns[name][i] = value
+        return columns
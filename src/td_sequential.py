@@ -0,0 +1,18 @@
+import numpy as np
+
+def run_lengths(condition):
+    """Length of the current streak of True values at every position along the last axis"""
+    idx = np.arange(condition.shape[-1])
+    # Index of the most recent False (or -1 before the first one) at each position
+    last_break = np.maximum.accumulate(np.where(condition, -1, idx), axis=-1)
+    return idx - last_break
+
+def td_setup_counts(close, lookback=4):
+    """TD Sequential buy/sell setup counts for a 1-D series or a (symbols x bars) batch"""
+    close = np.asarray(close, dtype=np.float64)
+    buy = np.zeros(close.shape, dtype=bool)
+    sell = np.zeros(close.shape, dtype=bool)
+    # Buy Setup: Close < Close[4], Sell Setup: Close > Close[4]
+    buy[..., lookback:] = close[..., lookback:] < close[..., :-lookback]
+    sell[..., lookback:] = close[..., lookback:] > close[..., :-lookback]
+    return run_lengths(buy), run_lengths(sell)
@@ -1,28 +1,124 @@
 import asyncio
+import queue
+import threading
+import time
 from telegram import Bot
-from src.config import TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID
+from telegram.error import RetryAfter, TimedOut, NetworkError
+from src.metrics import metrics
+from src.config import (
+    TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, TELEGRAM_QUEUE_SIZE,
+    TELEGRAM_BATCH_WINDOW_SECONDS, TELEGRAM_MIN_INTERVAL_SECONDS, TELEGRAM_MAX_RETRIES
+)
+
+MAX_MESSAGE_LENGTH = 4096  # Telegram's limit for one message
+SEPARATOR = "\n\n"
 
 class TelegramSender:
-    def __init__(self):
+    def __init__(self, queue_size=TELEGRAM_QUEUE_SIZE):
         self.token = TELEGRAM_BOT_TOKEN
         self.chat_id = TELEGRAM_CHAT_ID
         self.bot = Bot(token=self.token)
 
-    async def send_message_async(self, message):
-        try:
-            await self.bot.send_message(chat_id=self.chat_id, text=message)
-        except Exception as e:
-            print(f"Error sending telegram message: {e}")
+        # Messages are delivered by one worker thread with its own event loop and Bot session
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.worker = None
+        self.worker_lock = threading.Lock()
+        self.loop = None
+        self.last_sent = 0
 
     def send_message(self, message):
-        """Synchronous wrapper for sending message"""
+        """Queue a message for delivery, never waits on Telegram"""
+        self.start()
+        try:
+            self.queue.put_nowait(message)
+        except queue.Full:
+            print("Telegram queue full, dropping message.")
+            metrics.inc('telegram_messages_total', status='dropped')
+
+    def start(self):
+        with self.worker_lock:
+            if self.worker is None:
+                self.worker = threading.Thread(target=self.run_worker, daemon=True)
+                self.worker.start()
+
+    def flush(self, timeout=30):
+        """Wait until everything queued so far was delivered (or timeout)"""
+        deadline = time.monotonic() + timeout
+        while self.queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.1)
+
+    def run_worker(self):
+        self.loop = asyncio.new_event_loop()
         try:
-            loop = asyncio.get_event_loop()
-            if loop.is_running():
-                # If we are already in an event loop (e.g. jupyter or async app)
-                loop.create_task(self.send_message_async(message))
-            else:
-                asyncio.run(self.send_message_async(message))
-        except RuntimeError:
-            # Fallback for when no event loop is present
-            asyncio.run(self.send_message_async(message))
+            self.loop.run_until_complete(self.bot.initialize())
+        except Exception as e:
+            print(f"Error initializing telegram bot: {e}")
+
+        while True:
+            batch = self.next_batch()
+            try:
+                for text in self.merge(batch):
+                    self.loop.run_until_complete(self.deliver(text))
+            except Exception as e:
+                print(f"Error in telegram worker: {e}")
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def next_batch(self):
+        """Block for one message, then collect whatever else arrives within the batch window"""
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + TELEGRAM_BATCH_WINDOW_SECONDS
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def merge(self, messages):
+        """Join messages into as few Telegram messages as the length limit allows"""
+        merged = []
+        current = ""
+        for message in messages:
+            message = message[:MAX_MESSAGE_LENGTH]
+            if current and len(current) + len(SEPARATOR) + len(message) > MAX_MESSAGE_LENGTH:
+                merged.append(current)
+                current = ""
+            current = f"{current}{SEPARATOR}{message}" if current else message
+        if current:
+            merged.append(current)
+        return merged
+
+    async def deliver(self, text):
+        for attempt in range(TELEGRAM_MAX_RETRIES):
+            # Telegram allows about one message per second to the same chat
+            wait = self.last_sent + TELEGRAM_MIN_INTERVAL_SECONDS - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                with metrics.phase('telegram'):
+                    await self.bot.send_message(chat_id=self.chat_id, text=text)
+                self.last_sent = time.monotonic()
+                metrics.inc('telegram_messages_total', status='sent')
+                return
+            except RetryAfter as e:
+                metrics.inc('rate_limit_hits_total', venue='telegram')
+                # Flood control, Telegram tells us exactly how long to back off
+                delay = e.retry_after
+                if hasattr(delay, 'total_seconds'):
+                    delay = delay.total_seconds()
+                print(f"Telegram flood control, retrying in {delay}s")
+                await asyncio.sleep(delay)
+            except (TimedOut, NetworkError) as e:
+                print(f"Telegram network error ({e}), retrying...")
+                await asyncio.sleep(2 ** attempt)
+            except Exception as e:
+                print(f"Error sending telegram message: {e}")
+                metrics.inc('telegram_messages_total', status='failed')
+                return
+        print("Giving up on telegram message after retries.")
+        metrics.inc('telegram_messages_total', status='failed')
@@ -0,0 +1,206 @@
+import asyncio
+import json
+import time
+import ccxt
+import numpy as np
+import websockets
+from src.candles import Candles
+from src.config import TIMEFRAME
+
+BYBIT_WS_URL = "wss://stream.bybit.com/v5/public/linear"
+SUBSCRIBE_CHUNK = 10  # Topics per subscribe request
+
+def kline_interval(timeframe):
+    """ccxt timeframe to Bybit kline interval (15m -> 15, 1h -> 60, 1d -> D)"""
+    seconds = ccxt.Exchange.parse_timeframe(timeframe)
+    if seconds >= 86400:
+        return {86400: 'D', 604800: 'W'}.get(seconds, 'D')
+    return str(seconds // 60)
+
+class WebSocketTransport:
+    """Live Bybit public stream, optionally recording every frame for later replay"""
+    def __init__(self, url=BYBIT_WS_URL, ping_interval=20, record_path=None):
+        self.url = url
+        self.ping_interval = ping_interval
+        self.record_path = record_path
+        self.connection = None
+        self.ping_task = None
+        self.record_file = None
+
+    async def connect(self):
+        self.connection = await websockets.connect(self.url, ping_interval=None)
+        # Bybit drops connections that don't send an application level ping every 20s
+        self.ping_task = asyncio.create_task(self.keepalive())
+        if self.record_path:
+            self.record_file = open(self.record_path, 'a')
+
+    async def keepalive(self):
+        while True:
+            await asyncio.sleep(self.ping_interval)
+            await self.send({'op': 'ping'})
+
+    async def send(self, message):
+        await self.connection.send(json.dumps(message))
+
+    async def recv(self):
+        try:
+            raw = await self.connection.recv()
+        except websockets.ConnectionClosed:
+            return None
+        if self.record_file:
+            self.record_file.write(raw.strip() + "\n")
+        return json.loads(raw)
+
+    async def close(self):
+        if self.ping_task:
+            self.ping_task.cancel()
+        if self.connection:
+            await self.connection.close()
+        if self.record_file:
+            self.record_file.close()
+            self.record_file = None
+
+class ReplayTransport:
+    """Replays frames recorded to a JSON-lines file, for running the stream without network access"""
+    def __init__(self, path, delay=0):
+        self.path = path
+        self.delay = delay
+        self.file = None
+        self.sent = []
+
+    async def connect(self):
+        self.file = open(self.path)
+
+    async def send(self, message):
+        self.sent.append(message)
+
+    async def recv(self):
+        for line in self.file:
+            if line.strip():
+                if self.delay:
+                    await asyncio.sleep(self.delay)
+                return json.loads(line)
+        return None
+
+    async def close(self):
+        if self.file:
+            self.file.close()
+
+class KlineStream:
+    """Keeps the candle cache current from kline/ticker topics and checks signals on every candle close"""
+    def __init__(self, scanner, symbols, transport, on_signal, timeframe=TIMEFRAME, reconnect=True, leader=None):
+        # The scanner must have a candle cache and loaded markets, REST backfills land in the same cache
+        self.scanner = scanner
+        self.transport = transport
+        self.on_signal = on_signal
+        self.candle_cache = scanner.candle_cache
+        self.timeframe = timeframe
+        self.timeframe_ms = ccxt.Exchange.parse_timeframe(timeframe) * 1000
+        self.interval = kline_interval(timeframe)
+        self.reconnect = reconnect
+        self.symbols_by_id = self.map_market_ids(symbols)
+        # LeaderLock of the scanning worker, streaming stops once another worker holds it
+        self.leader = leader
+        self.running = True
+
+    def map_market_ids(self, symbols):
+        """Bybit market id -> ccxt symbol, topics and frames only carry the market id"""
+        symbols_by_id = {}
+        for symbol in symbols:
+            try:
+                mid = self.scanner.exchange.market(symbol)['id']
+            except Exception as e:
+                print(f"Not streaming {symbol}: {e}")
+                continue
+            if mid in symbols_by_id:
+                print(f"Not streaming {symbol}, market id {mid} is already streamed for {symbols_by_id[mid]}")
+                continue
+            symbols_by_id[mid] = symbol
+        return symbols_by_id
+
+    async def subscribe(self):
+        topics = []
+        for mid in self.symbols_by_id:
+            topics.append(f"kline.{self.interval}.{mid}")
+            topics.append(f"tickers.{mid}")
+        for i in range(0, len(topics), SUBSCRIBE_CHUNK):
+            await self.transport.send({'op': 'subscribe', 'args': topics[i:i + SUBSCRIBE_CHUNK]})
+
+    async def run(self):
+        while self.running:
+            try:
+                await self.transport.connect()
+                await self.subscribe()
+                print(f"Streaming {len(self.symbols_by_id)} pairs ({self.timeframe} klines and tickers)")
+                while self.running:
+                    frame = await self.transport.recv()
+                    if frame is None:
+                        break
+                    await self.handle_frame(frame)
+            except Exception as e:
+                print(f"Error in kline stream: {e}")
+            finally:
+                await self.transport.close()
+
+            if not self.reconnect or not self.running:
+                break
+            print("Stream disconnected, reconnecting in 5 seconds...")
+            await asyncio.sleep(5)
+
+    async def handle_frame(self, frame):
+        topic = frame.get('topic')
+        if not topic:
+            # Subscribe acks and pongs
+            if frame.get('success') is False:
+                print(f"Stream request failed: {frame.get('ret_msg')}")
+            return
+
+        if topic.startswith('tickers.'):
+            symbol = self.symbols_by_id.get(topic.split('.', 1)[1])
+            if symbol:
+                # Snapshot and delta frames both merge into the enrichment snapshot
+                self.scanner.market_data.update_ticker(symbol, frame.get('data', {}))
+        elif topic.startswith('kline.'):
+            symbol = self.symbols_by_id.get(topic.rsplit('.', 1)[1])
+            if symbol:
+                for kline in frame.get('data', []):
+                    await self.handle_kline(symbol, kline)
+
+    async def handle_kline(self, symbol, kline):
+        row = [
+            float(kline['start']), float(kline['open']), float(kline['high']),
+            float(kline['low']), float(kline['close']), float(kline['volume'])
+        ]
+        cached = self.candle_cache.get(symbol, self.timeframe)
+        if cached is None or row[0] > cached[-1, 0] + self.timeframe_ms:
+            # Missing bars (cold start or a reconnect), backfill them over REST first
+            await asyncio.to_thread(self.scanner.fetch_ohlcv, symbol)
+        rows = self.candle_cache.update(symbol, self.timeframe, [row])
+
+        if kline.get('confirm'):
+            if self.leader is not None and not self.leader.is_leader:
+                # The new leader scans this candle, alerting here as well would send it twice
+                print("\nLost scanning leadership, stopping the stream.")
+                self.stop()
+                return
+            await self.check_signal(symbol, rows)
+
+    async def check_signal(self, symbol, rows):
+        # analyze_coin reads the last closed candle at [-2], so a placeholder
+        # forming bar is appended after the bar that just closed
+        close = rows[-1, 4]
+        forming = [rows[-1, 0] + self.timeframe_ms, close, close, close, close, 0.0]
+        candles = Candles.from_rows(np.vstack([rows, forming]))
+        started = time.time()
+        result = await asyncio.to_thread(self.scanner.analyze_coin, symbol, candles)
+        if self.scanner.signals is not None:
+            try:
+                self.scanner.signals.save()
+            except Exception as e:
+                print(f"Error saving signals: {e}")
+        if result:
+            print(f"\nStream signal for {symbol} ({time.time() - started:.2f}s after close event)")
+            self.on_signal(result)
+
+    def stop(self):
+        self.running = False
@@ -0,0 +1,25 @@
+import os
+from src.candle_store import CandleStore
+
+SYMBOLS = ['BTC/USDT:USDT', 'BTC/USDT:USDT-261225', '1000_CAT/USDT:USDT', 'ETH/USDC']
+
+def rows(start, count):
+    return [[start + i * 900_000, 1.0, 2.0, 0.5, 1.5, 10.0] for i in range(count)]
+
+def test_symbols_round_trip_through_file_names(tmp_path):
+    store = CandleStore(str(tmp_path))
+    for symbol in SYMBOLS:
+        store.append(symbol, '15m', rows(0, 3))
+    assert store.symbols('15m') == sorted(SYMBOLS)
+    for symbol in SYMBOLS:
+        assert len(store.read(symbol, '15m')) == 3
+
+def test_files_named_the_old_way_are_renamed(tmp_path):
+    CandleStore(str(tmp_path)).append('BTC/USDT:USDT', '15m', rows(0, 3))
+    directory = tmp_path / '15m'
+    (name,) = os.listdir(directory)
+    os.replace(directory / name, directory / 'BTC_USDT__USDT.bin')
+
+    store = CandleStore(str(tmp_path))
+    assert store.symbols('15m') == ['BTC/USDT:USDT']
+    assert store.last_timestamp('BTC/USDT:USDT', '15m') == 2 * 900_000
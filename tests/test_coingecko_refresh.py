@@ -0,0 +1,48 @@
+import time
+from src import coingecko_manager
+from src.coingecko_manager import CoinGeckoManager
+
+class Response:
+    def __init__(self, data):
+        self.status_code = 200
+        self.data = data
+
+    def json(self):
+        return self.data
+
+class StubSession:
+    """CoinGecko endpoints the refresher uses, with one coin listed"""
+    def __init__(self):
+        self.urls = []
+
+    def get(self, url, params=None, timeout=None):
+        self.urls.append(url)
+        if url.endswith('/coins/list'):
+            return Response([{'id': 'bitcoin', 'symbol': 'btc', 'name': 'Bitcoin'}])
+        if url.endswith('/coins/markets'):
+            return Response([])
+        return Response({
+            'symbol': 'btc', 'categories': ['Layer 1 (L1)'], 'description': {'en': 'Peer-to-peer cash.'},
+            'market_cap_rank': 1, 'market_data': {'market_cap': {'usd': 1e12}},
+        })
+
+def test_details_are_prefetched_for_the_first_scan(tmp_path, monkeypatch):
+    monkeypatch.setattr(coingecko_manager, 'COINGECKO_REQUEST_INTERVAL', 0)
+    manager = CoinGeckoManager(str(tmp_path / 'coingecko.sqlite3'))
+    manager.session = StubSession()
+
+    # The refresher starts with the service, before any scan has filtered the universe
+    universe = []
+    manager.start_background_refresh(lambda: list(universe), interval=3600, poll_interval=0.01)
+    deadline = time.time() + 5
+    while not manager.store.get_coin_id('btc') and time.time() < deadline:
+        time.sleep(0.01)
+    assert manager.store.get_coin_id('btc') == 'bitcoin'
+    assert manager.store.get_details('bitcoin') is None
+
+    universe.append('BTC/USDT:USDT')
+    while manager.store.get_details('bitcoin') is None and time.time() < deadline:
+        time.sleep(0.01)
+    details = manager.get_coin_details('BTC/USDT:USDT')
+    assert details['categories'] == 'Layer 1 (L1)'
+    assert details['rank'] == 1
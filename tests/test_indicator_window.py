@@ -0,0 +1,44 @@
+import numpy as np
+from benchmarks.fixtures import synthetic
+from src.batch_indicators import build_panel, compute_indicators, signal_masks
+from src.candles import Candles
+from src.config import CANDLE_HISTORY_LIMIT
+from src.streaming_indicators import IndicatorEngine
+
+# The engine's state goes back to the pair's first candle, the batch screen only sees the cached
+# window. MFI, VWAP and TD only look back a fixed number of bars and match exactly. The Wilder
+# averages behind RSI and ADX and the Parabolic SAR still carry a little of the older candles.
+EXACT = ('MFI', 'VWAP', 'TD_Buy', 'TD_Sell')
+TOLERANCE = {'RSI': 0.1, 'ADX_14': 1.0}
+PSAR_RELATIVE_TOLERANCE = 0.05
+
+def signals(indicators, **thresholds):
+    long, short, _ = signal_masks(indicators, **thresholds)
+    return long[0, -2], short[0, -2]
+
+def test_streaming_engine_agrees_with_the_batch_screen_on_the_cached_window():
+    fixture = synthetic(symbols=4, bars=300)
+    ohlcv = {symbol: np.asarray(rows) for symbol, rows in fixture['ohlcv'].items()}
+    window = CANDLE_HISTORY_LIMIT
+    engine = IndicatorEngine()
+    loose = dict(rsi_oversold=45, mfi_oversold=45, rsi_overbought=55, mfi_overbought=55)
+    # One pass per closed candle on what the candle cache holds at that time
+    for end in range(window, 301):
+        symbols, timestamps, panel = build_panel({symbol: rows[end - window:end] for symbol, rows in ohlcv.items()})
+        batch = compute_indicators(timestamps, panel)
+        for i, symbol in enumerate(symbols):
+            candles = Candles.from_rows(ohlcv[symbol][end - window:end])
+            streamed = engine.compute(symbol, candles)
+            streamed['close'] = candles.close
+
+            for name in EXACT:
+                np.testing.assert_allclose(streamed[name][-2], batch[name][i, -2], rtol=1e-8, err_msg=name)
+            for name, tolerance in TOLERANCE.items():
+                assert abs(streamed[name][-2] - batch[name][i, -2]) <= tolerance, name
+            assert abs(streamed['PSAR'][-2] / batch['PSAR'][i, -2] - 1) <= PSAR_RELATIVE_TOLERANCE
+
+            # Same signals at the configured thresholds and at loose ones that fire far more often
+            streamed = {name: values[None, :] for name, values in streamed.items()}
+            screened = {name: values[i:i + 1] for name, values in batch.items()}
+            assert signals(streamed) == signals(screened)
+            assert signals(streamed, **loose) == signals(screened, **loose)
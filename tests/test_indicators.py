@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("pandas_ta")
+
+from benchmarks.fixtures import synthetic
+from src.batch_indicators import build_panel, compute_indicators
+from src.candles import Candles
+from src.scanner import Scanner
+from src.streaming_indicators import IndicatorEngine
+
+COLUMNS = ('RSI', 'MFI', 'VWAP', 'ADX_14', 'PSAR', 'TD_Buy', 'TD_Sell')
+
+@pytest.fixture(scope='module')
+def candles():
+    fixture = synthetic(symbols=5, bars=100)
+    return {symbol: Candles.from_rows(rows) for symbol, rows in fixture['ohlcv'].items()}
+
+def reference(candles):
+    """pandas_ta columns from Scanner.calculate_indicators, without the forming last row"""
+    df = Scanner(cg_manager=object()).calculate_indicators(candles.to_dataframe())
+    return {name: df[name].to_numpy(dtype=np.float64)[:-1] for name in COLUMNS}
+
+def assert_matches(expected, actual):
+    for name in COLUMNS:
+        np.testing.assert_allclose(actual[name][:len(expected[name])], expected[name], rtol=1e-8, atol=1e-8, err_msg=name)
+
+def test_streaming_engine_matches_pandas_ta(candles):
+    engine = IndicatorEngine()
+    for symbol, series in candles.items():
+        assert_matches(reference(series), engine.compute(symbol, series))
+
+def test_streaming_engine_matches_after_incremental_updates(candles):
+    engine = IndicatorEngine()
+    for symbol, series in candles.items():
+        # Every call only feeds the candles closed since the previous one into the saved state
+        for end in (60, 61, 75, 100):
+            part = Candles(*(getattr(series, name)[:end] for name in Candles.__slots__))
+            assert_matches(reference(part), engine.compute(symbol, part))
+
+def test_batch_indicators_match_pandas_ta(candles):
+    symbols, timestamps, panel = build_panel({symbol: series.rows() for symbol, series in candles.items()})
+    indicators = compute_indicators(timestamps, panel)
+    for i, symbol in enumerate(symbols):
+        assert_matches(reference(candles[symbol]), {name: indicators[name][i] for name in COLUMNS})
@@ -0,0 +1,37 @@
+from src.signal_memo import SignalMemo
+
+PERIOD = 15 * 60 * 1000
+BAR = 1_700_000_100 * 1000 // PERIOD * PERIOD
+
+def memo_at(bar):
+    memo = SignalMemo('15m')
+    # Just after the close of the candle opening at bar
+    memo.clock = lambda: bar + PERIOD + 3000
+    return memo
+
+def test_signal_alerts_once_while_it_holds():
+    memo = memo_at(BAR)
+    assert memo.record('BTC/USDT:USDT', BAR, 'LONG')
+    assert not memo.record('BTC/USDT:USDT', BAR + PERIOD, 'LONG')
+    assert not memo.record('BTC/USDT:USDT', BAR + 2 * PERIOD, None)
+    assert memo.record('BTC/USDT:USDT', BAR + 3 * PERIOD, 'LONG')
+
+def test_signal_carries_on_through_a_prefiltered_candle():
+    memo = memo_at(BAR + PERIOD)
+    assert memo.record('BTC/USDT:USDT', BAR, 'LONG')
+    memo.carry(['BTC/USDT:USDT', 'ETH/USDT:USDT'], BAR + PERIOD)
+    assert memo.entries['BTC/USDT:USDT'] == [BAR + PERIOD, 'LONG']
+    # Carried pairs count as evaluated, a retry inside the candle skips them
+    assert memo.pending(['BTC/USDT:USDT', 'ETH/USDT:USDT', 'SOL/USDT:USDT']) == ['SOL/USDT:USDT']
+
+    assert not memo.record('BTC/USDT:USDT', BAR + 2 * PERIOD, 'LONG')
+    assert memo.record('BTC/USDT:USDT', BAR + 3 * PERIOD, 'SHORT')
+    assert memo.record('ETH/USDT:USDT', BAR + 2 * PERIOD, 'SHORT')
+
+def test_carry_does_not_revive_an_old_signal():
+    memo = memo_at(BAR + 2 * PERIOD)
+    assert memo.record('BTC/USDT:USDT', BAR, 'LONG')
+    # The candle in between was never evaluated, nothing is known about it
+    memo.carry(['BTC/USDT:USDT'], BAR + 2 * PERIOD)
+    assert memo.entries['BTC/USDT:USDT'] == [BAR + 2 * PERIOD, None]
+    assert memo.record('BTC/USDT:USDT', BAR + 3 * PERIOD, 'LONG')
@@ -0,0 +1,56 @@
+import numpy as np
+from src.td_sequential import td_setup_counts
+
+def td_loop(close):
+    """The original per-row Scanner.calculate_td_sequential"""
+    td_buy, td_sell = [], []
+    buy_count = sell_count = 0
+    for i in range(len(close)):
+        if i < 4:
+            td_buy.append(0)
+            td_sell.append(0)
+            continue
+        c, c4 = close[i], close[i - 4]
+        buy_count = buy_count + 1 if c < c4 else 0
+        sell_count = sell_count + 1 if c > c4 else 0
+        td_buy.append(buy_count)
+        td_sell.append(sell_count)
+    return np.array(td_buy), np.array(td_sell)
+
+def random_closes(symbols=20, bars=150, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (symbols, bars)), axis=1))
+    # Ties and flat stretches reset both counts
+    close[:, 40:48] = close[:, 40:41]
+    return close
+
+def test_matches_loop_per_symbol():
+    for close in random_closes():
+        buy, sell = td_setup_counts(close)
+        expected_buy, expected_sell = td_loop(close)
+        np.testing.assert_array_equal(buy, expected_buy)
+        np.testing.assert_array_equal(sell, expected_sell)
+
+def test_batch_matches_loop():
+    close = random_closes()
+    buy, sell = td_setup_counts(close)
+    for i, row in enumerate(close):
+        expected_buy, expected_sell = td_loop(row)
+        np.testing.assert_array_equal(buy[i], expected_buy)
+        np.testing.assert_array_equal(sell[i], expected_sell)
+
+def test_nan_closes_match_loop():
+    # Missing candles compare False both ways, like in the loop
+    close = random_closes(symbols=3)
+    close[0, 10] = np.nan
+    close[1, :30] = np.nan
+    close[2, -5:] = np.nan
+    buy, sell = td_setup_counts(close)
+    for i, row in enumerate(close):
+        expected_buy, expected_sell = td_loop(row)
+        np.testing.assert_array_equal(buy[i], expected_buy)
+        np.testing.assert_array_equal(sell[i], expected_sell)
+
+def test_short_series():
+    buy, sell = td_setup_counts([1.0, 2.0, 3.0])
+    assert buy.tolist() == [0, 0, 0] and sell.tolist() == [0, 0, 0]
@@ -0,0 +1,128 @@
+import asyncio
+import json
+from src.candle_cache import CandleCache
+from src.ws_stream import KlineStream, ReplayTransport
+
+SYMBOL = 'BTC/USDT:USDT'
+PERIOD = 15 * 60 * 1000
+START = 1_700_000_100 * 1000 // PERIOD * PERIOD
+
+def candle(i, close):
+    return [START + i * PERIOD, close, close + 1, close - 1, close, 10.0]
+
+def kline(i, close, confirm):
+    row = candle(i, close)
+    return {
+        'start': row[0], 'end': row[0] + PERIOD - 1, 'interval': '15', 'open': str(row[1]), 'high': str(row[2]),
+        'low': str(row[3]), 'close': str(row[4]), 'volume': str(row[5]), 'confirm': confirm,
+    }
+
+class MarketData:
+    def __init__(self):
+        self.tickers = {}
+
+    def update_ticker(self, symbol, data):
+        self.tickers.setdefault(symbol, {}).update(data)
+
+class Exchange:
+    """Market ids of Bybit linear contracts, the dated future shares its base and quote with the perpetual"""
+    markets = {
+        SYMBOL: {'id': 'BTCUSDT'},
+        'BTC/USDT:USDT-261225': {'id': 'BTCUSDT-25DEC26'},
+        'BTC/USDC:USDC': {'id': 'BTCPERP'},
+    }
+
+    def market(self, symbol):
+        return self.markets[symbol]
+
+class Leader:
+    is_leader = True
+
+class StubScanner:
+    """What KlineStream uses of a Scanner, REST history covers the 20 bars before the streamed ones"""
+    def __init__(self):
+        self.exchange = Exchange()
+        self.candle_cache = CandleCache()
+        self.market_data = MarketData()
+        self.signals = None
+        self.backfills = []
+        self.analyzed = []
+
+    def fetch_ohlcv(self, symbol):
+        self.backfills.append(symbol)
+        self.candle_cache.update(symbol, '15m', [candle(i, 100.0 + i) for i in range(20)])
+
+    def analyze_coin(self, symbol, candles):
+        self.analyzed.append(candles)
+        return {'symbol': symbol, 'price': candles.close[-2]}
+
+def record(path, frames):
+    with open(path, 'w') as f:
+        for frame in frames:
+            f.write(json.dumps(frame) + "\n")
+
+def test_replayed_frames_update_cache_and_check_signals_on_close(tmp_path):
+    path = tmp_path / 'frames.jsonl'
+    record(path, [
+        {'success': True, 'op': 'subscribe'},
+        {'topic': 'tickers.BTCUSDT', 'type': 'snapshot', 'data': {'symbol': 'BTCUSDT', 'fundingRate': '0.0001'}},
+        {'topic': 'kline.15.BTCUSDT', 'data': [kline(20, 119.0, False)]},
+        {'topic': 'tickers.BTCUSDT', 'type': 'delta', 'data': {'openInterest': '5'}},
+        {'topic': 'kline.15.BTCUSDT', 'data': [kline(20, 121.0, True)]},
+        {'topic': 'kline.15.BTCUSDT', 'data': [kline(21, 122.0, False)]},
+        {'topic': 'kline.15.ETHUSDT', 'data': [kline(21, 1.0, True)]},
+    ])
+    scanner = StubScanner()
+    transport = ReplayTransport(str(path))
+    signals = []
+    stream = KlineStream(scanner, [SYMBOL], transport, on_signal=signals.append, reconnect=False)
+    asyncio.run(stream.run())
+
+    assert transport.sent == [{'op': 'subscribe', 'args': ['kline.15.BTCUSDT', 'tickers.BTCUSDT']}]
+    assert scanner.market_data.tickers[SYMBOL] == {'symbol': 'BTCUSDT', 'fundingRate': '0.0001', 'openInterest': '5'}
+    # Backfilled over REST once, on the first kline of a cold cache
+    assert scanner.backfills == [SYMBOL]
+
+    # Only the confirmed kline is checked, with the bar that just closed at [-2]
+    assert len(scanner.analyzed) == 1
+    candles = scanner.analyzed[0]
+    assert len(candles) == 22
+    assert candles.timestamp[-2] == START + 20 * PERIOD
+    assert candles.close[-2] == 121.0
+    assert candles.timestamp[-1] == START + 21 * PERIOD
+    assert signals == [{'symbol': SYMBOL, 'price': 121.0}]
+
+    # The next bar's forming kline replaced nothing, it was appended
+    rows = scanner.candle_cache.get(SYMBOL, '15m')
+    assert rows[-1, 0] == START + 21 * PERIOD and rows[-1, 4] == 122.0
+    assert rows[-2, 4] == 121.0
+
+def test_symbols_are_routed_by_their_exchange_market_id():
+    symbols = [SYMBOL, 'BTC/USDT:USDT-261225', 'BTC/USDC:USDC', 'DOGE/USDT:USDT', SYMBOL]
+    stream = KlineStream(StubScanner(), symbols, None, on_signal=print)
+    assert stream.symbols_by_id == {
+        'BTCUSDT': SYMBOL, 'BTCUSDT-25DEC26': 'BTC/USDT:USDT-261225', 'BTCPERP': 'BTC/USDC:USDC',
+    }
+
+def test_stream_stops_on_the_first_close_after_leadership_is_lost(tmp_path):
+    path = tmp_path / 'frames.jsonl'
+    record(path, [
+        {'topic': 'kline.15.BTCUSDT', 'data': [kline(20, 121.0, True)]},
+        {'topic': 'kline.15.BTCUSDT', 'data': [kline(21, 122.0, True)]},
+        {'topic': 'kline.15.BTCUSDT', 'data': [kline(22, 123.0, True)]},
+    ])
+    scanner = StubScanner()
+    leader = Leader()
+    signals = []
+
+    def on_signal(result):
+        signals.append(result)
+        # Another worker takes over the lock after the first alert
+        leader.is_leader = False
+
+    stream = KlineStream(scanner, [SYMBOL], ReplayTransport(str(path)), on_signal=on_signal, leader=leader)
+    asyncio.run(stream.run())
+
+    assert signals == [{'symbol': SYMBOL, 'price': 121.0}]
+    assert len(scanner.analyzed) == 1
+    assert not stream.running